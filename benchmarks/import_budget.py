@@ -0,0 +1,87 @@
+"""Check that CLI --help starts fast and without the heavy AWS and UI libraries.
+
+    python benchmarks/import_budget.py [--budget-ms 150] [--repeat 5]
+
+Each --help invocation runs in a fresh interpreter under `python -X importtime`.
+It fails (exit 1) when one imports boto3, botocore or rich, or when its
+imports take longer than the budget (best of --repeat runs, measured against
+a bare interpreter).
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+COMMANDS = [
+    ['--help'],
+    ['scan', '--help'],
+    ['fix-cors', '--help'],
+]
+
+FORBIDDEN = ('boto3', 'botocore', 'rich', 's3transfer', 'urllib3')
+BUDGET_MS = 150.0
+
+
+def import_times(code=None, argv=None):
+    """({top-level module: cumulative microseconds}, every module imported, exit code).
+
+    Runs `code`, or the interpreter arguments in argv such as
+    ['-m', 'aws_assistant.cli', '--help'].
+    """
+    env = dict(os.environ, PYTHONPATH=SRC)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime'] + (argv if argv is not None else ['-c', code]),
+        capture_output=True, text=True, env=env
+    )
+    times = {}
+    modules = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules.add(name.strip())
+        # Nested imports are indented under the module that pulled them in
+        if name[1:2] != ' ':
+            times[name.strip()] = int(cumulative)
+    return times, modules, result.returncode
+
+
+def measure(args, baseline):
+    code = f'from aws_assistant.cli import main; main({args!r}, prog_name="aws-assistant")'
+    times, modules, returncode = import_times(code)
+    if returncode != 0:
+        raise RuntimeError(f'aws-assistant {" ".join(args)} exited with {returncode}')
+    loaded = {name: us for name, us in times.items() if name not in baseline}
+    return sum(loaded.values()) / 1000, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--budget-ms', type=float, default=BUDGET_MS)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    baseline, _, _ = import_times('pass')
+    failed = False
+
+    for command in COMMANDS:
+        runs = [measure(command, baseline) for _ in range(args.repeat)]
+        best = min(elapsed for elapsed, _ in runs)
+        modules = runs[0][1]
+        heavy = sorted({name.split('.')[0] for name in modules if name.split('.')[0] in FORBIDDEN})
+
+        status = 'ok'
+        if heavy:
+            status = f'FAIL: imports {", ".join(heavy)}'
+        elif best > args.budget_ms:
+            status = f'FAIL: over the {args.budget_ms:g} ms budget'
+        failed = failed or status != 'ok'
+        print(f'  aws-assistant {" ".join(command):<20} {best:7.1f} ms   {status}')
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""Compare the memory held by scan's inventory: raw listing dicts vs FunctionRecord.
+
+    python benchmarks/inventory_memory.py [--functions 10000] [--apis 200]
+
+The raw model is what scan kept before: every list_functions entry, with the
+scan's own keys added to it. The compact model projects each entry to a
+FunctionRecord and shares one ApiLink per API.
+"""
+import argparse
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from aws_assistant.models import ApiLink, FunctionRecord  # noqa: E402
+
+REGIONS = ['us-east-1', 'us-east-2', 'us-west-2', 'eu-west-1', 'eu-central-1', 'ap-southeast-2']
+
+
+def listing_entry(index, region):
+    """A list_functions entry shaped like a typical production function"""
+    name = f'service-{index % 97}-handler-{index}'
+    return {
+        'FunctionName': name,
+        'FunctionArn': f'arn:aws:lambda:{region}:123456789012:function:{name}',
+        'Runtime': 'python3.12' if index % 2 else 'nodejs20.x',
+        'Role': f'arn:aws:iam::123456789012:role/{name}-role',
+        'Handler': 'app.handler',
+        'CodeSize': 5242880 + index,
+        'Description': f'Handler {index} for service {index % 97}',
+        'Timeout': 30,
+        'MemorySize': 512,
+        'LastModified': '2024-05-01T12:00:00.000+0000',
+        'CodeSha256': f'{index:064x}',
+        'Version': '$LATEST',
+        'VpcConfig': {
+            'SubnetIds': [f'subnet-{index:08x}a', f'subnet-{index:08x}b'],
+            'SecurityGroupIds': [f'sg-{index:08x}'],
+            'VpcId': f'vpc-{index % 7:08x}',
+        },
+        'Environment': {
+            'Variables': {
+                'TABLE_NAME': f'table-{index}',
+                'QUEUE_URL': f'https://sqs.{region}.amazonaws.com/123456789012/queue-{index}',
+                'API_KEY': f'secret-{index:032x}',
+                'LOG_LEVEL': 'INFO',
+            }
+        },
+        'TracingConfig': {'Mode': 'PassThrough'},
+        'RevisionId': f'{index:08x}-0000-0000-0000-000000000000',
+        'Layers': [
+            {'Arn': f'arn:aws:lambda:{region}:123456789012:layer:shared:{index % 5}', 'CodeSize': 1048576},
+        ],
+        'PackageType': 'Zip',
+        'Architectures': ['x86_64'],
+        'EphemeralStorage': {'Size': 512},
+        'LoggingConfig': {'LogFormat': 'Text', 'LogGroup': f'/aws/lambda/{name}'},
+    }
+
+
+def api_for(index, api_count):
+    api_id = f'{index % api_count:010x}'
+    return api_id, f'api-{index % api_count}'
+
+
+def build_raw(function_count, api_count):
+    functions = []
+    for index in range(function_count):
+        region = REGIONS[index % len(REGIONS)]
+        function = listing_entry(index, region)
+        api_id, api_name = api_for(index, api_count)
+        function['Region'] = region
+        function['HasFunctionUrl'] = index % 3 == 0
+        function['FunctionUrlCorsConfigured'] = index % 6 == 0
+        function['FunctionUrl'] = f'https://{index:032x}.lambda-url.{region}.on.aws/' if index % 3 == 0 else None
+        function['ApiGateways'] = [{
+            'type': 'HTTP API',
+            'api_id': api_id,
+            'api_name': api_name,
+            'cors_configured': index % 2 == 0
+        }]
+        function['HasApiGateway'] = True
+        functions.append(function)
+    return functions
+
+
+def build_compact(function_count, api_count):
+    links = {}
+    functions = []
+    for index in range(function_count):
+        region = REGIONS[index % len(REGIONS)]
+        record = FunctionRecord.from_listing(listing_entry(index, region), region)
+        api_id, api_name = api_for(index, api_count)
+        link = links.get(api_id)
+        if link is None:
+            link = links[api_id] = ApiLink('HTTP API', api_id, api_name, index % 2 == 0)
+        record.set_url_state((
+            index % 3 == 0,
+            index % 6 == 0,
+            f'https://{index:032x}.lambda-url.{region}.on.aws/' if index % 3 == 0 else None
+        ))
+        record.api_gateways = (link,)
+        functions.append(record)
+    return functions
+
+
+def measure(build, function_count, api_count):
+    tracemalloc.start()
+    inventory = build(function_count, api_count)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del inventory
+    return retained, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--functions', type=int, default=10000)
+    parser.add_argument('--apis', type=int, default=200)
+    args = parser.parse_args()
+
+    print(f'{args.functions} functions, {args.apis} APIs')
+    for label, build in [('raw dicts', build_raw), ('FunctionRecord', build_compact)]:
+        retained, peak = measure(build, args.functions, args.apis)
+        print(f'  {label:<15} retained {retained / 2**20:8.2f} MiB   '
+              f'{retained / args.functions:8.0f} B/function   peak {peak / 2**20:8.2f} MiB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""Benchmark scan, fix-cors and API mapping against a simulated AWS backend.
+
+    python benchmarks/scan_benchmark.py [--regions 4] [--functions 200]
+        [--http-apis 10] [--rest-apis 10] [--resources 5]
+        [--latency-ms 20] [--throttle-rate 0.02] [--scenario scan ...] [--json]
+
+No AWS account is used: every call is answered by benchmarks/simulated_aws.py
+with the given per-call latency and throttling. For each scenario it reports
+wall time, API calls by operation and peak Python memory (tracemalloc, which
+slows the run down; --no-memory turns it off for cleaner timings).
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+# Never touch real credentials, config or the user's inventory cache
+os.environ.update({
+    'AWS_ACCESS_KEY_ID': 'AKIABENCHMARK',
+    'AWS_SECRET_ACCESS_KEY': 'benchmark',
+    'AWS_DEFAULT_REGION': 'us-east-1',
+    'AWS_CONFIG_FILE': os.devnull,
+    'AWS_SHARED_CREDENTIALS_FILE': os.devnull,
+})
+os.environ.pop('AWS_PROFILE', None)
+
+from click.testing import CliRunner  # noqa: E402
+
+from aws_assistant.cli import main as cli  # noqa: E402
+from aws_assistant.clients import registry  # noqa: E402
+from aws_assistant.scanner import get_api_gateway_lambda_mappings  # noqa: E402
+from simulated_aws import Fixture, SimulatedAws  # noqa: E402
+
+SCENARIOS = ['scan', 'scan-cached', 'fix-cors', 'mappings']
+
+
+def run_cli(args):
+    result = CliRunner().invoke(cli, args, catch_exceptions=False)
+    # Commands report AWS failures as text rather than an exit code
+    for marker in ('Unexpected error', 'AWS Error', 'Error: No AWS credentials'):
+        if marker in result.output:
+            raise RuntimeError(f'{" ".join(args)} failed:\n{result.output[-2000:]}')
+    return result.output
+
+
+def scenario_args(name, args, rate_args):
+    common = ['--concurrency', str(args.concurrency)]
+    if name == 'scan':
+        return ['scan', '--refresh', '--output', 'jsonl'] + common + rate_args
+    if name == 'scan-cached':
+        return ['scan', '--cache-ttl', '0', '--output', 'jsonl'] + common + rate_args
+    if name == 'fix-cors':
+        return ['fix-cors', '--refresh', '--match', args.fix_match, '--origin', 'https://app.example.com'] + common
+    return None
+
+
+def run_scenario(name, args, backend, fixture, rate_args):
+    backend.reset_counts()
+    if args.memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+
+    cli_args = scenario_args(name, args, rate_args)
+    if cli_args is not None:
+        run_cli(cli_args)
+    else:
+        registry.configure(max_pool_connections=args.concurrency)
+        for region in sorted(fixture.populated):
+            get_api_gateway_lambda_mappings(region)
+
+    wall = time.perf_counter() - started
+    peak = None
+    if args.memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return {
+        'scenario': name,
+        'wall_seconds': round(wall, 3),
+        'calls': sum(backend.calls.values()),
+        'throttled': sum(backend.throttled.values()),
+        'calls_by_operation': {f'{service}.{operation}': count for (service, operation), count in sorted(backend.calls.items())},
+        'peak_memory_mib': round(peak / 2**20, 2) if peak is not None else None,
+    }
+
+
+def print_result(result):
+    memory = f'   peak {result["peak_memory_mib"]:7.2f} MiB' if result['peak_memory_mib'] is not None else ''
+    print(f'  {result["scenario"]:<12} {result["wall_seconds"]:8.2f} s   '
+          f'{result["calls"]:6d} calls ({result["throttled"]} throttled){memory}')
+    for operation, count in result['calls_by_operation'].items():
+        print(f'      {operation:<40} {count:6d}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--regions', type=int, default=4, help='Regions holding functions')
+    parser.add_argument('--empty-regions', type=int, default=4, help='Enabled regions with no functions')
+    parser.add_argument('--functions', type=int, default=200, help='Functions per region')
+    parser.add_argument('--http-apis', type=int, default=10, help='HTTP APIs per region')
+    parser.add_argument('--rest-apis', type=int, default=10, help='REST APIs per region')
+    parser.add_argument('--resources', type=int, default=5, help='Resources per REST API')
+    parser.add_argument('--latency-ms', type=float, default=20.0, help='Simulated latency of every call')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='Extra random latency, up to this much')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='Fraction of Lambda/API Gateway calls answered with a throttling error')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--client-rate-limits', action='store_true', help='Keep the tool\'s own per-service request rate limits (off by default, so the backend is what is measured)')
+    parser.add_argument('--fix-match', default='fn-0000*', help='--match pattern for the fix-cors scenario')
+    parser.add_argument('--scenario', action='append', choices=SCENARIOS, help='Scenarios to run (default: all)')
+    parser.add_argument('--no-memory', dest='memory', action='store_false', help='Skip tracemalloc peak memory measurement')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON, e.g. for CI')
+    args = parser.parse_args()
+
+    fixture = Fixture(args.regions, args.functions, args.http_apis, args.rest_apis, args.resources, args.empty_regions)
+    backend = SimulatedAws(fixture, args.latency_ms, args.jitter_ms, args.throttle_rate)
+    registry.add_client_hook(backend.install)
+
+    rate_args = []
+    if not args.client_rate_limits:
+        for service in ('lambda', 'apigateway', 'apigatewayv2'):
+            rate_args += ['--rate', f'{service}=0']
+
+    cache_dir = tempfile.mkdtemp(prefix='aws-assistant-bench-')
+    os.environ['AWS_ASSISTANT_CACHE_DIR'] = cache_dir
+    try:
+        results = [
+            run_scenario(name, args, backend, fixture, rate_args)
+            for name in args.scenario or SCENARIOS
+        ]
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps({'fixture': fixture.describe(), 'latency_ms': args.latency_ms,
+                          'throttle_rate': args.throttle_rate, 'results': results}, indent=2))
+        return
+
+    print(f'{fixture.describe()}; {args.latency_ms:g} ms per call, throttle rate {args.throttle_rate:g}')
+    for result in results:
+        print_result(result)
+
+
+if __name__ == '__main__':
+    main()
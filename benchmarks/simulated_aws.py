@@ -0,0 +1,475 @@
+"""A simulated AWS backend for benchmarks: Lambda, API Gateway v1/v2, STS and EC2.
+
+Installed on every client the tool creates, it answers calls from synthetic
+fixtures instead of the network:
+
+    backend = SimulatedAws(Fixture(regions=4, functions=200), latency_ms=20, throttle_rate=0.02)
+    registry.add_client_hook(backend.install)
+
+Lambda and API Gateway responses are built as rest-json wire responses on
+before-send, so botocore parses them and its retry handler sees throttling
+exactly as it would from AWS. STS and EC2 are answered on before-call.
+"""
+import base64
+import datetime
+import json
+import random
+import threading
+import time
+from collections import Counter
+
+from botocore.awsrequest import AWSResponse
+
+ACCOUNT = '123456789012'
+REGION_NAMES = [
+    'us-east-1', 'us-east-2', 'us-west-1', 'us-west-2', 'eu-west-1', 'eu-west-2',
+    'eu-central-1', 'eu-north-1', 'ap-southeast-1', 'ap-southeast-2', 'ap-northeast-1',
+    'ap-south-1', 'ca-central-1', 'sa-east-1', 'eu-west-3', 'ap-northeast-2', 'ap-northeast-3',
+]
+
+LIST_PAGE_SIZE = 50
+
+
+class NotFound(Exception):
+    pass
+
+
+def function_name(index):
+    return f'fn-{index:05d}'
+
+
+def function_arn(region, index):
+    return f'arn:aws:lambda:{region}:{ACCOUNT}:function:{function_name(index)}'
+
+
+def integration_uri(region, index):
+    return f'arn:aws:apigateway:{region}:lambda:path/2015-03-31/functions/{function_arn(region, index)}/invocations'
+
+
+class Fixture:
+    """Synthetic inventory: the same layout in each of the first `regions` regions.
+
+    Every third function has a Function URL, half of them with CORS. HTTP API
+    j integrates three functions; REST API j has `resources` resources, each
+    with a GET method on its own function. Integrated functions carry a
+    resource policy naming their APIs. Regions past `regions` are empty.
+    """
+
+    def __init__(self, regions=4, functions=200, http_apis=10, rest_apis=10, resources=5, empty_regions=4):
+        self.regions = REGION_NAMES[:regions + empty_regions]
+        self.populated = set(self.regions[:regions])
+        self.functions = functions
+        self.http_apis = http_apis
+        self.rest_apis = rest_apis
+        self.resources = resources
+
+        self.http_targets = {
+            j: sorted({(j * 7 + k) % functions for k in range(3)}) if functions else []
+            for j in range(http_apis)
+        }
+        self.rest_targets = {
+            j: [(j * resources + r) % functions for r in range(resources)] if functions else []
+            for j in range(rest_apis)
+        }
+        self.policies = {}
+        for j, targets in self.http_targets.items():
+            for index in targets:
+                self.policies.setdefault(index, []).append(f'h{j:04d}')
+        for j, targets in self.rest_targets.items():
+            for index in targets:
+                self.policies.setdefault(index, []).append(f'r{j:04d}')
+
+    def function_count(self, region):
+        return self.functions if region in self.populated else 0
+
+    def describe(self):
+        return (
+            f'{len(self.populated)} regions (+{len(self.regions) - len(self.populated)} empty) x '
+            f'{self.functions} functions, {self.http_apis} HTTP APIs, '
+            f'{self.rest_apis} REST APIs x {self.resources} resources'
+        )
+
+
+def to_wire(shape, value):
+    """Serialize a parsed-style value to its rest-json wire form for `shape`"""
+    if shape is None or value is None:
+        return value
+    if shape.type_name == 'structure':
+        wire = {}
+        for name, member in shape.members.items():
+            if name in value and not member.serialization.get('location'):
+                wire[member.serialization.get('name', name)] = to_wire(member, value[name])
+        return wire
+    if shape.type_name == 'list':
+        return [to_wire(shape.member, item) for item in value]
+    if shape.type_name == 'map':
+        return {key: to_wire(shape.value, item) for key, item in value.items()}
+    if shape.type_name == 'timestamp' and isinstance(value, datetime.datetime):
+        return value.timestamp()
+    if shape.type_name == 'blob' and isinstance(value, bytes):
+        return base64.b64encode(value).decode()
+    return value
+
+
+class _Body:
+    def __init__(self, data):
+        self.data = data
+
+    def stream(self, **kwargs):
+        yield self.data
+
+    def read(self, amt=None):
+        # Streaming payloads are read through botocore's StreamingBody
+        if amt is None:
+            amt = len(self.data)
+        data, self.data = self.data[:amt], self.data[amt:]
+        return data
+
+
+class SimulatedAws:
+    """Answers AWS calls from a Fixture, with injectable latency and throttling"""
+
+    def __init__(self, fixture, latency_ms=0.0, jitter_ms=0.0, throttle_rate=0.0, seed=1):
+        self.fixture = fixture
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.throttle_rate = throttle_rate
+        self.calls = Counter()
+        self.throttled = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._params = threading.local()
+        # Writes made during the run, so repeated fix-cors runs see their own changes
+        self.url_cors = {}
+        self.api_cors = {}
+        self.rest_definitions = {}
+        self.rest_put_bodies = {}
+        # When credentials from AssumeRole expire
+        self.role_expiration = datetime.datetime(2100, 1, 1, tzinfo=datetime.timezone.utc)
+
+    def reset_counts(self):
+        with self._lock:
+            self.calls.clear()
+            self.throttled.clear()
+
+    def install(self, client, profile=None):
+        service_model = client.meta.service_model
+        service = service_model.service_name
+        region = client.meta.region_name
+
+        def remember_params(params, **kwargs):
+            # before-send only sees the serialized request; keep the API params
+            # for it on this thread, which makes the call and all its retries
+            self._params.value = dict(params)
+
+        def before_send(event_name, request, **kwargs):
+            operation = event_name.rsplit('.', 1)[-1]
+            return self._respond_wire(service_model, service, operation, region, self._params.value)
+
+        def before_call(model, **kwargs):
+            return self._respond_parsed(service, model.name, region)
+
+        client.meta.events.register('before-parameter-build', remember_params)
+        if service in ('lambda', 'apigateway', 'apigatewayv2'):
+            client.meta.events.register_last('before-send', before_send)
+        else:
+            client.meta.events.register_last('before-call', before_call)
+
+    def _delay(self):
+        if self.latency_ms or self.jitter_ms:
+            with self._lock:
+                jitter = self._random.uniform(0, self.jitter_ms) if self.jitter_ms else 0.0
+            time.sleep((self.latency_ms + jitter) / 1000)
+
+    def _respond_parsed(self, service, operation, region):
+        with self._lock:
+            self.calls[(service, operation)] += 1
+        self._delay()
+        if operation == 'GetCallerIdentity':
+            parsed = {'Account': ACCOUNT, 'Arn': f'arn:aws:iam::{ACCOUNT}:user/bench', 'UserId': 'BENCH'}
+        elif operation == 'DescribeRegions':
+            parsed = {'Regions': [{'RegionName': name} for name in self.fixture.regions]}
+        elif operation == 'AssumeRole':
+            parsed = {'Credentials': {
+                'AccessKeyId': 'ASIABENCH', 'SecretAccessKey': 'bench', 'SessionToken': 'bench',
+                'Expiration': self.role_expiration
+            }}
+        else:
+            raise NotImplementedError(f'{service}.{operation} is not simulated')
+        parsed['ResponseMetadata'] = {'HTTPStatusCode': 200, 'RetryAttempts': 0}
+        return AWSResponse('https://simulated', 200, {}, _Body(b'')), parsed
+
+    def _respond_wire(self, service_model, service, operation, region, params):
+        with self._lock:
+            self.calls[(service, operation)] += 1
+            throttle = self.throttle_rate and self._random.random() < self.throttle_rate
+            if throttle:
+                self.throttled[(service, operation)] += 1
+        self._delay()
+
+        if throttle:
+            return self._error(429, 'TooManyRequestsException', 'Rate exceeded')
+
+        handler = getattr(self, f'_{service}_{operation}', None)
+        if handler is None:
+            raise NotImplementedError(f'{service}.{operation} is not simulated')
+        try:
+            parsed = handler(region, params)
+        except NotFound as e:
+            return self._error(404, 'ResourceNotFoundException' if service == 'lambda' else 'NotFoundException', str(e))
+
+        if isinstance(parsed, bytes):
+            # Payload operations such as GetExport return the document itself
+            return AWSResponse('https://simulated', 200, {'Content-Type': 'application/json'}, _Body(parsed))
+
+        output_shape = service_model.operation_model(operation).output_shape
+        body = json.dumps(to_wire(output_shape, parsed)).encode()
+        return AWSResponse(
+            'https://simulated', 200,
+            {'Content-Type': 'application/json', 'x-amzn-RequestId': 'simulated'},
+            _Body(body)
+        )
+
+    def _error(self, status, code, message):
+        body = json.dumps({'message': message}).encode()
+        return AWSResponse(
+            'https://simulated', status,
+            {'Content-Type': 'application/json', 'x-amzn-ErrorType': code},
+            _Body(body)
+        )
+
+    # Lambda
+
+    def _function_index(self, region, name):
+        name = name.rsplit(':function:', 1)[-1].split(':')[0]
+        try:
+            index = int(name.rsplit('-', 1)[-1])
+        except ValueError:
+            raise NotFound(f'Function not found: {name}')
+        if not name.startswith('fn-') or index >= self.fixture.function_count(region):
+            raise NotFound(f'Function not found: {name}')
+        return index
+
+    def _function_url(self, region, index):
+        if index % 3:
+            return None
+        default_cors = {'AllowOrigins': ['https://example.com'], 'AllowMethods': ['GET']} if index % 2 == 0 else {}
+        return {
+            'FunctionUrl': f'https://{function_name(index)}.lambda-url.{region}.on.aws/',
+            'FunctionArn': function_arn(region, index),
+            'AuthType': 'NONE',
+            'Cors': self.url_cors.get((region, index), default_cors),
+            'CreationTime': '2024-01-01T00:00:00.000Z',
+            'LastModifiedTime': '2024-01-01T00:00:00.000Z',
+        }
+
+    def _lambda_ListFunctions(self, region, params):
+        start = int(params.get('Marker') or 0)
+        end = min(start + LIST_PAGE_SIZE, self.fixture.function_count(region))
+        response = {'Functions': [
+            {
+                'FunctionName': function_name(i),
+                'FunctionArn': function_arn(region, i),
+                'Runtime': 'python3.12' if i % 2 else 'nodejs20.x',
+                'Handler': 'app.handler',
+                'CodeSize': 1024,
+                'MemorySize': 256,
+                'LastModified': '2024-01-01T00:00:00.000+0000',
+                'CodeSha256': f'{i:064x}',
+                'Environment': {'Variables': {'TABLE': f'table-{i}'}},
+            }
+            for i in range(start, end)
+        ]}
+        if end < self.fixture.function_count(region):
+            response['NextMarker'] = str(end)
+        return response
+
+    def _lambda_GetFunction(self, region, params):
+        index = self._function_index(region, params['FunctionName'])
+        return {'Configuration': {'FunctionName': function_name(index), 'FunctionArn': function_arn(region, index)}}
+
+    def _lambda_ListFunctionUrlConfigs(self, region, params):
+        url = self._function_url(region, self._function_index(region, params['FunctionName']))
+        return {'FunctionUrlConfigs': [url] if url else []}
+
+    def _lambda_GetFunctionUrlConfig(self, region, params):
+        url = self._function_url(region, self._function_index(region, params['FunctionName']))
+        if url is None:
+            raise NotFound('The resource you requested does not exist.')
+        return url
+
+    def _lambda_UpdateFunctionUrlConfig(self, region, params):
+        index = self._function_index(region, params['FunctionName'])
+        if self._function_url(region, index) is None:
+            raise NotFound('The resource you requested does not exist.')
+        self.url_cors[(region, index)] = params.get('Cors', {})
+        return self._function_url(region, index)
+
+    def _lambda_GetPolicy(self, region, params):
+        index = self._function_index(region, params['FunctionName'])
+        if index not in self.fixture.policies:
+            raise NotFound('The resource you requested does not exist.')
+        statements = [
+            {
+                'Sid': f'apigateway-{api_id}',
+                'Effect': 'Allow',
+                'Principal': {'Service': 'apigateway.amazonaws.com'},
+                'Action': 'lambda:InvokeFunction',
+                'Resource': function_arn(region, index),
+                'Condition': {'ArnLike': {'AWS:SourceArn': f'arn:aws:execute-api:{region}:{ACCOUNT}:{api_id}/*'}},
+            }
+            for api_id in self.fixture.policies[index]
+        ]
+        return {'Policy': json.dumps({'Version': '2012-10-17', 'Statement': statements})}
+
+    # API Gateway v2 (HTTP APIs)
+
+    def _http_api(self, region, j):
+        default_cors = {'AllowOrigins': ['*']} if j % 2 == 0 else {}
+        api = {
+            'ApiId': f'h{j:04d}',
+            'Name': f'http-api-{j}',
+            'ProtocolType': 'HTTP',
+            'ApiEndpoint': f'https://h{j:04d}.execute-api.{region}.amazonaws.com',
+            'RouteSelectionExpression': '$request.method $request.path',
+        }
+        cors = self.api_cors.get((region, api['ApiId']), default_cors)
+        if cors:
+            api['CorsConfiguration'] = cors
+        return api
+
+    def _http_api_index(self, region, api_id):
+        if region not in self.fixture.populated or not api_id.startswith('h'):
+            raise NotFound(f'Invalid API identifier specified {api_id}')
+        j = int(api_id[1:])
+        if j >= self.fixture.http_apis:
+            raise NotFound(f'Invalid API identifier specified {api_id}')
+        return j
+
+    def _apigatewayv2_GetApis(self, region, params):
+        count = self.fixture.http_apis if region in self.fixture.populated else 0
+        start = int(params.get('NextToken') or 0)
+        end = min(start + 100, count)
+        response = {'Items': [self._http_api(region, j) for j in range(start, end)]}
+        if end < count:
+            response['NextToken'] = str(end)
+        return response
+
+    def _apigatewayv2_GetApi(self, region, params):
+        return self._http_api(region, self._http_api_index(region, params['ApiId']))
+
+    def _apigatewayv2_GetIntegrations(self, region, params):
+        j = self._http_api_index(region, params['ApiId'])
+        return {'Items': [
+            {
+                'IntegrationId': f'i{k}',
+                'IntegrationType': 'AWS_PROXY',
+                'IntegrationUri': integration_uri(region, index),
+                'PayloadFormatVersion': '2.0',
+            }
+            for k, index in enumerate(self.fixture.http_targets[j])
+        ]}
+
+    def _apigatewayv2_GetStages(self, region, params):
+        j = self._http_api_index(region, params['ApiId'])
+        # Even APIs are served from $default, odd ones only from a named stage
+        return {'Items': [{'StageName': '$default' if j % 2 == 0 else 'prod'}]}
+
+    def _apigatewayv2_UpdateApi(self, region, params):
+        j = self._http_api_index(region, params['ApiId'])
+        self.api_cors[(region, params['ApiId'])] = params.get('CorsConfiguration', {})
+        return self._http_api(region, j)
+
+    # API Gateway v1 (REST APIs)
+
+    def _rest_api_index(self, region, api_id):
+        if region not in self.fixture.populated or not api_id.startswith('r'):
+            raise NotFound(f'Invalid API identifier specified {api_id}')
+        j = int(api_id[1:])
+        if j >= self.fixture.rest_apis:
+            raise NotFound(f'Invalid API identifier specified {api_id}')
+        return j
+
+    def _rest_api(self, j):
+        return {'id': f'r{j:04d}', 'name': f'rest-api-{j}', 'endpointConfiguration': {'types': ['REGIONAL']}}
+
+    def _apigateway_GetRestApis(self, region, params):
+        count = self.fixture.rest_apis if region in self.fixture.populated else 0
+        start = int(params.get('position') or 0)
+        end = min(start + 25, count)
+        response = {'items': [self._rest_api(j) for j in range(start, end)]}
+        if end < count:
+            response['position'] = str(end)
+        return response
+
+    def _apigateway_GetRestApi(self, region, params):
+        return self._rest_api(self._rest_api_index(region, params['restApiId']))
+
+    def _apigateway_GetResources(self, region, params):
+        j = self._rest_api_index(region, params['restApiId'])
+        embed = 'methods' in (params.get('embed') or [])
+        items = [{'id': f'root{j}', 'path': '/'}]
+        for r, index in enumerate(self.fixture.rest_targets[j]):
+            methods = {'GET': {'httpMethod': 'GET'}}
+            if embed:
+                methods['GET']['methodIntegration'] = {'type': 'AWS_PROXY', 'uri': integration_uri(region, index)}
+            if r % 2 == 0:
+                methods['OPTIONS'] = {'httpMethod': 'OPTIONS'}
+            items.append({'id': f'res{j}x{r}', 'path': f'/items{r}', 'resourceMethods': methods})
+        return {'items': items}
+
+    def _apigateway_GetIntegration(self, region, params):
+        j = self._rest_api_index(region, params['restApiId'])
+        r = int(params['resourceId'].split('x', 1)[1])
+        return {'type': 'AWS_PROXY', 'uri': integration_uri(region, self.fixture.rest_targets[j][r])}
+
+    def _rest_definition(self, region, j):
+        """Swagger export of REST API j: GET on each resource, OPTIONS on every other one"""
+        paths = {'/': {}}
+        for r, index in enumerate(self.fixture.rest_targets[j]):
+            item = {'get': {
+                'responses': {},
+                'x-amazon-apigateway-integration': {
+                    'type': 'aws_proxy', 'httpMethod': 'POST', 'uri': integration_uri(region, index)
+                },
+            }}
+            if r % 2 == 0:
+                item['options'] = {
+                    'responses': {'200': {'description': '200 response'}},
+                    'x-amazon-apigateway-integration': {'type': 'mock', 'responses': {'default': {'statusCode': '200'}}},
+                }
+            paths[f'/items{r}'] = item
+        return {'swagger': '2.0', 'info': {'title': f'rest-api-{j}'}, 'paths': paths}
+
+    def _apigateway_GetStages(self, region, params):
+        self._rest_api_index(region, params['restApiId'])
+        return {'item': [{'stageName': 'prod', 'deploymentId': 'd0'}]}
+
+    def _apigateway_GetExport(self, region, params):
+        j = self._rest_api_index(region, params['restApiId'])
+        definition = self.rest_definitions.get((region, j)) or self._rest_definition(region, j)
+        return json.dumps(definition).encode()
+
+    def _apigateway_PutRestApi(self, region, params):
+        """Overwrite the working copy, or merge methods, models and gateway responses into it"""
+        j = self._rest_api_index(region, params['restApiId'])
+        body = json.loads(params['body'])
+        if params.get('mode') == 'merge':
+            definition = self.rest_definitions.get((region, j)) or self._rest_definition(region, j)
+            for path, item in body.get('paths', {}).items():
+                definition.setdefault('paths', {}).setdefault(path, {}).update(item)
+            for key in ('definitions', 'securityDefinitions', 'x-amazon-apigateway-gateway-responses'):
+                if key in body:
+                    definition.setdefault(key, {}).update(body[key])
+            body = definition
+        self.rest_put_bodies[(region, j)] = json.loads(params['body'])
+        self.rest_definitions[(region, j)] = body
+        return self._rest_api(j)
+
+    def _apigateway_CreateDeployment(self, region, params):
+        self._rest_api_index(region, params['restApiId'])
+        return {'id': 'd1'}
+
+    def _apigateway_UpdateStage(self, region, params):
+        self._rest_api_index(region, params['restApiId'])
+        return {'stageName': params['stageName'], 'deploymentId': 'd1'}
@@ -0,0 +1,258 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from .defaults import DEFAULT_REMAP_AGE, DEFAULT_TTL
+from .models import ApiLink, FunctionRecord
+
+REGIONS_TTL = 24 * 60 * 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS regions (
+    account TEXT PRIMARY KEY,
+    names TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS region_scans (
+    account TEXT NOT NULL,
+    region TEXT NOT NULL,
+    scanned_at REAL NOT NULL,
+    PRIMARY KEY (account, region)
+);
+CREATE TABLE IF NOT EXISTS region_remaps (
+    account TEXT NOT NULL,
+    region TEXT NOT NULL,
+    remapped_at REAL NOT NULL,
+    PRIMARY KEY (account, region)
+);
+CREATE TABLE IF NOT EXISTS functions (
+    account TEXT NOT NULL,
+    region TEXT NOT NULL,
+    function_arn TEXT NOT NULL,
+    function_name TEXT NOT NULL,
+    runtime TEXT,
+    last_modified TEXT,
+    code_sha256 TEXT,
+    has_url INTEGER NOT NULL,
+    url_cors_configured INTEGER NOT NULL,
+    url TEXT,
+    PRIMARY KEY (account, region, function_arn)
+);
+CREATE INDEX IF NOT EXISTS functions_by_name ON functions (account, function_name);
+CREATE TABLE IF NOT EXISTS apis (
+    account TEXT NOT NULL,
+    region TEXT NOT NULL,
+    api_type TEXT NOT NULL,
+    api_id TEXT NOT NULL,
+    api_name TEXT NOT NULL,
+    cors_configured INTEGER NOT NULL,
+    fingerprint TEXT NOT NULL,
+    lambda_arns TEXT NOT NULL,
+    PRIMARY KEY (account, region, api_type, api_id)
+);
+"""
+
+
+def default_cache_dir():
+    if os.environ.get('AWS_ASSISTANT_CACHE_DIR'):
+        return os.environ['AWS_ASSISTANT_CACHE_DIR']
+    if os.name == 'nt' and os.environ.get('LOCALAPPDATA'):
+        return os.path.join(os.environ['LOCALAPPDATA'], 'aws-assistant', 'Cache')
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'aws-assistant')
+
+
+class InventoryCache:
+    """On-disk inventory of one account's regions, functions and APIs.
+
+    Rows are keyed by (account, region, resource). A region scanned within
+    the TTL is served entirely from disk; older regions are refreshed
+    incrementally by the scanner using the stored LastModified/CodeSha256
+    and API fingerprints. Neither changes when an integration or a Function
+    URL's CORS does, so a region last looked up in full more than
+    remap_age seconds ago is looked up in full again.
+    """
+
+    def __init__(self, account, ttl=DEFAULT_TTL, path=None, remap_age=DEFAULT_REMAP_AGE):
+        if path is None:
+            cache_dir = default_cache_dir()
+            os.makedirs(cache_dir, exist_ok=True)
+            path = os.path.join(cache_dir, 'inventory.db')
+
+        self.account = account
+        self.ttl = ttl
+        self.remap_age = remap_age
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+
+    def close(self):
+        self._db.close()
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def get_regions(self):
+        rows = self._query(
+            "SELECT names, fetched_at FROM regions WHERE account = ?",
+            (self.account,)
+        )
+        if rows and time.time() - rows[0][1] < REGIONS_TTL:
+            return json.loads(rows[0][0])
+        return None
+
+    def put_regions(self, regions):
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO regions VALUES (?, ?, ?)",
+                (self.account, json.dumps(regions), time.time())
+            )
+
+    def region_is_fresh(self, region):
+        rows = self._query(
+            "SELECT scanned_at FROM region_scans WHERE account = ? AND region = ?",
+            (self.account, region)
+        )
+        return bool(rows) and time.time() - rows[0][0] < self.ttl
+
+    def region_needs_remap(self, region):
+        """Whether the region's cached URL state and API links are too old to reuse"""
+        rows = self._query(
+            "SELECT remapped_at FROM region_remaps WHERE account = ? AND region = ?",
+            (self.account, region)
+        )
+        return not rows or time.time() - rows[0][0] >= self.remap_age
+
+    def get_functions(self, region):
+        """Cached FunctionRecords for a region, keyed by FunctionArn"""
+        rows = self._query(
+            "SELECT function_arn, function_name, runtime, last_modified, code_sha256, "
+            "has_url, url_cors_configured, url FROM functions WHERE account = ? AND region = ?",
+            (self.account, region)
+        )
+        return {
+            row[0]: FunctionRecord(
+                region,
+                row[1],
+                row[0],
+                runtime=row[2],
+                last_modified=row[3],
+                code_sha256=row[4],
+                has_function_url=bool(row[5]),
+                function_url_cors_configured=bool(row[6]),
+                function_url=row[7]
+            )
+            for row in rows
+        }
+
+    def find_function_regions(self, function_name):
+        """Regions a previous scan saw function_name in, regardless of TTL"""
+        rows = self._query(
+            "SELECT DISTINCT region FROM functions WHERE account = ? AND function_name = ? ORDER BY region",
+            (self.account, function_name)
+        )
+        return [row[0] for row in rows]
+
+    def get_apis(self, region):
+        """Cached APIs for a region, keyed by (api_type, api_id)"""
+        rows = self._query(
+            "SELECT api_type, api_id, api_name, cors_configured, fingerprint, lambda_arns "
+            "FROM apis WHERE account = ? AND region = ?",
+            (self.account, region)
+        )
+        apis = {}
+        for api_type, api_id, api_name, cors_configured, fingerprint, lambda_arns in rows:
+            link = ApiLink(api_type, api_id, api_name, bool(cors_configured))
+            apis[(api_type, api_id)] = {
+                'name': api_name,
+                'fingerprint': fingerprint,
+                'links': [(arn, link) for arn in json.loads(lambda_arns)]
+            }
+        return apis
+
+    def get_api_mappings(self, region):
+        """Cached equivalent of get_api_gateway_lambda_mappings(region)"""
+        mappings = {}
+        for api in self.get_apis(region).values():
+            for lambda_arn, link in api['links']:
+                mappings.setdefault(lambda_arn, []).append(link)
+        return mappings
+
+    def load_region(self, region):
+        """Cached scan result for a region, in the shape scan_region returns"""
+        mappings = self.get_api_mappings(region)
+        functions = list(self.get_functions(region).values())
+        for function in functions:
+            function.api_gateways = tuple(mappings.get(function.function_arn, ()))
+        return functions
+
+    def store_region(self, region, functions, apis, remapped_at=None):
+        """Replace a region's rows with a fresh scan and mark it scanned.
+
+        apis is the dict built from scanner.iter_apis for the region.
+        remapped_at is when its URL state and API links were last looked up
+        in full; None keeps the previous time.
+        """
+        function_rows = [
+            (
+                self.account, region, f.function_arn, f.function_name,
+                f.runtime, f.last_modified, f.code_sha256,
+                int(f.has_function_url), int(f.function_url_cors_configured), f.function_url
+            )
+            for f in functions
+        ]
+        api_rows = []
+        for (api_type, api_id), api in apis.items():
+            links = api['links']
+            cors_configured = links[0][1].cors_configured if links else False
+            api_rows.append((
+                self.account, region, api_type, api_id, api['name'], int(cors_configured),
+                api['fingerprint'], json.dumps([arn for arn, link in links])
+            ))
+
+        with self._lock, self._db:
+            self._db.execute(
+                "DELETE FROM functions WHERE account = ? AND region = ?",
+                (self.account, region)
+            )
+            self._db.execute(
+                "DELETE FROM apis WHERE account = ? AND region = ?",
+                (self.account, region)
+            )
+            self._db.executemany(
+                "INSERT INTO functions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                function_rows
+            )
+            self._db.executemany(
+                "INSERT INTO apis VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                api_rows
+            )
+            self._db.execute(
+                "INSERT OR REPLACE INTO region_scans VALUES (?, ?, ?)",
+                (self.account, region, time.time())
+            )
+            if remapped_at is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO region_remaps VALUES (?, ?, ?)",
+                    (self.account, region, remapped_at)
+                )
+
+    def set_function_url_cors(self, region, function_name, cors_configured):
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE functions SET url_cors_configured = ? "
+                "WHERE account = ? AND region = ? AND function_name = ?",
+                (int(cors_configured), self.account, region, function_name)
+            )
+
+    def set_api_cors(self, region, api_type, api_id, cors_configured):
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE apis SET cors_configured = ? "
+                "WHERE account = ? AND region = ? AND api_type = ? AND api_id = ?",
+                (int(cors_configured), self.account, region, api_type, api_id)
+            )
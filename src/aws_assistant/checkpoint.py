@@ -0,0 +1,60 @@
+import hashlib
+import json
+import os
+import shutil
+
+from .cache import default_cache_dir
+from .output import function_from_record, inventory_record
+
+
+def checkpoint_key(settings):
+    """Digest of the scan settings; the same scan always gets the same checkpoint"""
+    payload = json.dumps(settings, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+class ScanCheckpoint:
+    """Per-region results of one scan, kept on disk until the scan completes.
+
+    Each region is written to <account>/<region>.json as soon as it has been
+    scanned, so an interrupted scan can be resumed by scanning only the
+    regions without a file. Failed regions are never written.
+    """
+
+    def __init__(self, settings, path=None):
+        if path is None:
+            path = os.path.join(default_cache_dir(), 'checkpoints', checkpoint_key(settings))
+        self.path = path
+
+    def exists(self):
+        return os.path.isdir(self.path)
+
+    def _region_path(self, account, region):
+        return os.path.join(self.path, account, f'{region}.json')
+
+    def completed_regions(self, account):
+        account_dir = os.path.join(self.path, account)
+        try:
+            names = os.listdir(account_dir)
+        except FileNotFoundError:
+            return set()
+        return {name[:-len('.json')] for name in names if name.endswith('.json')}
+
+    def load_region(self, account, region):
+        with open(self._region_path(account, region)) as f:
+            return [function_from_record(row) for row in json.load(f)]
+
+    def save_region(self, account, region, functions):
+        path = self._region_path(account, region)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        records = [inventory_record(function) for function in functions]
+
+        # Written aside and renamed, so an interrupted write never counts as done
+        partial = path + '.partial'
+        with open(partial, 'w') as f:
+            json.dump(records, f)
+        os.replace(partial, path)
+
+    def clear(self):
+        shutil.rmtree(self.path, ignore_errors=True)
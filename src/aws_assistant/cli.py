@@ -1,398 +1,849 @@
 import click
-from rich.console import Console
-from rich.table import Table
-from rich.panel import Panel
-import boto3
-from botocore.exceptions import ClientError, NoCredentialsError
 import os
 import json
+import fnmatch
+import sys
+import threading
 
-console = Console()
+from .defaults import (
+    DEFAULT_ACCOUNT_CONCURRENCY,
+    DEFAULT_CONCURRENCY,
+    DEFAULT_MAX_ATTEMPTS,
+    DEFAULT_PREFLIGHT_ATTEMPTS,
+    DEFAULT_PREFLIGHT_CONCURRENCY,
+    DEFAULT_PREFLIGHT_TIMEOUT,
+    DEFAULT_REFRESH_INTERVAL,
+    DEFAULT_TTL,
+)
+from .filters import FunctionFilter
+from .output import OUTPUT_FORMATS
+
+# boto3, botocore and rich are imported inside the commands that use them,
+# so --help and shell completion never pay for loading them
+
+class LazyConsole:
+    """A rich Console that is only created when something is printed"""
+    
+    def __init__(self, **kwargs):
+        self._kwargs = kwargs
+        self._console = None
+    
+    def resolve(self):
+        if self._console is None:
+            from rich.console import Console
+            self._console = Console(**self._kwargs)
+        return self._console
+    
+    def __getattr__(self, name):
+        return getattr(self.resolve(), name)
+
+console = LazyConsole()
 
 @click.group()
-def main():
+@click.option('--profile', default=None, help='AWS named profile to use (defaults to the standard credential chain)')
+def main(profile):
     """AWS Integration Assistant - Fix AWS problems with one command"""
-    pass
+    # Applied by configure_clients when a command first needs AWS
+
+def configure_clients(**settings):
+    """Point the shared client registry at --profile, with any connection settings"""
+    from .clients import registry
+    
+    profile = click.get_current_context().find_root().params.get('profile')
+    registry.configure(profile=profile, **settings)
+    return registry
 
-def detect_origins():
-    """Smart detection of allowed origins from project files"""
-    detected_origins = []
-    detection_source = None
+def detect_origins(start='.'):
+    """Origins found in the project start is in, each with the files that name it"""
+    from .cache import default_cache_dir
+    from .origins import OriginCache, detect_origins as detect_project_origins
     
-    if os.path.exists('package.json'):
+    return detect_project_origins(start, OriginCache(os.path.join(default_cache_dir(), 'origins.json')))
+
+def parse_rates(ctx, param, values):
+    """Parse repeated SERVICE[.OPERATION]=RPS options into a dict"""
+    rates = {}
+    for value in values:
+        key, sep, rate = value.partition('=')
         try:
-            with open('package.json', 'r') as f:
-                package_data = json.load(f)
-                if 'homepage' in package_data:
-                    detected_origins.append(package_data['homepage'])
-                    detection_source = 'package.json (homepage)'
-        except:
-            pass
+            rates[key.strip()] = float(rate)
+        except ValueError:
+            sep = ''
+        if not sep or not key.strip():
+            raise click.BadParameter(f"expected SERVICE[.OPERATION]=RPS, got '{value}'")
+    return rates
+
+def open_inventory_cache(ttl=DEFAULT_TTL, ui=console, account=None):
+    """Open the on-disk inventory for an account (the current one by default), or None if it is unavailable"""
+    import sqlite3
+    from .cache import InventoryCache
+    from .scanner import get_account_id
+    
+    try:
+        return InventoryCache(account or get_account_id(), ttl=ttl)
+    except (OSError, sqlite3.Error) as e:
+        ui.print(f"[dim]Inventory cache unavailable ({e}), continuing without it[/dim]")
+        return None
+
+def open_scan_checkpoint(settings, resume, ui=console):
+    """The checkpoint for a scan with these settings, or None if it cannot be written.
+    
+    Unless resuming, whatever an earlier run left in it is discarded.
+    """
+    from .checkpoint import ScanCheckpoint
+    
+    checkpoint = ScanCheckpoint(settings)
+    if not resume:
+        checkpoint.clear()
+    elif checkpoint.exists():
+        ui.print("[dim]Resuming the interrupted scan: regions it finished are read from its checkpoint[/dim]")
+    else:
+        ui.print("[yellow]No interrupted scan with these options to resume, starting a new one[/yellow]")
+    
+    try:
+        os.makedirs(checkpoint.path, exist_ok=True)
+    except OSError as e:
+        ui.print(f"[dim]Scan checkpoint unavailable ({e}), continuing without it[/dim]")
+        return None
+    return checkpoint
+
+def save_snapshot(path, functions, regions, caches, ui=console):
+    """Write scanned functions as a snapshot, with the API fingerprints of each account's inventory cache"""
+    from .snapshot import Snapshot, cached_api_entries
     
-    env_files = ['.env', '.env.local', '.env.production', '.env.development']
-    env_vars = [
-        'REACT_APP_URL',
-        'NEXT_PUBLIC_URL', 
-        'VITE_URL',
-        'VUE_APP_URL',
-        'PUBLIC_URL',
-        'APP_URL',
-        'FRONTEND_URL'
+    apis = []
+    for account, names in regions.items():
+        cache = caches.get(account)
+        if cache is not None:
+            for region in names:
+                apis.extend(cached_api_entries(cache, region))
+    
+    snapshot = Snapshot.from_functions(functions, regions, apis)
+    try:
+        snapshot.save(path)
+    except OSError as e:
+        ui.print(f"[red]Could not write the snapshot: {e}[/red]\n")
+        return
+    ui.print(f"[dim]Snapshot of {len(snapshot.functions)} functions written to {path}[/dim]\n")
+
+def discover_regions(cache=None, refresh=False, profile=None):
+    from .clients import get_client
+    
+    regions = cache.get_regions() if cache is not None and not refresh else None
+    
+    if regions is None:
+        ec2_client = get_client('ec2', 'us-east-1', profile)
+        regions_response = ec2_client.describe_regions()
+        regions = [region['RegionName'] for region in regions_response['Regions']]
+        if cache is not None:
+            cache.put_regions(regions)
+    
+    return regions
+
+trace_calls_option = click.option(
+    '--trace-calls',
+    type=click.Choice(['table', 'json']),
+    is_flag=False,
+    flag_value='table',
+    default=None,
+    help='Report every AWS call by service, operation and region: counts, latency, retries and errors (table, or json)'
+)
+
+def start_call_trace(trace_calls, ui=console):
+    """Reset the call tracer and report it, and any ignored errors, when the command finishes"""
+    from .report import print_call_trace
+    from .tracing import tracer
+    
+    tracer.reset(enabled=trace_calls is not None)
+    
+    def report():
+        if trace_calls == 'json':
+            click.echo(json.dumps(tracer.to_dict(), indent=2), err=ui.stderr)
+        elif trace_calls == 'table':
+            print_call_trace(ui, tracer)
+        elif tracer.total_ignored():
+            ui.print(f"[yellow]{tracer.total_ignored()} AWS errors were ignored while reading functions and APIs; run with --trace-calls to see them[/yellow]\n")
+    
+    click.get_current_context().call_on_close(report)
+
+def parse_name_list(ctx, param, value):
+    """Split a comma-separated option value into names"""
+    if not value:
+        return []
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+def read_role_arns(path):
+    """Role ARNs from a file, one per line; blank lines and # comments are skipped"""
+    role_arns = []
+    with open(path) as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if line:
+                if not line.startswith('arn:'):
+                    raise click.BadParameter(f"not a role ARN: '{line}'", param_hint="'--assume-role-arns'")
+                role_arns.append(line)
+    return role_arns
+
+def select_regions(regions, include, exclude, ui=console):
+    """Regions matching any --regions pattern (all if none) and no --exclude-regions pattern"""
+    for pattern in include:
+        if not any(fnmatch.fnmatchcase(region, pattern) for region in regions):
+            ui.print(f"[yellow]Warning: --regions {pattern} matches no enabled region[/yellow]")
+    
+    return [
+        region for region in regions
+        if (not include or any(fnmatch.fnmatchcase(region, pattern) for pattern in include))
+        and not any(fnmatch.fnmatchcase(region, pattern) for pattern in exclude)
     ]
+
+def connect_daemon(regions=(), ui=console, profile=None):
+    """A client for a ready `serve` of profile (the current one by default) covering regions, or None"""
+    from .clients import registry
+    from .daemon import DaemonClient
+    
+    daemon = DaemonClient.connect(profile or registry.default_profile)
+    if daemon is None or not daemon.status['ready'] or not daemon.covers(regions):
+        return None
+    ui.print(f"[dim]Using the inventory kept by aws-assistant serve (account {daemon.account})[/dim]")
+    return daemon
+
+def notify_daemon(regions):
+    """Have a running `serve` rescan regions whose CORS settings were just changed"""
+    from .clients import registry
+    from .daemon import DaemonClient, DaemonError
     
-    for env_file in env_files:
-        if os.path.exists(env_file):
-            try:
-                with open(env_file, 'r') as f:
-                    for line in f:
-                        line = line.strip()
-                        if line and not line.startswith('#'):
-                            for var in env_vars:
-                                if line.startswith(f'{var}='):
-                                    url = line.split('=', 1)[1].strip().strip('"').strip("'")
-                                    if url and url not in detected_origins:
-                                        detected_origins.append(url)
-                                        detection_source = f'{env_file} ({var})'
-            except:
-                pass
-    
-    for var in env_vars:
-        if var in os.environ:
-            url = os.environ[var]
-            if url and url not in detected_origins:
-                detected_origins.append(url)
-                detection_source = f'environment variable ({var})'
-    
-    if os.path.exists('vercel.json'):
+    daemon = DaemonClient.connect(registry.default_profile)
+    if daemon is not None and regions:
         try:
-            with open('vercel.json', 'r') as f:
-                vercel_data = json.load(f)
-                if 'env' in vercel_data and 'NEXT_PUBLIC_URL' in vercel_data['env']:
-                    url = vercel_data['env']['NEXT_PUBLIC_URL']
-                    if url and url not in detected_origins:
-                        detected_origins.append(url)
-                        detection_source = 'vercel.json'
-        except:
+            daemon.request_refresh(sorted(regions))
+        except DaemonError:
             pass
-    
-    return detected_origins, detection_source
 
-def check_function_url_and_cors(lambda_client, function_name, region):
-    try:
-        response = lambda_client.get_function_url_config(FunctionName=function_name)
-        function_url = response.get('FunctionUrl', '')
-        cors_config = response.get('Cors', {})
-        allow_origins = cors_config.get('AllowOrigins', [])
-        
-        if allow_origins:
-            return (True, True, function_url)
-        else:
-            return (True, False, function_url)
-            
-    except ClientError as e:
-        error_code = e.response['Error']['Code']
-        if error_code == 'ResourceNotFoundException':
-            return (False, False, None)
+def daemon_scan_results(daemon, source, include_regions, exclude_regions, function_filter, region_count, ui=console):
+    """The (source, account, region, functions, error) results of scan_accounts, answered by the daemon"""
+    from .daemon import DaemonError
+    
+    regions = select_regions(daemon.status['regions'], include_regions, exclude_regions, ui)
+    region_count['total'] = len(regions)
+    if not regions:
+        return
+    
+    functions, errors = daemon.functions(regions, function_filter)
+    for region in regions:
+        if region in errors:
+            yield source, daemon.account, region, [], DaemonError(errors[region])
         else:
-            return (False, False, None)
+            yield source, daemon.account, region, functions.get(region, []), None
 
-def get_api_gateway_lambda_mappings(region):
-    mappings = {}
+def error_message(error):
+    from botocore.exceptions import ClientError
     
-    try:
-        apigw2_client = boto3.client('apigatewayv2', region_name=region)
-        
-        apis_response = apigw2_client.get_apis()
-        http_apis = apis_response.get('Items', [])
-        
-        for api in http_apis:
-            api_id = api['ApiId']
-            api_name = api['Name']
-            cors_config = api.get('CorsConfiguration', {})
-            has_cors = bool(cors_config.get('AllowOrigins'))
-            
-            try:
-                integrations_response = apigw2_client.get_integrations(ApiId=api_id)
-                
-                for integration in integrations_response.get('Items', []):
-                    integration_uri = integration.get('IntegrationUri', '')
-                    
-                    if integration_uri and 'lambda' in integration_uri.lower():
-                        lambda_arn = None
-                        
-                        if 'arn:aws:lambda' in integration_uri:
-                            parts = integration_uri.split('/')
-                            for part in parts:
-                                if part.startswith('arn:aws:lambda'):
-                                    lambda_arn = part
-                                    break
-                        
-                        if lambda_arn:
-                            base_arn = lambda_arn.split(':invocations')[0]
-                            base_arn = base_arn.split(':$')[0]
-                            base_arn = base_arn.split(':alias')[0]
-                            
-                            if base_arn not in mappings:
-                                mappings[base_arn] = []
-                            
-                            mappings[base_arn].append({
-                                'type': 'HTTP API',
-                                'api_id': api_id,
-                                'api_name': api_name,
-                                'cors_configured': has_cors
-                            })
-                            
-            except Exception as e:
-                pass
-                
-    except Exception as e:
-        pass
+    if isinstance(error, ClientError):
+        return error.response['Error']['Message']
+    return str(error) or type(error).__name__
+
+@main.command()
+@click.option('--concurrency', type=click.IntRange(min=1), default=DEFAULT_CONCURRENCY, show_default=True, help='Number of regions (and Function URL lookups per region) to scan in parallel in each account')
+@click.option('--refresh', is_flag=True, help='Ignore the inventory cache and rediscover everything')
+@click.option('--cache-ttl', type=click.IntRange(min=0), default=DEFAULT_TTL, show_default=True, help='Seconds a region\'s cached inventory is reused without checking AWS')
+@click.option('--rate', 'rates', multiple=True, callback=parse_rates, metavar='SERVICE[.OPERATION]=RPS', help='Request rate limit per account and region, e.g. apigateway=5 or lambda.ListFunctionUrlConfigs=10 (can specify multiple)')
+@click.option('--max-attempts', type=click.IntRange(min=1), default=DEFAULT_MAX_ATTEMPTS, show_default=True, help='Attempts per AWS call, including retries with backoff when throttled')
+@click.option('--stream', is_flag=True, help='Show each region\'s functions as soon as the region finishes, with live totals')
+@click.option('--output', type=click.Choice(OUTPUT_FORMATS), default='table', show_default=True, help='Table for people, or one record per function as JSON Lines, a JSON array or CSV on stdout')
+@click.option('--profiles', callback=parse_name_list, metavar='NAME,NAME,...', help='Scan several accounts, one per named profile')
+@click.option('--assume-role-arns', 'role_arns_file', type=click.Path(exists=True, dir_okay=False), default=None, help='Scan several accounts by assuming each role ARN listed in this file (one per line)')
+@click.option('--regions', 'include_regions', callback=parse_name_list, metavar='REGION,REGION,...', help='Only scan these regions; globs like eu-* are allowed')
+@click.option('--exclude-regions', callback=parse_name_list, metavar='REGION,REGION,...', help='Skip these regions; globs like ap-* are allowed')
+@click.option('--name', 'names', multiple=True, help='Only functions whose name matches this glob, e.g. \'orders-*\' (can specify multiple)')
+@click.option('--runtime', 'runtimes', multiple=True, help='Only functions on this runtime, e.g. python3.12 or \'nodejs*\' (can specify multiple)')
+@click.option('--only-public', is_flag=True, help='Only functions with a Function URL or behind API Gateway')
+@click.option('--only-misconfigured', is_flag=True, help='Only public functions with a URL or API that has no CORS configured')
+@click.option('--account-concurrency', type=click.IntRange(min=1), default=DEFAULT_ACCOUNT_CONCURRENCY, show_default=True, help='Number of accounts to scan in parallel')
+@click.option('--resume', is_flag=True, help='Finish an interrupted scan run with the same options: only regions it did not complete are scanned')
+@click.option('--snapshot', 'snapshot_path', type=click.Path(dir_okay=False), default=None, help='Also save the inventory to this file for aws-assistant diff (gzipped if it ends in .gz)')
+@trace_calls_option
+def scan(concurrency, refresh, cache_ttl, rates, max_attempts, stream, output, profiles, role_arns_file, include_regions, exclude_regions,
+         names, runtimes, only_public, only_misconfigured, account_concurrency, resume, snapshot_path, trace_calls):
+    """Scan your AWS account for Lambda functions and check CORS status"""
+    from botocore.exceptions import ClientError, NoCredentialsError
+    from rich.console import Console
+    from rich.live import Live
+    from .output import function_record, open_record_writer
+    from .report import ScanSummary, function_row, new_functions_table, print_account_summaries
+    from .scanner import get_account_id, is_opt_in_error, scan_accounts
+    from .throttling import limiter, retry_stats
+    
+    # Machine-readable output owns stdout; progress and summary go to stderr
+    ui = console.resolve() if output == 'table' else Console(stderr=True)
+    start_call_trace(trace_calls, ui)
+    # Every worker may hold a connection to the same regional endpoint
+    registry = configure_clients(max_pool_connections=concurrency, max_attempts=max_attempts)
+    
+    # A source is a profile name, a role ARN, or None for the default credentials
+    sources = list(profiles)
+    if role_arns_file:
+        sources.extend(read_role_arns(role_arns_file))
+    if not sources:
+        sources = [registry.default_profile]
+    multi_account = len(sources) > 1
+    
+    function_filter = FunctionFilter(names, runtimes, only_public, only_misconfigured)
+    if not function_filter.active:
+        function_filter = None
+    elif snapshot_path:
+        raise click.UsageError("--snapshot records whole regions and cannot be combined with --name, --runtime, --only-public or --only-misconfigured")
+    
+    if multi_account:
+        ui.print(f"\n[bold blue]Scanning {len(sources)} AWS accounts for Lambda functions in all regions...[/bold blue]\n")
+    else:
+        ui.print("\n[bold blue]Scanning your AWS account for Lambda functions in all regions...[/bold blue]\n")
     
     try:
-        apigw_client = boto3.client('apigateway', region_name=region)
+        limiter.configure(rates)
+        retry_stats.reset()
         
-        apis_response = apigw_client.get_rest_apis()
-        rest_apis = apis_response.get('items', [])
+        region_count = {'total': 0}
+        region_count_lock = threading.Lock()
+        caches = {}
         
-        for api in rest_apis:
-            api_id = api['id']
-            api_name = api['name']
+        def prepare(source):
+            if source and source.startswith('arn:'):
+                profile = registry.assume_role(source, registry.default_profile)
+            else:
+                profile = source
+            account = get_account_id(profile)
             
-            has_cors = False
+            if not multi_account:
+                ui.print("[dim]Discovering available regions...[/dim]")
+            cache = open_inventory_cache(cache_ttl, ui, account)
+            regions = select_regions(discover_regions(cache, refresh, profile), include_regions, exclude_regions, ui)
             
-            try:
-                resources_response = apigw_client.get_resources(restApiId=api_id)
-                
-                for resource in resources_response.get('items', []):
-                    resource_id = resource['id']
-                    methods = resource.get('resourceMethods', {})
-                    
-                    if 'OPTIONS' in methods:
-                        has_cors = True
-                    
-                    for method in methods.keys():
-                        if method == 'OPTIONS':
-                            continue
-                            
-                        try:
-                            integration = apigw_client.get_integration(
-                                restApiId=api_id,
-                                resourceId=resource_id,
-                                httpMethod=method
-                            )
-                            
-                            integration_uri = integration.get('uri', '')
-                            
-                            if integration_uri and 'lambda' in integration_uri.lower():
-                                lambda_arn = None
-                                
-                                if 'arn:aws:lambda' in integration_uri:
-                                    parts = integration_uri.split('/')
-                                    for part in parts:
-                                        if part.startswith('arn:aws:lambda'):
-                                            lambda_arn = part
-                                            break
-                                
-                                if lambda_arn:
-                                    base_arn = lambda_arn.split(':invocations')[0]
-                                    base_arn = base_arn.split(':$')[0]
-                                    base_arn = base_arn.split(':alias')[0]
-                                    
-                                    if base_arn not in mappings:
-                                        mappings[base_arn] = []
-                                    
-                                    if not any(m['api_id'] == api_id for m in mappings[base_arn]):
-                                        mappings[base_arn].append({
-                                            'type': 'REST API',
-                                            'api_id': api_id,
-                                            'api_name': api_name,
-                                            'cors_configured': has_cors
-                                        })
-                                        
-                        except Exception as e:
-                            pass
-                            
-            except Exception as e:
-                pass
-                
-    except Exception as e:
-        pass
-    
-    return mappings
-
-@main.command()
-def scan():
-    """Scan your AWS account for Lambda functions and check CORS status"""
-    console.print("\n[bold blue]Scanning your AWS account for Lambda functions in all regions...[/bold blue]\n")
-    
-    try:
-        console.print("[dim]Discovering available regions...[/dim]")
-        ec2_client = boto3.client('ec2', region_name='us-east-1')
-        regions_response = ec2_client.describe_regions()
-        all_regions = [region['RegionName'] for region in regions_response['Regions']]
+            if multi_account:
+                ui.print(f"[dim]{source}: account {account}, {len(regions)} regions[/dim]")
+            else:
+                ui.print(f"[dim]Found {len(regions)} regions to scan (concurrency: {concurrency})[/dim]\n")
+            
+            with region_count_lock:
+                region_count['total'] += len(regions)
+                caches[account] = cache
+            return profile, account, regions, cache
         
-        console.print(f"[dim]Found {len(all_regions)} regions to scan[/dim]\n")
+        # A daemon serves one profile's account; an assumed role is never one of them
+        daemon = None
+        if not multi_account and not refresh and not resume and not (sources[0] or '').startswith('arn:'):
+            daemon = connect_daemon(include_regions, ui, sources[0])
         
+        checkpoint = None
+        if daemon is None:
+            checkpoint = open_scan_checkpoint({
+                'sources': sources,
+                'regions': include_regions,
+                'exclude_regions': exclude_regions,
+                'filter': [names, runtimes, only_public, only_misconfigured],
+            }, resume, ui)
+        
+        summary = ScanSummary()
+        accounts = {source: [None, ScanSummary(), None] for source in sources}
         all_functions = []
+        snapshot_functions = []
+        snapshot_regions = {}
+        scanned = 0
+        unfinished = 0
+        aborted = None
+        live = None
+        writer = None
         
-        for region in all_regions:
-            console.print(f"[dim]Scanning {region}...[/dim]", end="\r")
-            
-            try:
-                lambda_client = boto3.client('lambda', region_name=region)
+        if output != 'table':
+            writer = open_record_writer(output, sys.stdout)
+        elif stream:
+            live = Live(summary.progress(0, 0), console=ui, refresh_per_second=4, transient=True)
+            live.start()
+        
+        if daemon is not None:
+            results = daemon_scan_results(daemon, sources[0], include_regions, exclude_regions, function_filter, region_count, ui)
+        else:
+            results = scan_accounts(sources, prepare, concurrency, account_concurrency, refresh, function_filter, checkpoint)
+        try:
+            for source, account, region, functions, error in results:
+                accounts[source][0] = account
                 
-                api_mappings = get_api_gateway_lambda_mappings(region)
+                if region is None:
+                    # The whole account failed; the others carry on
+                    if not multi_account:
+                        raise error
+                    accounts[source][2] = error_message(error)
+                    unfinished += 1
+                    ui.print(f"\n[yellow]Warning: Could not scan account {source}: {error_message(error)}[/yellow]")
+                    continue
                 
-                response = lambda_client.list_functions()
-                functions = response.get('Functions', [])
+                scanned += 1
+                label = f"{account} {region}" if multi_account else region
+                if live is None:
+                    ui.print(f"[dim]Scanned {label} ({scanned}/{region_count['total']})...[/dim]", end="\r")
                 
-                for function in functions:
-                    function['Region'] = region
-                    function_arn = function['FunctionArn']
-                    
-                    has_url, cors_configured, url = check_function_url_and_cors(
-                        lambda_client, 
-                        function['FunctionName'],
-                        region
-                    )
-                    
-                    function['HasFunctionUrl'] = has_url
-                    function['FunctionUrlCorsConfigured'] = cors_configured
-                    function['FunctionUrl'] = url
-                    
-                    function['ApiGateways'] = api_mappings.get(function_arn, [])
-                    function['HasApiGateway'] = len(function['ApiGateways']) > 0
-                    
-                    all_functions.append(function)
+                if error is None and snapshot_path:
+                    snapshot_regions.setdefault(account, []).append(region)
+                    snapshot_functions.extend(functions)
+                
+                if error is not None:
+                    if not is_opt_in_error(error):
+                        unfinished += 1
+                        ui.print(f"\n[yellow]Warning: Could not scan {label}: {error_message(error)}[/yellow]")
+                elif functions:
+                    for function in functions:
+                        summary.add(function)
+                        accounts[source][1].add(function)
                     
-            except ClientError as e:
-                if 'OptInRequired' in str(e):
-                    continue
-                else:
-                    console.print(f"\n[yellow]Warning: Could not scan {region}: {e.response['Error']['Message']}[/yellow]")
+                    if writer is not None:
+                        for function in functions:
+                            writer.write(function_record(function))
+                        writer.flush()
+                    elif live is not None:
+                        functions.sort(key=lambda x: x.function_name)
+                        table = new_functions_table(f"{label} ({len(functions)} functions)", multi_account)
+                        for function in functions:
+                            table.add_row(*function_row(function, multi_account))
+                        live.console.print(table)
+                    else:
+                        all_functions.extend(functions)
+                
+                if live is not None:
+                    live.update(summary.progress(scanned, region_count['total']))
+        except (Exception, KeyboardInterrupt) as e:
+            # Whatever was collected is still reported below
+            aborted = e
+        finally:
+            # Lets the regions in flight finish and cancels the rest
+            results.close()
+            if live is not None:
+                live.stop()
+            if writer is not None:
+                writer.close()
         
-        console.print(" " * 50, end="\r")
+        if live is None:
+            ui.print(" " * 50, end="\r")
         
-        if not all_functions:
-            console.print("[yellow]No Lambda functions found in any region.[/yellow]")
-            console.print("\n[dim]Tip: Create a Lambda function in the AWS Console first, then run this command again.[/dim]\n")
+        if checkpoint is not None:
+            if aborted is None and not unfinished:
+                checkpoint.clear()
+            else:
+                click.get_current_context().call_on_close(lambda: ui.print(
+                    "[yellow]Run the same scan with --resume to scan only the regions that did not finish[/yellow]\n"
+                ))
+        
+        if snapshot_path:
+            if aborted is None and not unfinished:
+                save_snapshot(snapshot_path, snapshot_functions, snapshot_regions, caches, ui)
+            else:
+                # A partial inventory would show every function it missed as removed
+                ui.print("[yellow]Snapshot not written: the scan did not complete[/yellow]\n")
+        
+        if aborted is not None:
+            if isinstance(aborted, KeyboardInterrupt):
+                ui.print(f"\n[yellow]Scan interrupted after {scanned} of {region_count['total']} regions; showing partial results[/yellow]")
+            elif summary.total:
+                ui.print(f"\n[yellow]Scan stopped after {scanned} of {region_count['total']} regions; showing partial results[/yellow]")
+            if not summary.total:
+                if isinstance(aborted, KeyboardInterrupt):
+                    return
+                raise aborted
+        
+        if not summary.total:
+            if function_filter is not None:
+                ui.print("[yellow]No Lambda functions match the filters.[/yellow]\n")
+            else:
+                ui.print("[yellow]No Lambda functions found in any region.[/yellow]")
+                ui.print("\n[dim]Tip: Create a Lambda function in the AWS Console first, then run this command again.[/dim]\n")
+            if multi_account:
+                print_account_summaries(ui, accounts)
             return
         
-        table = Table(title=f"Lambda Functions (Found in {len(set(f['Region'] for f in all_functions))} regions)")
-        table.add_column("Function Name", style="cyan", no_wrap=True)
-        table.add_column("Region", style="blue")
-        table.add_column("Runtime", style="magenta")
-        table.add_column("Access Type", style="yellow")
-        table.add_column("CORS Status", style="white")
+        if live is None and writer is None:
+            if multi_account:
+                title = f"Lambda Functions (Found in {len(summary.regions)} regions across {len(sources)} accounts)"
+            else:
+                title = f"Lambda Functions (Found in {len(summary.regions)} regions)"
+            table = new_functions_table(title, multi_account)
+            
+            all_functions.sort(key=lambda x: (x.account or '', x.region, x.function_name))
+            
+            for function in all_functions:
+                table.add_row(*function_row(function, multi_account))
+            
+            ui.print(table)
+        
+        if multi_account:
+            print_account_summaries(ui, accounts)
+        
+        summary.print(ui)
+        
+        retries = retry_stats.total_retries()
+        throttled_failures = retry_stats.total_throttled_failures()
+        if retries or throttled_failures:
+            ui.print(f"   API retries: {retries} ({throttled_failures} calls still throttled after retrying)")
+        ui.print()
+        
+        if aborted is not None and not isinstance(aborted, KeyboardInterrupt):
+            raise aborted
         
-        all_functions.sort(key=lambda x: (x['Region'], x['FunctionName']))
+    except NoCredentialsError:
+        ui.print("\n[red]Error: No AWS credentials found[/red]")
+        ui.print("\n[yellow]Please set up your AWS credentials.[/yellow]\n")
+    
+    except ClientError as e:
+        ui.print(f"\n[red]AWS Error: {e.response['Error']['Message']}[/red]\n")
+    
+    except Exception as e:
+        ui.print(f"\n[red]Unexpected error: {str(e)}[/red]\n")
+
+def choose_allow_origins(origin, wildcard):
+    """Origins from --origin/--wildcard, or detected from the project with a prompt"""
+    if origin:
+        allow_origins = list(origin)
+        console.print(f"[bold]Using specified origins:[/bold]")
+        for orig in allow_origins:
+            console.print(f"   {orig}")
+        console.print()
+    elif wildcard:
+        allow_origins = ['*']
+        console.print("[yellow bold]Using wildcard origin (*)[/yellow bold]")
+        console.print("[yellow]This allows ANY website to access your API[/yellow]")
+        console.print("[yellow]Recommended for development only![/yellow]\n")
+    else:
+        console.print("[bold]Detecting origins from your project...[/bold]\n")
+        detected = detect_origins()
+        detected_origins = [orig for orig, sources in detected]
         
-        for function in all_functions:
-            name = function['FunctionName']
-            region = function['Region']
-            runtime = function['Runtime']
+        if detected_origins:
+            console.print(f"[green]Found {len(detected_origins)} origin(s) in your project:[/green]")
+            for orig, sources in detected:
+                console.print(f"   [cyan]{orig}[/cyan]  [dim]{', '.join(sources)}[/dim]")
+            console.print()
             
-            access_types = []
-            cors_statuses = []
+            use_detected = click.confirm("Use these origins?" if len(detected_origins) > 1 else "Use this origin?", default=True)
             
-            if function['HasFunctionUrl']:
-                access_types.append("Function URL")
-                if function['FunctionUrlCorsConfigured']:
-                    cors_statuses.append("[green]CONFIGURED[/green]")
-                else:
-                    cors_statuses.append("[red]NOT CONFIGURED[/red]")
+            if use_detected:
+                allow_origins = detected_origins
+            else:
+                console.print("\n[dim]Enter the origin URL for your frontend app[/dim]")
+                console.print("[dim]Examples: https://myapp.com, http://localhost:3000[/dim]\n")
+                manual_origin = click.prompt("Origin URL")
+                allow_origins = [manual_origin]
+                
+                if click.confirm("Add more origins?", default=False):
+                    while True:
+                        additional = click.prompt("Additional origin URL (or press Enter to finish)", default="", show_default=False)
+                        if not additional:
+                            break
+                        allow_origins.append(additional)
+        else:
+            console.print("[yellow]No origin detected in project files[/yellow]")
+            console.print("\n[dim]Common options:[/dim]")
+            console.print("[dim]  http://localhost:3000  (React development)[/dim]")
+            console.print("[dim]  http://localhost:5173  (Vite development)[/dim]")
+            console.print("[dim]  https://myapp.com      (Production)[/dim]")
+            console.print("[dim]  *                      (All origins - development only!)[/dim]\n")
             
-            if function['HasApiGateway']:
-                for api in function['ApiGateways']:
-                    access_types.append(f"{api['type']}")
-                    if api['cors_configured']:
-                        cors_statuses.append(f"[green]{api['api_name'][:15]}[/green]")
-                    else:
-                        cors_statuses.append(f"[red]{api['api_name'][:15]}[/red]")
+            origin_choice = click.prompt(
+                "Select an option",
+                type=click.Choice(['localhost:3000', 'localhost:5173', 'custom', 'wildcard']),
+                default='localhost:3000'
+            )
             
-            if not access_types:
-                access_type = "[yellow]Private[/yellow]"
-                cors_status = "[dim]N/A[/dim]"
+            if origin_choice == 'localhost:3000':
+                allow_origins = ['http://localhost:3000']
+            elif origin_choice == 'localhost:5173':
+                allow_origins = ['http://localhost:5173']
+            elif origin_choice == 'wildcard':
+                allow_origins = ['*']
+                console.print("\n[yellow]Warning: Wildcard allows ANY site to access your API[/yellow]")
             else:
-                access_type = ", ".join(access_types)
-                cors_status = " | ".join(cors_statuses)
+                manual_origin = click.prompt("Enter origin URL")
+                allow_origins = [manual_origin]
             
-            table.add_row(name, region, runtime, access_type, cors_status)
-        
-        console.print(table)
-        
-        total = len(all_functions)
-        with_function_url = sum(1 for f in all_functions if f['HasFunctionUrl'])
-        with_api_gateway = sum(1 for f in all_functions if f['HasApiGateway'])
-        with_function_url_cors = sum(1 for f in all_functions if f['HasFunctionUrl'] and f['FunctionUrlCorsConfigured'])
-        with_api_gateway_cors = sum(1 for f in all_functions if f['HasApiGateway'] and any(api['cors_configured'] for api in f['ApiGateways']))
+            console.print()
         
-        console.print(f"\n[bold]Summary:[/bold]")
-        console.print(f"   Total functions: {total}")
-        console.print(f"   With Function URLs: {with_function_url} ({with_function_url_cors} with CORS)")
-        console.print(f"   Behind API Gateway: {with_api_gateway} ({with_api_gateway_cors} with CORS)")
+        console.print(f"[bold green]Will configure CORS for:[/bold green]")
+        for orig in allow_origins:
+            console.print(f"   {orig}")
         console.print()
+    
+    return allow_origins
+
+def read_current_cors(cors_targets, cors_config, concurrency):
+    """Diff each target against cors_config; returns {target.key: error message} for unreadable ones"""
+    from botocore.exceptions import ClientError
+    from .cors import diff_cors_plan
+    
+    read_errors = {}
+    for cors_target, error in diff_cors_plan(cors_targets, cors_config, concurrency):
+        if error is not None:
+            if isinstance(error, ClientError):
+                read_errors[cors_target.key] = error.response['Error']['Message']
+            else:
+                read_errors[cors_target.key] = str(error)
+    return read_errors
+
+def print_cors_changes(cors_targets, read_errors):
+    """Table of what a write would change on each target"""
+    from rich.table import Table
+    from .cors import format_cors_value
+    
+    table = Table(title="CORS changes")
+    table.add_column("Target", style="yellow")
+    table.add_column("Name", style="cyan")
+    table.add_column("Region", style="blue")
+    table.add_column("Change", style="white")
+    
+    for cors_target in cors_targets:
+        if cors_target.key in read_errors:
+            change = f"[red]Could not read current settings: {read_errors[cors_target.key]}[/red]"
+        elif cors_target.changes is None:
+            change = "[yellow]Manual configuration required[/yellow]"
+        elif not cors_target.changes:
+            change = "[dim]No change[/dim]"
+        else:
+            change = "\n".join(
+                f"{field}: [red]{format_cors_value(current)}[/red] -> [green]{format_cors_value(desired)}[/green]"
+                for field, current, desired in cors_target.changes
+            )
+        table.add_row(cors_target.kind, cors_target.name, cors_target.region, change)
+    
+    console.print(table)
+    console.print()
+
+def collect_functions(region, cache, refresh, concurrency, daemon=None, ui=console, patterns=()):
+    """Functions in region, or in all regions, whose name matches a pattern (any if none).
+
+    The patterns are pushed down to the scan, so other functions cost no
+    calls beyond the listing. Comes from the daemon when one is given.
+    """
+    from .scanner import scan_regions
+    
+    function_filter = FunctionFilter(patterns) if patterns else None
+    if daemon is not None:
+        daemon_functions, errors = daemon.functions([region] if region else (), function_filter)
+        for failed_region, message in sorted(errors.items()):
+            if 'OptInRequired' not in message:
+                ui.print(f"[yellow]Warning: Could not scan {failed_region}: {message}[/yellow]")
+        return [f for region_functions in daemon_functions.values() for f in region_functions]
+    
+    regions = [region] if region else discover_regions(cache, refresh)
+    ui.print(f"[dim]Collecting functions from {len(regions)} regions...[/dim]")
+    functions = []
+    for scanned_region, region_functions, error in scan_regions(regions, concurrency, cache, refresh,
+                                                                 function_filter=function_filter):
+        if error is not None:
+            if 'OptInRequired' not in str(error):
+                ui.print(f"[yellow]Warning: Could not scan {scanned_region}: {error_message(error)}[/yellow]")
+            continue
+        functions.extend(region_functions)
+    return functions
+
+def match_functions(functions, region, patterns):
+    """Functions in region (any if None) whose name matches a pattern (any if none)"""
+    if region:
+        functions = [f for f in functions if f.region == region]
+    if patterns:
+        functions = [
+            f for f in functions
+            if any(fnmatch.fnmatchcase(f.function_name, pattern) for pattern in patterns)
+        ]
+    return functions
+
+def run_preflight_checks(plan, function_urls, origins, concurrency=DEFAULT_PREFLIGHT_CONCURRENCY,
+                         attempts=DEFAULT_PREFLIGHT_ATTEMPTS, timeout=DEFAULT_PREFLIGHT_TIMEOUT, extra_checks=(), ui=console):
+    """(results, skipped) of sending preflights to each target of plan and to extra_checks"""
+    from .preflight import preflight_checks, verify_preflights
+    
+    checks, skipped = preflight_checks(plan, function_urls, origins, concurrency)
+    checks.extend(extra_checks)
+    
+    if checks:
+        retrying = f", retrying failures up to {attempts} times while changes propagate" if attempts > 1 else ""
+        ui.print(f"[dim]Sending CORS preflights to {len(checks)} endpoints{retrying}...[/dim]")
+    return verify_preflights(checks, concurrency, attempts, timeout), skipped
+
+@main.command()
+@click.argument('function_names', nargs=-1, metavar='[FUNCTION_NAME]...')
+@click.option('--match', multiple=True, help='Check every function whose name matches this glob, e.g. \'orders-*\' (can specify multiple)')
+@click.option('--region', default=None, help='AWS region (defaults to all regions)')
+@click.option('--target', type=click.Choice(['url', 'api', 'all']), default='all', show_default=True, help='What to check: url (Function URL), api (API Gateway), or all')
+@click.option('--origin', multiple=True, help='Send preflights from these origins instead of the ones each endpoint is configured with (can specify multiple)')
+@click.option('--url', 'urls', multiple=True, help='Also check this endpoint URL, e.g. a local stand-in; needs --origin (can specify multiple)')
+@click.option('--concurrency', type=click.IntRange(min=1), default=DEFAULT_PREFLIGHT_CONCURRENCY, show_default=True, help='Preflight requests in flight at once')
+@click.option('--attempts', type=click.IntRange(min=1), default=DEFAULT_PREFLIGHT_ATTEMPTS, show_default=True, help='Attempts per endpoint and origin, waiting longer between each while a change propagates')
+@click.option('--timeout', type=click.FloatRange(min=0.1), default=DEFAULT_PREFLIGHT_TIMEOUT, show_default=True, help='Seconds to wait for each preflight response')
+@click.option('--refresh', is_flag=True, help='Ignore the inventory cache and rediscover everything')
+@click.option('--output', type=click.Choice(['table', 'json']), default='table', show_default=True, help='Table for people, or one result per endpoint and origin as JSON on stdout')
+def verify_cors(function_names, match, region, target, origin, urls, concurrency, attempts, timeout, refresh, output):
+    """Check that browsers get CORS headers from Function URLs and APIs"""
+    from botocore.exceptions import ClientError, NoCredentialsError
+    from rich.console import Console
+    from .cors import build_cors_plan
+    from .preflight import PreflightCheck
+    from .report import print_preflight_results
+    
+    if urls and not origin:
+        raise click.UsageError("--url needs --origin: there is no CORS configuration to read the origins from")
+    
+    ui = console.resolve() if output == 'table' else Console(stderr=True)
+    ui.print("\n[bold blue]Verifying CORS preflights...[/bold blue]\n")
+    
+    url_checks = [PreflightCheck('URL', None, url, url, origin) for url in urls]
+    plan = []
+    function_urls = {}
+    
+    try:
+        if function_names or match or not urls:
+            configure_clients()
+            cache = open_inventory_cache(ui=ui)
+            daemon = connect_daemon([region] if region else (), ui) if not refresh else None
+            patterns = list(function_names) + list(match)
+            functions = match_functions(
+                collect_functions(region, cache, refresh, DEFAULT_CONCURRENCY, daemon, ui, patterns),
+                region,
+                patterns
+            )
+            plan = build_cors_plan(functions, target)
+            function_urls = {(f.region, f.function_name): f.function_url for f in functions if f.function_url}
+            if not plan:
+                ui.print("[yellow]No matching functions with a Function URL or API Gateway found[/yellow]\n")
+                if not url_checks:
+                    return
         
+        results, skipped = run_preflight_checks(
+            plan, function_urls, list(origin) or None, concurrency, attempts, timeout, url_checks, ui
+        )
+    
     except NoCredentialsError:
-        console.print("\n[red]Error: No AWS credentials found[/red]")
-        console.print("\n[yellow]Please set up your AWS credentials.[/yellow]\n")
+        ui.print("\n[red]Error: No AWS credentials found[/red]")
+        ui.print("\n[yellow]Please set up your AWS credentials.[/yellow]\n")
+        return
     
     except ClientError as e:
-        console.print(f"\n[red]AWS Error: {e.response['Error']['Message']}[/red]\n")
+        ui.print(f"\n[red]AWS Error: {e.response['Error']['Message']}[/red]\n")
+        return
     
-    except Exception as e:
-        console.print(f"\n[red]Unexpected error: {str(e)}[/red]\n")
+    if output == 'json':
+        click.echo(json.dumps({
+            'results': [result.to_dict() for result in results],
+            'not_checked': [
+                {'kind': t.kind, 'region': t.region, 'name': t.name, 'reason': reason}
+                for t, reason in skipped
+            ],
+        }, indent=2))
+    else:
+        print_preflight_results(ui, results, skipped)
+    
+    if any(not result.passed for result in results):
+        click.get_current_context().exit(1)
 
 @main.command()
-@click.argument('function_name')
+@click.argument('function_names', nargs=-1, metavar='[FUNCTION_NAME]...')
+@click.option('--match', multiple=True, help='Fix every function whose name matches this glob, e.g. \'orders-*\' (can specify multiple)')
+@click.option('--from-scan', 'from_scan', type=click.Path(exists=True, dir_okay=False), default=None, help='Fix the functions listed in a scan --output jsonl/json/csv file')
+@click.option('--concurrency', type=click.IntRange(min=1), default=DEFAULT_CONCURRENCY, show_default=True, help='Parallel lookups and CORS writes when fixing several functions')
 @click.option('--region', default=None, help='AWS region (defaults to scanning all regions)')
 @click.option('--target', type=click.Choice(['url', 'api', 'all']), default=None, help='What to fix: url (Function URL), api (API Gateway), or all')
 @click.option('--origin', multiple=True, help='Allowed origins (can specify multiple)')
 @click.option('--wildcard', is_flag=True, help='Use wildcard (*) for all origins')
-def fix_cors(function_name, region, target, origin, wildcard):
-    """Fix CORS configuration for a Lambda function"""
+@click.option('--refresh', is_flag=True, help='Ignore the inventory cache and rediscover everything')
+@click.option('--plan', is_flag=True, help='Show what would change against the current CORS settings, without writing anything')
+@click.option('--verify', is_flag=True, help='After writing, send CORS preflights from each origin to every endpoint until they pass or retries run out')
+@trace_calls_option
+def fix_cors(function_names, match, from_scan, concurrency, region, target, origin, wildcard, refresh, plan, verify, trace_calls):
+    """Fix CORS configuration for one or many Lambda functions
+    
+    A REST API is changed by merging only the OPTIONS methods, method
+    responses and gateway responses CORS needs into its working copy, then
+    deploying it to every stage. That deployment also publishes any other
+    change made to the API since it was last deployed.
+    """
+    from botocore.exceptions import ClientError, NoCredentialsError
+    from rich.panel import Panel
+    from .clients import get_client
+    from .cors import CorsError, CorsTarget, apply_cors_target, cors_settings
+    from .report import print_preflight_results
+    from .scanner import (
+        check_function_url_and_cors,
+        find_function_api_links,
+        get_api_gateway_lambda_mappings,
+        locate_function,
+    )
+    
+    start_call_trace(trace_calls)
+    configure_clients()
+    
+    if match or from_scan or len(function_names) > 1:
+        fix_cors_batch(function_names, match, from_scan, concurrency, region, target, origin, wildcard, refresh, plan, verify)
+        return
+    
+    if not function_names:
+        raise click.UsageError("Give a FUNCTION_NAME, or use --match or --from-scan to fix several functions")
+    
+    function_name = function_names[0]
     console.print(f"\n[bold blue]Fixing CORS for {function_name}...[/bold blue]\n")
     
     try:
-        if region:
-            regions_to_check = [region]
+        cache = open_inventory_cache()
+        
+        # A running daemon already knows where the function is
+        daemon = connect_daemon([region] if region else ()) if not refresh else None
+        known = {}
+        if daemon is not None:
+            daemon_functions, _ = daemon.functions([region] if region else (), FunctionFilter([function_name]))
+            known = {r: functions[0] for r, functions in daemon_functions.items() if functions}
+        
+        if known:
+            found = known
+        elif region:
+            found = locate_function(function_name, [region])
         else:
-            console.print("[dim]Searching for function across all regions...[/dim]")
-            ec2_client = boto3.client('ec2', region_name='us-east-1')
-            regions_response = ec2_client.describe_regions()
-            regions_to_check = [r['RegionName'] for r in regions_response['Regions']]
-        
-        function_region = None
-        lambda_client = None
-        
-        for check_region in regions_to_check:
-            try:
-                temp_client = boto3.client('lambda', region_name=check_region)
-                temp_client.get_function(FunctionName=function_name)
-                function_region = check_region
-                lambda_client = temp_client
-                break
-            except ClientError as e:
-                if e.response['Error']['Code'] == 'ResourceNotFoundException':
-                    continue
-                else:
-                    raise
+            found = {}
+            indexed_regions = cache.find_function_regions(function_name) if cache is not None and not refresh else []
+            
+            if indexed_regions:
+                console.print(f"[dim]Checking regions from the last scan: {', '.join(indexed_regions)}[/dim]")
+                found = locate_function(function_name, indexed_regions, find_all=True)
+            
+            if not found:
+                console.print("[dim]Searching for function across all regions...[/dim]")
+                found = locate_function(function_name, discover_regions(cache, refresh))
         
-        if not function_region:
+        if not found:
             console.print(f"[red]Function '{function_name}' not found in any region[/red]\n")
             return
         
+        if len(found) > 1:
+            console.print(f"[yellow]Function '{function_name}' exists in several regions:[/yellow]")
+            for found_region in sorted(found):
+                console.print(f"   {found_region}")
+            console.print("\n[dim]Use --region to choose which one to fix[/dim]\n")
+            return
+        
+        function_region, function_info = next(iter(found.items()))
+        lambda_client = get_client('lambda', function_region)
+        
         console.print(f"[green]Found function in region: {function_region}[/green]\n")
         
-        function_info = lambda_client.get_function(FunctionName=function_name)
-        function_arn = function_info['Configuration']['FunctionArn']
+        # What fronts it is read again: a daemon's links can be up to an hour old
+        if known:
+            function_arn = function_info.function_arn
+        else:
+            function_arn = function_info['Configuration']['FunctionArn']
         
         has_url, url_cors_configured, function_url = check_function_url_and_cors(
             lambda_client, function_name, function_region
         )
         
-        api_mappings = get_api_gateway_lambda_mappings(function_region)
-        apis = api_mappings.get(function_arn, [])
+        if not known and cache is not None and not refresh and cache.region_is_fresh(function_region):
+            apis = cache.get_api_mappings(function_region).get(function_arn, [])
+        else:
+            apis = find_function_api_links(lambda_client, function_name, function_arn, function_region)
+            if apis is None:
+                console.print("[dim]Resource policy does not name its APIs, checking every API in the region...[/dim]")
+                apis = get_api_gateway_lambda_mappings(function_region).get(function_arn, [])
         has_apis = len(apis) > 0
         
         if not has_url and not has_apis:
@@ -406,8 +857,8 @@ def fix_cors(function_name, region, target, origin, wildcard):
                     status = "CONFIGURED" if url_cors_configured else "NOT CONFIGURED"
                     console.print(f"   Function URL: {status}")
                 for api in apis:
-                    status = "CONFIGURED" if api['cors_configured'] else "NOT CONFIGURED"
-                    console.print(f"   {api['type']}: {api['api_name']} - {status}")
+                    status = "CONFIGURED" if api.cors_configured else "NOT CONFIGURED"
+                    console.print(f"   {api.type}: {api.api_name} - {status}")
                 console.print(f"\n[dim]Use --target flag to specify what to fix:[/dim]")
                 console.print(f"   [dim]--target url       Fix Function URL CORS[/dim]")
                 console.print(f"   [dim]--target api       Fix API Gateway CORS[/dim]")
@@ -418,133 +869,106 @@ def fix_cors(function_name, region, target, origin, wildcard):
             elif has_apis:
                 target = 'api'
         
-        if origin:
-            allow_origins = list(origin)
-            console.print(f"[bold]Using specified origins:[/bold]")
-            for orig in allow_origins:
-                console.print(f"   {orig}")
-            console.print()
-        elif wildcard:
-            allow_origins = ['*']
-            console.print("[yellow bold]Using wildcard origin (*)[/yellow bold]")
-            console.print("[yellow]This allows ANY website to access your API[/yellow]")
-            console.print("[yellow]Recommended for development only![/yellow]\n")
-        else:
-            console.print("[bold]Detecting origins from your project...[/bold]\n")
-            detected_origins, detection_source = detect_origins()
-            
-            if detected_origins and detection_source != 'common development defaults':
-                console.print(f"[green]Found origin(s) in {detection_source}:[/green]")
-                for orig in detected_origins:
-                    console.print(f"   [cyan]{orig}[/cyan]")
-                console.print()
-                
-                use_detected = click.confirm("Use this origin?", default=True)
-                
-                if use_detected:
-                    allow_origins = detected_origins
-                else:
-                    console.print("\n[dim]Enter the origin URL for your frontend app[/dim]")
-                    console.print("[dim]Examples: https://myapp.com, http://localhost:3000[/dim]\n")
-                    manual_origin = click.prompt("Origin URL")
-                    allow_origins = [manual_origin]
-                    
-                    if click.confirm("Add more origins?", default=False):
-                        while True:
-                            additional = click.prompt("Additional origin URL (or press Enter to finish)", default="", show_default=False)
-                            if not additional:
-                                break
-                            allow_origins.append(additional)
-            else:
-                console.print("[yellow]No origin detected in project files[/yellow]")
-                console.print("\n[dim]Common options:[/dim]")
-                console.print("[dim]  http://localhost:3000  (React development)[/dim]")
-                console.print("[dim]  http://localhost:5173  (Vite development)[/dim]")
-                console.print("[dim]  https://myapp.com      (Production)[/dim]")
-                console.print("[dim]  *                      (All origins - development only!)[/dim]\n")
-                
-                origin_choice = click.prompt(
-                    "Select an option",
-                    type=click.Choice(['localhost:3000', 'localhost:5173', 'custom', 'wildcard']),
-                    default='localhost:3000'
-                )
-                
-                if origin_choice == 'localhost:3000':
-                    allow_origins = ['http://localhost:3000']
-                elif origin_choice == 'localhost:5173':
-                    allow_origins = ['http://localhost:5173']
-                elif origin_choice == 'wildcard':
-                    allow_origins = ['*']
-                    console.print("\n[yellow]Warning: Wildcard allows ANY site to access your API[/yellow]")
-                else:
-                    manual_origin = click.prompt("Enter origin URL")
-                    allow_origins = [manual_origin]
-                
-                console.print()
-            
-            console.print(f"[bold green]Will configure CORS for:[/bold green]")
-            for orig in allow_origins:
-                console.print(f"   {orig}")
-            console.print()
+        allow_origins = choose_allow_origins(origin, wildcard)
         
         allow_credentials = False
+        cors_config = cors_settings(allow_origins, allow_credentials)
         
+        url_target = None
         if target in ['url', 'all'] and has_url:
+            url_target = CorsTarget('Function URL', function_region, function_name, function_name)
+        api_targets = []
+        if target in ['api', 'all'] and has_apis:
+            api_targets = [CorsTarget(api.type, function_region, api.api_id, api.api_name) for api in apis]
+        cors_targets = ([url_target] if url_target else []) + api_targets
+        
+        read_errors = read_current_cors(cors_targets, cors_config, concurrency)
+        print_cors_changes(cors_targets, read_errors)
+        
+        if plan:
+            console.print("[dim]Plan only: no changes were made[/dim]\n")
+            return
+        
+        if url_target is not None:
             console.print("[bold]Fixing Function URL CORS...[/bold]")
             
-            if url_cors_configured:
-                console.print(f"   [dim]CORS already configured, updating...[/dim]")
-            
-            cors_config = {
-                'AllowOrigins': allow_origins,
-                'AllowMethods': ['*'],
-                'AllowHeaders': ['*'],
-                'MaxAge': 86400,
-                'AllowCredentials': allow_credentials
-            }
-            
-            lambda_client.update_function_url_config(
-                FunctionName=function_name,
-                Cors=cors_config
-            )
-            
-            console.print("   [green]Function URL CORS configured![/green]\n")
+            if url_target.changes == []:
+                console.print("   [dim]Already up to date, skipping[/dim]\n")
+            else:
+                if url_cors_configured:
+                    console.print(f"   [dim]CORS already configured, updating...[/dim]")
+                
+                lambda_client.update_function_url_config(
+                    FunctionName=function_name,
+                    Cors=cors_config
+                )
+                
+                if cache is not None:
+                    cache.set_function_url_cors(function_region, function_name, True)
+                
+                console.print("   [green]Function URL CORS configured![/green]\n")
         
-        if target in ['api', 'all'] and has_apis:
+        manual = set()
+        if api_targets:
             console.print("[bold]Fixing API Gateway CORS...[/bold]")
             
-            for api in apis:
-                api_id = api['api_id']
-                api_name = api['api_name']
-                api_type = api['type']
+            for api_target in api_targets:
+                api_id = api_target.resource_id
+                api_name = api_target.name
+                api_type = api_target.kind
                 
                 console.print(f"\n   Configuring {api_type}: {api_name}")
                 
-                if api_type == 'HTTP API':
-                    apigw2_client = boto3.client('apigatewayv2', region_name=function_region)
+                if api_target.changes == []:
+                    console.print(f"   [dim]{api_name} already up to date, skipping[/dim]")
+                
+                elif api_type == 'HTTP API':
+                    apigw2_client = get_client('apigatewayv2', function_region)
                     
                     apigw2_client.update_api(
                         ApiId=api_id,
-                        CorsConfiguration={
-                            'AllowOrigins': allow_origins,
-                            'AllowMethods': ['*'],
-                            'AllowHeaders': ['*'],
-                            'MaxAge': 86400,
-                            'AllowCredentials': allow_credentials
-                        }
+                        CorsConfiguration=cors_config
                     )
                     
+                    if cache is not None:
+                        cache.set_api_cors(function_region, api_type, api_id, True)
+                    
                     console.print(f"      AllowOrigins: {', '.join(allow_origins)}")
                     console.print(f"      AllowMethods: * (all methods)")
                     console.print(f"      AllowHeaders: * (all headers)")
                     console.print(f"   [green]{api_name} CORS configured![/green]")
                 
                 elif api_type == 'REST API':
-                    console.print(f"   [yellow]REST API CORS requires manual configuration[/yellow]")
-                    console.print(f"   [dim]REST API CORS is complex and varies by resource[/dim]")
-                    console.print(f"   [dim]Please configure in AWS Console: API Gateway -> {api_name} -> CORS[/dim]")
+                    try:
+                        apply_cors_target(api_target, cors_config)
+                    except CorsError as e:
+                        manual.add(api_target.key)
+                        console.print(f"   [yellow]{e}[/yellow]")
+                        console.print(f"   [dim]Please configure in AWS Console: API Gateway -> {api_name} -> Enable CORS[/dim]")
+                        continue
+                    
+                    if cache is not None:
+                        cache.set_api_cors(function_region, api_type, api_id, True)
+                    
+                    console.print(f"      OPTIONS preflight and CORS headers added to every resource, API redeployed")
+                    console.print(f"      [dim]Lambda proxy integrations must also return Access-Control-Allow-Origin themselves[/dim]")
+                    console.print(f"   [green]{api_name} CORS configured![/green]")
+        
+        notify_daemon([function_region])
         
-        console.print("\n[bold green]CORS configuration complete![/bold green]\n")
+        failed_checks = 0
+        if verify:
+            console.print()
+            results, skipped = run_preflight_checks(
+                [t for t in cors_targets if t.key not in manual],
+                {(function_region, function_name): function_url},
+                allow_origins
+            )
+            print_preflight_results(console, results, skipped)
+            failed_checks = sum(1 for result in results if not result.passed)
+        
+        if not failed_checks:
+            console.print("\n[bold green]CORS configuration complete![/bold green]\n")
         
         if has_url and target in ['url', 'all']:
             react_code = f"""// In your React app:
@@ -580,5 +1004,292 @@ fetch('{function_url}', {{
     except Exception as e:
         console.print(f"\n[red]Unexpected error: {str(e)}[/red]\n")
 
+def fix_cors_batch(function_names, match, from_scan, concurrency, region, target, origin, wildcard, refresh, plan_only=False,
+                   verify=False):
+    """Plan and apply CORS for many functions, writing each URL and API once"""
+    from botocore.exceptions import ClientError, NoCredentialsError
+    from rich.table import Table
+    from .cors import apply_cors_plan, build_cors_plan, cors_settings
+    from .output import read_function_records
+    from .report import print_preflight_results
+    from .scanner import get_account_id
+    
+    console.print("\n[bold blue]Fixing CORS for multiple functions...[/bold blue]\n")
+    
+    try:
+        configure_clients(max_pool_connections=concurrency)
+        cache = open_inventory_cache()
+        daemon = connect_daemon([region] if region else ()) if not from_scan and not refresh else None
+        
+        if from_scan:
+            console.print(f"[dim]Reading functions from {from_scan}...[/dim]")
+            functions = read_function_records(from_scan)
+            
+            # Writes go to the current credentials' account only
+            account = cache.account if cache is not None else get_account_id()
+            other_accounts = {f.account for f in functions if f.account and f.account != account}
+            if other_accounts:
+                console.print(f"[yellow]Skipping functions from other accounts ({', '.join(sorted(other_accounts))}); use --profile to fix those[/yellow]")
+                functions = [f for f in functions if not f.account or f.account == account]
+        else:
+            functions = collect_functions(region, cache, refresh, concurrency, daemon,
+                                          patterns=list(function_names) + list(match))
+        
+        functions = match_functions(functions, region, list(function_names) + list(match))
+        
+        if not functions:
+            console.print("[yellow]No matching functions found[/yellow]\n")
+            return
+        
+        plan = build_cors_plan(functions, target or 'all')
+        
+        if not plan:
+            console.print(f"[red]None of the {len(functions)} matching functions have public access (no Function URL or API Gateway)[/red]\n")
+            return
+        
+        table = Table(title=f"CORS plan: {len(plan)} targets for {len(functions)} functions")
+        table.add_column("Target", style="yellow")
+        table.add_column("Name", style="cyan")
+        table.add_column("Region", style="blue")
+        table.add_column("Functions", style="white")
+        for cors_target in plan:
+            table.add_row(cors_target.kind, cors_target.name, cors_target.region, ", ".join(cors_target.functions))
+        console.print(table)
+        console.print()
+        
+        allow_origins = choose_allow_origins(origin, wildcard)
+        cors_config = cors_settings(allow_origins)
+        
+        console.print("[dim]Reading current CORS settings...[/dim]")
+        read_errors = read_current_cors(plan, cors_config, concurrency)
+        print_cors_changes(plan, read_errors)
+        
+        unchanged = sum(1 for cors_target in plan if cors_target.changes == [])
+        if plan_only:
+            console.print(f"[dim]Plan only: {len(plan) - unchanged} of {len(plan)} targets would change, nothing was written[/dim]\n")
+            return
+        
+        results = Table(title="CORS results")
+        results.add_column("Target", style="yellow")
+        results.add_column("Name", style="cyan")
+        results.add_column("Region", style="blue")
+        results.add_column("Result", style="white")
+        
+        failed = 0
+        written = set()
+        outcomes = {
+            cors_target.key: "[dim]UNCHANGED[/dim]"
+            for cors_target in plan
+            if cors_target.changes == []
+        }
+        for cors_target, applied, error in apply_cors_plan(plan, cors_config, concurrency):
+            if error is not None:
+                failed += 1
+                message = error.response['Error']['Message'] if isinstance(error, ClientError) else str(error)
+                outcomes[cors_target.key] = f"[red]FAILED: {message}[/red]"
+            elif not applied:
+                outcomes[cors_target.key] = "[yellow]Manual configuration required[/yellow]"
+            else:
+                outcomes[cors_target.key] = "[green]CONFIGURED[/green]"
+                written.add(cors_target.key)
+                if cache is not None:
+                    if cors_target.kind == 'Function URL':
+                        cache.set_function_url_cors(cors_target.region, cors_target.resource_id, True)
+                    else:
+                        cache.set_api_cors(cors_target.region, cors_target.kind, cors_target.resource_id, True)
+        
+        for cors_target in plan:
+            results.add_row(cors_target.kind, cors_target.name, cors_target.region, outcomes[cors_target.key])
+        
+        console.print(results)
+        
+        notify_daemon({cors_target.region for cors_target in plan if cors_target.changes != []})
+        
+        if unchanged:
+            console.print(f"\n[dim]{unchanged} of {len(plan)} targets already matched and were not written[/dim]")
+        
+        failed_checks = 0
+        if verify:
+            console.print()
+            results, skipped = run_preflight_checks(
+                [t for t in plan if t.changes == [] or t.key in written],
+                {(f.region, f.function_name): f.function_url for f in functions if f.function_url},
+                allow_origins
+            )
+            print_preflight_results(console, results, skipped)
+            failed_checks = sum(1 for result in results if not result.passed)
+        
+        if failed:
+            console.print(f"\n[yellow]{failed} of {len(plan)} targets could not be updated[/yellow]\n")
+        elif not failed_checks:
+            console.print("\n[bold green]CORS configuration complete![/bold green]\n")
+        
+    except NoCredentialsError:
+        console.print("\n[red]Error: No AWS credentials found[/red]")
+        console.print("\n[yellow]Please set up your AWS credentials.[/yellow]\n")
+    
+    except ClientError as e:
+        console.print(f"\n[red]AWS Error: {e.response['Error']['Message']}[/red]\n")
+    
+    except Exception as e:
+        console.print(f"\n[red]Unexpected error: {str(e)}[/red]\n")
+
+@main.command()
+@click.argument('old_path', metavar='SNAPSHOT', type=click.Path(exists=True, dir_okay=False))
+@click.argument('new_path', metavar='[NEW_SNAPSHOT]', required=False, type=click.Path(exists=True, dir_okay=False))
+@click.option('--concurrency', type=click.IntRange(min=1), default=DEFAULT_CONCURRENCY, show_default=True, help='Number of regions (and Function URL lookups per region) to check in parallel against live state')
+@click.option('--full/--incremental', default=True, show_default=True, help='Against live state, re-read every function and API, or only those whose listing changed since a snapshot under an hour old (faster, but misses new integrations and Function URL CORS changes)')
+@click.option('--save', 'save_path', type=click.Path(dir_okay=False), default=None, help='Also save the live state as a new snapshot')
+@click.option('--output', type=click.Choice(['table', 'json']), default='table', show_default=True, help='Table for people, or the changes as JSON on stdout')
+@trace_calls_option
+def diff(old_path, new_path, concurrency, full, save_path, output, trace_calls):
+    """Show functions added, removed, newly public or with changed CORS since a scan --snapshot"""
+    from botocore.exceptions import ClientError, NoCredentialsError
+    from rich.console import Console
+    from .report import print_snapshot_diff
+    from .snapshot import Snapshot, cached_api_entries, diff_snapshots, uncompared_regions
+    
+    ui = console.resolve() if output == 'table' else Console(stderr=True)
+    
+    try:
+        old = Snapshot.load(old_path)
+        new = Snapshot.load(new_path) if new_path else None
+    except (OSError, ValueError, KeyError) as e:
+        raise click.UsageError(f"Could not read the snapshot: {e}")
+    
+    try:
+        if new is None:
+            from .cache import InventoryCache
+            from .scanner import get_account_id, scan_regions
+            
+            start_call_trace(trace_calls, ui)
+            registry = configure_clients(max_pool_connections=concurrency)
+            account = get_account_id()
+            regions = old.regions.get(account)
+            if not regions:
+                ui.print(f"\n[yellow]{old_path} has no regions of account {account}; use --profile to pick the account it was taken in[/yellow]\n")
+                return
+            
+            ui.print(f"\n[bold blue]Comparing {old_path} with account {account} ({len(regions)} regions)...[/bold blue]\n")
+            
+            # Seeded with the snapshot, an incremental scan only re-reads what changed since
+            cache = InventoryCache(account, ttl=0, path=':memory:')
+            if not full:
+                old.seed_cache(cache)
+            
+            functions = []
+            scanned = {account: []}
+            for region, region_functions, error in scan_regions(regions, concurrency, cache, full, registry.default_profile):
+                if error is not None:
+                    ui.print(f"[yellow]Warning: Could not scan {region}, leaving it out: {error_message(error)}[/yellow]")
+                    continue
+                for function in region_functions:
+                    function.account = account
+                functions.extend(region_functions)
+                scanned[account].append(region)
+            
+            apis = [api for region in scanned[account] for api in cached_api_entries(cache, region)]
+            new = Snapshot.from_functions(functions, scanned, apis)
+            if save_path:
+                save_snapshot(save_path, functions, scanned, {account: cache}, ui)
+        
+        changes = diff_snapshots(old, new)
+        skipped = uncompared_regions(old, new)
+        
+        if output == 'json':
+            click.echo(json.dumps({
+                'changes': changes,
+                'uncompared_regions': [{'account': account, 'region': region} for account, region in skipped],
+            }, indent=2))
+        elif not changes:
+            ui.print("\n[green]No changes[/green]")
+        else:
+            print_snapshot_diff(ui, changes, len(set(old.regions) | set(new.regions)) > 1)
+        
+        if skipped:
+            ui.print(f"   [dim]{len(skipped)} regions were scanned in only one inventory and were not compared[/dim]")
+        ui.print()
+    
+    except NoCredentialsError:
+        ui.print("\n[red]Error: No AWS credentials found[/red]")
+        ui.print("\n[yellow]Please set up your AWS credentials.[/yellow]\n")
+    
+    except ClientError as e:
+        ui.print(f"\n[red]AWS Error: {e.response['Error']['Message']}[/red]\n")
+
+@main.command()
+@click.option('--host', default='127.0.0.1', show_default=True, help='Address to listen on')
+@click.option('--port', type=click.IntRange(min=0, max=65535), default=0, help='Port to listen on (default: any free port)')
+@click.option('--socket', 'socket_path', type=click.Path(dir_okay=False), default=None, help='Listen on this Unix socket instead of TCP')
+@click.option('--refresh-interval', type=click.IntRange(min=10), default=DEFAULT_REFRESH_INTERVAL, show_default=True, help='Seconds between background refreshes of every region')
+@click.option('--concurrency', type=click.IntRange(min=1), default=DEFAULT_CONCURRENCY, show_default=True, help='Number of regions (and Function URL lookups per region) to refresh in parallel')
+@click.option('--regions', 'include_regions', callback=parse_name_list, metavar='REGION,REGION,...', help='Only keep these regions; globs like eu-* are allowed')
+@click.option('--exclude-regions', callback=parse_name_list, metavar='REGION,REGION,...', help='Skip these regions; globs like ap-* are allowed')
+@click.option('--rate', 'rates', multiple=True, callback=parse_rates, metavar='SERVICE[.OPERATION]=RPS', help='Request rate limit per region, e.g. apigateway=5 (can specify multiple)')
+@click.option('--max-attempts', type=click.IntRange(min=1), default=DEFAULT_MAX_ATTEMPTS, show_default=True, help='Attempts per AWS call, including retries with backoff when throttled')
+def serve(host, port, socket_path, refresh_interval, concurrency, include_regions, exclude_regions, rates, max_attempts):
+    """Keep the inventory warm in memory for scan and fix-cors to query"""
+    import signal
+    from botocore.exceptions import ClientError, NoCredentialsError
+    from .daemon import WarmInventory, create_server, remove_state, write_state
+    from .scanner import get_account_id
+    from .throttling import limiter
+    
+    registry = configure_clients(max_pool_connections=concurrency, max_attempts=max_attempts)
+    limiter.configure(rates)
+    
+    try:
+        account = get_account_id()
+        # A zero TTL makes every refresh check AWS, still only re-reading what changed
+        cache = open_inventory_cache(0, account=account)
+        regions = select_regions(discover_regions(cache), include_regions, exclude_regions)
+        inventory = WarmInventory(
+            account, regions, not include_regions and not exclude_regions,
+            cache, registry.default_profile, concurrency
+        )
+        server = create_server(inventory, host, port, socket_path)
+        state_path = write_state(server, inventory)
+    
+    except NoCredentialsError:
+        console.print("\n[red]Error: No AWS credentials found[/red]")
+        console.print("\n[yellow]Please set up your AWS credentials.[/yellow]\n")
+        return
+    
+    except ClientError as e:
+        console.print(f"\n[red]AWS Error: {e.response['Error']['Message']}[/red]\n")
+        return
+    
+    except OSError as e:
+        console.print(f"\n[red]Could not start the server: {e}[/red]\n")
+        return
+    
+    if socket_path:
+        where = socket_path
+    else:
+        where = f"http://{server.server_address[0]}:{server.server_address[1]}"
+        if host not in ('127.0.0.1', 'localhost', '::1'):
+            console.print(f"[yellow]Warning: listening on {host}, not only this machine; queries still need the token in {state_path}[/yellow]")
+    
+    console.print(f"\n[bold blue]Serving account {account} ({len(regions)} regions) on {where}[/bold blue]")
+    console.print(f"[dim]Refreshing every {refresh_interval}s; scan and fix-cors use this inventory while it runs. Ctrl-C to stop.[/dim]\n")
+    
+    refresher = threading.Thread(target=inventory.run, args=(refresh_interval,), daemon=True)
+    refresher.start()
+    
+    # Stop cleanly on SIGTERM as well as Ctrl-C
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        inventory.stop()
+        server.server_close()
+        remove_state(state_path)
+        if socket_path and os.path.exists(socket_path):
+            os.unlink(socket_path)
+    
+    console.print("\n[dim]Server stopped[/dim]\n")
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
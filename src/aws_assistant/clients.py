@@ -0,0 +1,126 @@
+import threading
+
+import boto3
+import botocore.session
+from botocore.config import Config
+from botocore.credentials import RefreshableCredentials
+
+from .defaults import DEFAULT_MAX_ATTEMPTS
+from .throttling import install_client_hooks
+from .tracing import tracer
+
+DEFAULT_MAX_POOL_CONNECTIONS = 10
+
+
+class ClientRegistry:
+    """Process-wide cache of boto3 clients keyed by (profile, service, region).
+
+    Every client is built from one explicit boto3.Session per profile and a
+    shared botocore Config, so repeated lookups reuse the same client and
+    its HTTP connection pool. Client creation is serialised because
+    boto3 sessions are not thread-safe; the clients themselves are.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._sessions = {}
+        self._clients = {}
+        self._hooks = []
+        self.default_profile = None
+        self.config = self._build_config(DEFAULT_MAX_POOL_CONNECTIONS, DEFAULT_MAX_ATTEMPTS)
+
+    @staticmethod
+    def _build_config(max_pool_connections, max_attempts):
+        return Config(
+            max_pool_connections=max_pool_connections,
+            retries={'mode': 'adaptive', 'total_max_attempts': max_attempts}
+        )
+
+    def configure(self, profile=None, max_pool_connections=None, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        """Set the default profile and connection settings; drops existing clients"""
+        with self._lock:
+            self.default_profile = profile
+            self.config = self._build_config(
+                max_pool_connections or DEFAULT_MAX_POOL_CONNECTIONS,
+                max_attempts
+            )
+            self._clients.clear()
+
+    def add_client_hook(self, hook):
+        """Call hook(client, profile) on every client created from now on"""
+        with self._lock:
+            self._hooks.append(hook)
+
+    def get_session(self, profile=None):
+        profile = profile or self.default_profile
+        with self._lock:
+            session = self._sessions.get(profile)
+            if session is None:
+                session = boto3.session.Session(profile_name=profile)
+                self._sessions[profile] = session
+            return session
+
+    def assume_role(self, role_arn, profile=None):
+        """Register a session for role_arn, assumed with profile's credentials.
+
+        The role is assumed again whenever its credentials are about to
+        expire, so a scan may outlast one role session. Returns the key to
+        pass as profile to get_client; the role ARN itself.
+        """
+        with self._lock:
+            if role_arn in self._sessions:
+                return role_arn
+
+        def fetch():
+            credentials = self.get_client('sts', 'us-east-1', profile).assume_role(
+                RoleArn=role_arn,
+                RoleSessionName='aws-assistant'
+            )['Credentials']
+            return {
+                'access_key': credentials['AccessKeyId'],
+                'secret_key': credentials['SecretAccessKey'],
+                'token': credentials['SessionToken'],
+                'expiry_time': credentials['Expiration'].isoformat(),
+            }
+
+        botocore_session = botocore.session.get_session()
+        botocore_session._credentials = RefreshableCredentials.create_from_metadata(
+            metadata=fetch(),
+            refresh_using=fetch,
+            method='assume-role'
+        )
+
+        with self._lock:
+            self._sessions[role_arn] = boto3.session.Session(botocore_session=botocore_session)
+        return role_arn
+
+    def get_client(self, service, region, profile=None):
+        profile = profile or self.default_profile
+        key = (profile, service, region)
+
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                session = self.get_session(profile)
+                client = session.client(service, region_name=region, config=self.config)
+                for hook in self._hooks:
+                    hook(client, profile)
+                self._clients[key] = client
+            return client
+
+
+registry = ClientRegistry()
+registry.add_client_hook(install_client_hooks)
+registry.add_client_hook(tracer.install)
+
+
+def get_client(service, region, profile=None):
+    return registry.get_client(service, region, profile)
+
+
+def get_session(profile=None):
+    return registry.get_session(profile)
@@ -0,0 +1,479 @@
+import copy
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .clients import get_client
+
+DEFAULT_MAX_AGE = 86400
+
+CORS_FIELDS = ('AllowOrigins', 'AllowMethods', 'AllowHeaders', 'ExposeHeaders', 'MaxAge', 'AllowCredentials')
+
+SWAGGER_METHODS = ('get', 'put', 'post', 'delete', 'patch', 'head')
+ANY_METHOD = 'x-amazon-apigateway-any-method'
+PROXY_INTEGRATIONS = ('aws_proxy', 'http_proxy')
+CORS_GATEWAY_RESPONSES = ('DEFAULT_4XX', 'DEFAULT_5XX')
+
+
+class CorsError(Exception):
+    """A target whose CORS settings cannot be changed automatically"""
+
+
+def cors_settings(allow_origins, allow_credentials=False):
+    """The CORS block fix-cors writes, in the shape both Lambda and API Gateway accept"""
+    return {
+        'AllowOrigins': list(allow_origins),
+        'AllowMethods': ['*'],
+        'AllowHeaders': ['*'],
+        'MaxAge': DEFAULT_MAX_AGE,
+        'AllowCredentials': allow_credentials
+    }
+
+
+class CorsTarget:
+    """One resource whose CORS settings get written: a Function URL or an API.
+
+    functions lists every function that led the plan to this target, so an
+    API shared by several functions is still written once.
+    """
+
+    __slots__ = ('kind', 'region', 'resource_id', 'name', 'functions', 'changes')
+
+    def __init__(self, kind, region, resource_id, name):
+        self.kind = kind
+        self.region = region
+        self.resource_id = resource_id
+        self.name = name
+        self.functions = []
+        # None until diff_cors_plan has read the current settings
+        self.changes = None
+
+    @property
+    def key(self):
+        return (self.kind, self.region, self.resource_id)
+
+
+def build_cors_plan(functions, target='all'):
+    """Deduplicated CorsTargets for a set of FunctionRecords.
+
+    target is 'url', 'api' or 'all', as for fix-cors --target.
+    """
+    plan = {}
+
+    for function in functions:
+        candidates = []
+        if target in ('url', 'all') and function.has_function_url:
+            candidates.append(CorsTarget('Function URL', function.region, function.function_name, function.function_name))
+        if target in ('api', 'all'):
+            for api in function.api_gateways:
+                candidates.append(CorsTarget(api.type, function.region, api.api_id, api.api_name))
+
+        for candidate in candidates:
+            cors_target = plan.setdefault(candidate.key, candidate)
+            if function.function_name not in cors_target.functions:
+                cors_target.functions.append(function.function_name)
+
+    return sorted(plan.values(), key=lambda t: (t.region, t.kind, t.name))
+
+
+def normalize_cors(cors):
+    """A comparable form of a Cors/CorsConfiguration block.
+
+    Origins, methods and headers are order- and case-insensitive, so
+    they become sorted tuples; missing fields get the AWS defaults.
+    """
+    cors = cors or {}
+    return {
+        'AllowOrigins': tuple(sorted({o.rstrip('/').lower() for o in cors.get('AllowOrigins') or []})),
+        'AllowMethods': tuple(sorted({m.upper() for m in cors.get('AllowMethods') or []})),
+        'AllowHeaders': tuple(sorted({h.lower() for h in cors.get('AllowHeaders') or []})),
+        'ExposeHeaders': tuple(sorted({h.lower() for h in cors.get('ExposeHeaders') or []})),
+        'MaxAge': cors.get('MaxAge') or None,
+        'AllowCredentials': bool(cors.get('AllowCredentials')),
+    }
+
+
+def diff_cors(current, desired):
+    """(field, current, desired) for every field a write would change"""
+    current = normalize_cors(current)
+    desired = normalize_cors(desired)
+    return [
+        (field, current[field], desired[field])
+        for field in CORS_FIELDS
+        if current[field] != desired[field]
+    ]
+
+
+def format_cors_value(value):
+    if value is None or value == ():
+        return '-'
+    if isinstance(value, tuple):
+        return ', '.join(value)
+    return str(value)
+
+
+def static_origin(origins):
+    """The one origin a static Access-Control-Allow-Origin header can name"""
+    return '*' if '*' in origins else origins[0]
+
+
+def has_several_origins(origins):
+    return len(origins) > 1 and '*' not in origins
+
+
+def rest_cors_headers(cors_config, methods):
+    """Access-Control-* headers for one REST API resource, as {header: value}.
+
+    preflight_operation echoes origins other than static_origin's back to
+    the browser; elsewhere only that one is allowed.
+    """
+    headers = {
+        'Access-Control-Allow-Origin': static_origin(cors_config['AllowOrigins']),
+        'Access-Control-Allow-Methods': ','.join(methods),
+        'Access-Control-Allow-Headers': ','.join(cors_config['AllowHeaders']),
+        'Access-Control-Max-Age': str(cors_config['MaxAge']),
+    }
+    if cors_config.get('AllowCredentials'):
+        headers['Access-Control-Allow-Credentials'] = 'true'
+    return headers
+
+
+def _quoted(headers, prefix):
+    return {f'{prefix}.{name}': f"'{value}'" for name, value in headers.items()}
+
+
+def origin_override_template(origins):
+    """Mapping template that answers with the request's Origin when it is one of origins"""
+    checks = ' || '.join(f'$origin == "{origin}"' for origin in origins)
+    return (
+        '#set($origin = $input.params().header.get("Origin"))\n'
+        f'#if({checks})\n'
+        '#set($context.responseOverride.header.Access-Control-Allow-Origin = $origin)\n'
+        '#end\n'
+    )
+
+
+def preflight_operation(cors_config, methods):
+    """A swagger OPTIONS operation answering the CORS preflight from a mock integration"""
+    headers = rest_cors_headers(cors_config, methods)
+    integration_response = {
+        'statusCode': '200',
+        'responseParameters': _quoted(headers, 'method.response.header'),
+    }
+    origins = cors_config['AllowOrigins']
+    if has_several_origins(origins):
+        integration_response['responseTemplates'] = {'application/json': origin_override_template(origins)}
+
+    return {
+        'consumes': ['application/json'],
+        'produces': ['application/json'],
+        'responses': {
+            '200': {
+                'description': '200 response',
+                'headers': {name: {'type': 'string'} for name in headers},
+            }
+        },
+        'x-amazon-apigateway-integration': {
+            'type': 'mock',
+            'requestTemplates': {'application/json': '{"statusCode": 200}'},
+            'passthroughBehavior': 'when_no_match',
+            'responses': {'default': integration_response},
+        },
+    }
+
+
+def _is_non_proxy_method(method, operation):
+    """Whether a swagger path item entry is a method whose integration is not a proxy"""
+    if method not in SWAGGER_METHODS and method != ANY_METHOD:
+        return False
+    integration_type = operation.get('x-amazon-apigateway-integration', {}).get('type', '').lower()
+    return integration_type not in PROXY_INTEGRATIONS
+
+
+def _add_origin_header(operation, origin):
+    """Return Access-Control-Allow-Origin from a non-proxy method; True if it was missing"""
+    integration = operation.get('x-amazon-apigateway-integration', {})
+    changed = False
+
+    for response in operation.get('responses', {}).values():
+        headers = response.setdefault('headers', {})
+        if 'Access-Control-Allow-Origin' not in headers:
+            headers['Access-Control-Allow-Origin'] = {'type': 'string'}
+            changed = True
+
+    for response in integration.get('responses', {}).values():
+        parameters = response.setdefault('responseParameters', {})
+        if parameters.get('method.response.header.Access-Control-Allow-Origin') != f"'{origin}'":
+            parameters['method.response.header.Access-Control-Allow-Origin'] = f"'{origin}'"
+            changed = True
+
+    return changed
+
+
+def inject_rest_cors(definition, cors_config):
+    """Add CORS to every resource of an exported swagger definition, in place.
+
+    Each path with methods gets a mock OPTIONS method answering the
+    preflight, unless its OPTIONS is served by a real integration. Non-proxy
+    methods return Access-Control-Allow-Origin (proxy integrations have to
+    send it themselves), and the default 4XX/5XX gateway responses carry the
+    CORS headers so browsers can read errors too.
+
+    A non-proxy method's response header is static, so it can name only one
+    origin: with several, CorsError is raised if the API has such methods,
+    before anything is changed.
+
+    Returns (field, current, desired) for what changed, as diff_cors does;
+    an empty list means the definition already matched.
+    """
+    origin = static_origin(cors_config['AllowOrigins'])
+    if has_several_origins(cors_config['AllowOrigins']):
+        for item in definition.get('paths', {}).values():
+            if any(_is_non_proxy_method(method, operation) for method, operation in item.items()):
+                raise CorsError(
+                    'REST API has non-proxy methods, whose responses can allow only one origin; '
+                    'give a single --origin or configure CORS in the console'
+                )
+
+    resources = 0
+    preflights = 0
+    methods_changed = 0
+
+    for path, item in definition.get('paths', {}).items():
+        if ANY_METHOD in item:
+            methods = [m.upper() for m in SWAGGER_METHODS]
+        else:
+            methods = [m.upper() for m in SWAGGER_METHODS if m in item]
+        if not methods:
+            continue
+        resources += 1
+
+        desired = preflight_operation(cors_config, sorted(methods) + ['OPTIONS'])
+        current = item.get('options')
+        current_integration = (current or {}).get('x-amazon-apigateway-integration', {})
+        if current is None or current_integration.get('type', '').lower() == 'mock':
+            if current is None or current_integration.get('responses') != desired['x-amazon-apigateway-integration']['responses']:
+                item['options'] = desired
+                preflights += 1
+
+        for method, operation in item.items():
+            if _is_non_proxy_method(method, operation) and _add_origin_header(operation, origin):
+                methods_changed += 1
+
+    headers = _quoted(rest_cors_headers(cors_config, ['DELETE', 'GET', 'HEAD', 'OPTIONS', 'PATCH', 'POST', 'PUT']), 'gatewayresponse.header')
+    gateway_responses = definition.setdefault('x-amazon-apigateway-gateway-responses', {})
+    missing_responses = []
+    for response_type in CORS_GATEWAY_RESPONSES:
+        response = gateway_responses.setdefault(response_type, {})
+        parameters = response.setdefault('responseParameters', {})
+        if any(parameters.get(name) != value for name, value in headers.items()):
+            parameters.update(headers)
+            missing_responses.append(response_type)
+
+    changes = []
+    if preflights:
+        changes.append(('Preflight (OPTIONS)', f'{resources - preflights} of {resources} resources', f'{resources} of {resources} resources'))
+    if methods_changed:
+        changes.append(('Method responses', f'{methods_changed} without Access-Control-Allow-Origin', 'Access-Control-Allow-Origin'))
+    if missing_responses:
+        changes.append(('Gateway responses', 'no CORS headers on ' + ', '.join(missing_responses), 'CORS headers'))
+    return changes
+
+
+def export_rest_api(apigw_client, api_id):
+    """(swagger definition, stage names) of a REST API, exported with its API Gateway extensions.
+
+    The definition comes from a stage, so every stage must run the same
+    deployment; that is the one exported and then replaced.
+    """
+    stages = apigw_client.get_stages(restApiId=api_id).get('item', [])
+    if not stages:
+        raise CorsError('REST API has no deployed stage to export')
+    if len({stage.get('deploymentId') for stage in stages}) > 1:
+        raise CorsError('REST API stages run different deployments, configure CORS in the console')
+
+    stage_names = sorted(stage['stageName'] for stage in stages)
+    response = apigw_client.get_export(
+        restApiId=api_id,
+        stageName=stage_names[0],
+        exportType='swagger',
+        parameters={'extensions': 'apigateway'},
+        accepts='application/json'
+    )
+    return json.loads(response['body'].read()), stage_names
+
+
+def _references(value, found):
+    """Collect the '#/definitions/...' names a swagger fragment refers to"""
+    if isinstance(value, dict):
+        ref = value.get('$ref')
+        if isinstance(ref, str) and ref.startswith('#/definitions/'):
+            found.add(ref[len('#/definitions/'):])
+        for item in value.values():
+            _references(item, found)
+    elif isinstance(value, list):
+        for item in value:
+            _references(item, found)
+    return found
+
+
+def rest_merge_body(original, updated):
+    """The part of an updated definition that differs from the original export.
+
+    Only the operations and gateway responses CORS changed are included, with
+    the models and authorizers they refer to, so a merge leaves every other
+    method of the API's working copy as it is.
+    """
+    body = {key: updated[key] for key in ('swagger', 'info', 'basePath') if key in updated}
+
+    paths = {}
+    models = set()
+    authorizers = set()
+    for path, item in updated.get('paths', {}).items():
+        before = original.get('paths', {}).get(path, {})
+        for method, operation in item.items():
+            if before.get(method) != operation:
+                paths.setdefault(path, {})[method] = operation
+                _references(operation, models)
+                for requirement in operation.get('security', []):
+                    authorizers.update(requirement)
+    body['paths'] = paths
+
+    if models and 'definitions' in updated:
+        body['definitions'] = {name: updated['definitions'][name] for name in sorted(models) if name in updated['definitions']}
+    if authorizers and 'securityDefinitions' in updated:
+        body['securityDefinitions'] = {
+            name: updated['securityDefinitions'][name] for name in sorted(authorizers) if name in updated['securityDefinitions']
+        }
+
+    before = original.get('x-amazon-apigateway-gateway-responses', {})
+    responses = {
+        response_type: response
+        for response_type, response in updated.get('x-amazon-apigateway-gateway-responses', {}).items()
+        if before.get(response_type) != response
+    }
+    if responses:
+        body['x-amazon-apigateway-gateway-responses'] = responses
+    return body
+
+
+def apply_rest_api_cors(region, api_id, cors_config):
+    """Configure CORS on every resource of a REST API in a fixed number of calls.
+
+    The definition is exported once and CORS is added in memory. Only what
+    that changed is written back, with one put_rest_api in merge mode, and
+    then deployed once, however many resources and methods the API has.
+
+    The deployment publishes the whole working copy: any other change made
+    to the API since its stages were last deployed goes live with it.
+    """
+    apigw_client = get_client('apigateway', region)
+    definition, stage_names = export_rest_api(apigw_client, api_id)
+    original = copy.deepcopy(definition)
+    if not inject_rest_cors(definition, cors_config):
+        return
+
+    apigw_client.put_rest_api(
+        restApiId=api_id,
+        mode='merge',
+        failOnWarnings=False,
+        body=json.dumps(rest_merge_body(original, definition)).encode('utf-8')
+    )
+    deployment = apigw_client.create_deployment(
+        restApiId=api_id,
+        stageName=stage_names[0],
+        description='CORS configured by aws-assistant'
+    )
+    for stage_name in stage_names[1:]:
+        apigw_client.update_stage(
+            restApiId=api_id,
+            stageName=stage_name,
+            patchOperations=[{'op': 'replace', 'path': '/deploymentId', 'value': deployment['id']}]
+        )
+
+
+def get_current_cors(cors_target):
+    """The target's CORS block as AWS has it now, or None if it cannot be read this way"""
+    if cors_target.kind == 'Function URL':
+        response = get_client('lambda', cors_target.region).get_function_url_config(
+            FunctionName=cors_target.resource_id
+        )
+        return response.get('Cors', {})
+    if cors_target.kind == 'HTTP API':
+        response = get_client('apigatewayv2', cors_target.region).get_api(
+            ApiId=cors_target.resource_id
+        )
+        return response.get('CorsConfiguration', {})
+    return None
+
+
+def _diff_cors_target(cors_target, cors_config):
+    if cors_target.kind == 'REST API':
+        definition, _ = export_rest_api(get_client('apigateway', cors_target.region), cors_target.resource_id)
+        cors_target.changes = inject_rest_cors(definition, cors_config)
+        return
+
+    current = get_current_cors(cors_target)
+    if current is not None:
+        cors_target.changes = diff_cors(current, cors_config)
+
+
+def diff_cors_plan(plan, cors_config, concurrency):
+    """Read every target's current CORS settings and set target.changes.
+
+    Yields (target, error) as reads finish. Targets that cannot be read
+    keep changes=None and are written unconditionally.
+    """
+    if not plan:
+        return
+
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(plan))) as pool:
+        futures = {
+            pool.submit(_diff_cors_target, cors_target, cors_config): cors_target
+            for cors_target in plan
+        }
+        for future in as_completed(futures):
+            try:
+                future.result()
+                yield futures[future], None
+            except Exception as e:
+                yield futures[future], e
+
+
+def apply_cors_target(cors_target, cors_config):
+    """Write cors_config to one target. Returns False for targets that need manual work."""
+    if cors_target.kind == 'Function URL':
+        get_client('lambda', cors_target.region).update_function_url_config(
+            FunctionName=cors_target.resource_id,
+            Cors=cors_config
+        )
+    elif cors_target.kind == 'HTTP API':
+        get_client('apigatewayv2', cors_target.region).update_api(
+            ApiId=cors_target.resource_id,
+            CorsConfiguration=cors_config
+        )
+    elif cors_target.kind == 'REST API':
+        apply_rest_api_cors(cors_target.region, cors_target.resource_id, cors_config)
+    else:
+        return False
+    return True
+
+
+def apply_cors_plan(plan, cors_config, concurrency):
+    """Apply a plan concurrently, yielding (target, applied, error) as writes finish.
+
+    Targets already diffed with no changes are skipped without a write.
+    """
+    pending = [cors_target for cors_target in plan if cors_target.changes != []]
+    if not pending:
+        return
+
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(pending))) as pool:
+        futures = {
+            pool.submit(apply_cors_target, cors_target, cors_config): cors_target
+            for cors_target in pending
+        }
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e:
+                yield futures[future], False, e
@@ -0,0 +1,346 @@
+import fnmatch
+import http.client
+import json
+import os
+import secrets
+import socket
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+from .cache import default_cache_dir
+from .defaults import DEFAULT_CONCURRENCY
+from .filters import FunctionFilter
+from .output import function_from_record, inventory_record
+
+# Queries fall back to AWS when the daemon does not answer this fast
+CLIENT_TIMEOUT = 2.0
+
+
+def default_state_path():
+    return os.path.join(default_cache_dir(), 'daemon.json')
+
+
+class WarmInventory:
+    """Every function in one account's regions, kept in memory and refreshed in the background.
+
+    Refreshes go through scan_regions with an InventoryCache, so after the
+    first load only functions and APIs whose listing changed are looked up
+    again, and each region in full once the cache's remap age has passed.
+    Without a cache every refresh is a full one. A region whose refresh
+    fails keeps its previous functions.
+    """
+
+    def __init__(self, account, regions, all_regions, cache=None, profile=None, concurrency=DEFAULT_CONCURRENCY):
+        self.account = account
+        self.regions = list(regions)
+        self.all_regions = all_regions
+        self.cache = cache
+        self.profile = profile
+        self.concurrency = concurrency
+        self.started_at = time.time()
+
+        self._lock = threading.Lock()
+        self._functions = {}
+        self._refreshed_at = {}
+        self._errors = {}
+        self._pending = set()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+
+    def refresh(self, regions=None):
+        """Rescan regions (all by default). Never raises: failures become the regions' errors."""
+        from .scanner import scan_regions
+
+        regions = [r for r in (regions or self.regions) if r in self.regions]
+        pending = set(regions)
+        try:
+            for region, functions, error in scan_regions(regions, self.concurrency, self.cache, False, self.profile):
+                pending.discard(region)
+                for function in functions:
+                    function.account = self.account
+                with self._lock:
+                    if error is not None:
+                        self._errors[region] = str(error)
+                    else:
+                        self._functions[region] = functions
+                        self._refreshed_at[region] = time.time()
+                        self._errors.pop(region, None)
+        except Exception as e:
+            # The refresh stops at the first such error; whatever it had not finished failed with it
+            with self._lock:
+                for region in pending:
+                    self._errors[region] = str(e) or type(e).__name__
+
+    def request_refresh(self, regions=None):
+        """Have the refresh loop rescan these regions (all by default) right away"""
+        with self._lock:
+            self._pending.update(regions or self.regions)
+        self._wake.set()
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+
+    def run(self, interval):
+        """Refresh every region now and then every interval seconds, until stop is called.
+
+        A refresh that fails only records its regions' errors; the loop goes on.
+        """
+        next_full = 0.0
+        while not self._stopped.is_set():
+            if time.monotonic() >= next_full:
+                with self._lock:
+                    self._pending.clear()
+                self.refresh()
+                next_full = time.monotonic() + interval
+            else:
+                with self._lock:
+                    regions, self._pending = sorted(self._pending), set()
+                if regions:
+                    self.refresh(regions)
+
+            self._wake.wait(max(0.0, next_full - time.monotonic()))
+            self._wake.clear()
+
+    def status(self):
+        with self._lock:
+            return {
+                'account': self.account,
+                'profile': self.profile,
+                'regions': self.regions,
+                'all_regions': self.all_regions,
+                'ready': all(r in self._functions or r in self._errors for r in self.regions),
+                'functions': sum(len(functions) for functions in self._functions.values()),
+                'started_at': self.started_at,
+                'refreshed_at': dict(self._refreshed_at),
+                'errors': dict(self._errors),
+            }
+
+    def query(self, regions=(), function_filter=None):
+        """Inventory records of the functions in regions matching the globs (all if none)"""
+        with self._lock:
+            snapshot = {
+                region: functions for region, functions in self._functions.items()
+                if not regions or any(fnmatch.fnmatchcase(region, pattern) for pattern in regions)
+            }
+            errors = {
+                region: message for region, message in self._errors.items()
+                if region not in snapshot
+                and (not regions or any(fnmatch.fnmatchcase(region, pattern) for pattern in regions))
+            }
+
+        records = {}
+        for region, functions in snapshot.items():
+            if function_filter is not None:
+                functions = [f for f in functions if function_filter.matches(f)]
+            records[region] = [inventory_record(f) for f in functions]
+        return {'regions': records, 'errors': errors}
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    """GET /status, GET /functions?region=&name=&runtime=&only_public=&only_misconfigured=, POST /refresh?region="""
+
+    server_version = 'aws-assistant'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _authorized(self):
+        if self.headers.get('Authorization') == f'Bearer {self.server.token}':
+            return True
+        self._reply(401, {'error': 'missing or wrong token'})
+        return False
+
+    def _reply(self, status, body):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        url = urlsplit(self.path)
+        params = parse_qs(url.query)
+        inventory = self.server.inventory
+
+        if url.path == '/status':
+            self._reply(200, inventory.status())
+        elif url.path == '/functions':
+            function_filter = FunctionFilter(
+                params.get('name', ()),
+                params.get('runtime', ()),
+                params.get('only_public', ['0'])[0] == '1',
+                params.get('only_misconfigured', ['0'])[0] == '1'
+            )
+            self._reply(200, inventory.query(params.get('region', ()), function_filter))
+        else:
+            self._reply(404, {'error': f'no such endpoint: {url.path}'})
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        url = urlsplit(self.path)
+
+        if url.path == '/refresh':
+            self.server.inventory.request_refresh(parse_qs(url.query).get('region'))
+            self._reply(202, {'refreshing': True})
+        else:
+            self._reply(404, {'error': f'no such endpoint: {url.path}'})
+
+
+class _HttpServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+class _UnixHttpServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        # BaseHTTPRequestHandler expects a (host, port) client address
+        return request, ('local', 0)
+
+
+def create_server(inventory, host='127.0.0.1', port=0, socket_path=None):
+    """An HTTP server answering queries about inventory, on localhost or a Unix socket"""
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = _UnixHttpServer(socket_path, _RequestHandler)
+        os.chmod(socket_path, 0o600)
+    else:
+        server = _HttpServer((host, port), _RequestHandler)
+    server.inventory = inventory
+    server.token = secrets.token_urlsafe(24)
+    return server
+
+
+def server_address(server):
+    if isinstance(server, _UnixHttpServer):
+        return {'socket': server.server_address}
+    host, port = server.server_address[:2]
+    return {'host': host, 'port': port}
+
+
+def write_state(server, inventory, path=None):
+    """Record where the daemon listens, so scan and fix-cors can find it. Only the owner can read it."""
+    path = path or default_state_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    state = dict(server_address(server), token=server.token, pid=os.getpid(),
+                 account=inventory.account, profile=inventory.profile)
+
+    partial = path + '.partial'
+    fd = os.open(partial, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w') as f:
+        json.dump(state, f)
+    os.replace(partial, path)
+    return path
+
+
+def remove_state(path=None):
+    path = path or default_state_path()
+    try:
+        with open(path) as f:
+            if json.load(f).get('pid') != os.getpid():
+                return
+        os.unlink(path)
+    except (OSError, ValueError):
+        pass
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path, timeout):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class DaemonError(Exception):
+    pass
+
+
+class DaemonClient:
+    """Queries a running `aws-assistant serve`, found through its state file"""
+
+    def __init__(self, state, timeout=CLIENT_TIMEOUT):
+        self.state = state
+        self.timeout = timeout
+
+    @classmethod
+    def connect(cls, profile=None, path=None, timeout=CLIENT_TIMEOUT):
+        """A client for the daemon serving profile, or None if none is answering"""
+        try:
+            with open(path or default_state_path()) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if state.get('profile') != profile:
+            return None
+
+        client = cls(state, timeout)
+        try:
+            client.status = client._request('GET', '/status')
+        except DaemonError:
+            return None
+        return client
+
+    def _request(self, method, path, params=None):
+        if params:
+            path = f'{path}?{urlencode(params, doseq=True)}'
+        if 'socket' in self.state:
+            connection = _UnixHTTPConnection(self.state['socket'], self.timeout)
+        else:
+            connection = http.client.HTTPConnection(self.state['host'], self.state['port'], timeout=self.timeout)
+
+        try:
+            connection.request(method, path, headers={'Authorization': f"Bearer {self.state['token']}"})
+            response = connection.getresponse()
+            body = json.loads(response.read() or b'{}')
+        except (OSError, ValueError, http.client.HTTPException) as e:
+            raise DaemonError(f'daemon did not answer: {e}')
+        finally:
+            connection.close()
+
+        if response.status >= 400:
+            raise DaemonError(body.get('error', f'HTTP {response.status}'))
+        return body
+
+    @property
+    def account(self):
+        return self.status['account']
+
+    def covers(self, regions):
+        """Whether the daemon serves every region these --regions names select"""
+        if self.status['all_regions']:
+            return True
+        return bool(regions) and all(region in self.status['regions'] for region in regions)
+
+    def functions(self, regions=(), function_filter=None):
+        """{region: [FunctionRecord]} and {region: error} for regions the daemon could not load"""
+        params = {'region': list(regions)}
+        if function_filter is not None:
+            params.update(
+                name=list(function_filter.names),
+                runtime=list(function_filter.runtimes),
+                only_public=int(function_filter.only_public),
+                only_misconfigured=int(function_filter.only_misconfigured)
+            )
+        body = self._request('GET', '/functions', params)
+        functions = {
+            region: [function_from_record(row) for row in rows]
+            for region, rows in body['regions'].items()
+        }
+        return functions, body['errors']
+
+    def request_refresh(self, regions=None):
+        self._request('POST', '/refresh', {'region': list(regions or ())})
@@ -0,0 +1,11 @@
+# Option defaults, kept free of heavy imports so the CLI can build its
+# options and --help without loading boto3 or rich
+DEFAULT_CONCURRENCY = 8
+DEFAULT_ACCOUNT_CONCURRENCY = 4
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_TTL = 15 * 60
+DEFAULT_REMAP_AGE = 60 * 60
+DEFAULT_REFRESH_INTERVAL = 5 * 60
+DEFAULT_PREFLIGHT_CONCURRENCY = 20
+DEFAULT_PREFLIGHT_ATTEMPTS = 5
+DEFAULT_PREFLIGHT_TIMEOUT = 10.0
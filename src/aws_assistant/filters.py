@@ -0,0 +1,45 @@
+import fnmatch
+
+
+class FunctionFilter:
+    """Which functions scan reports, split by how early each test can run.
+
+    Name and runtime come with the ListFunctions entry, so they are checked
+    before any per-function call. Public and misconfigured need the Function
+    URL and API Gateway state, so they are checked last.
+    """
+
+    def __init__(self, names=(), runtimes=(), only_public=False, only_misconfigured=False):
+        self.names = tuple(names)
+        self.runtimes = tuple(runtimes)
+        self.only_public = only_public
+        self.only_misconfigured = only_misconfigured
+
+    @property
+    def active(self):
+        return bool(self.names or self.runtimes or self.only_public or self.only_misconfigured)
+
+    def matches_listing(self, function):
+        """Name and runtime tests, on a record straight from ListFunctions"""
+        if self.names and not any(fnmatch.fnmatchcase(function.function_name, p) for p in self.names):
+            return False
+        if self.runtimes and not any(fnmatch.fnmatchcase(function.runtime or '', p) for p in self.runtimes):
+            return False
+        return True
+
+    def matches(self, function):
+        """Every test, on a record with its URL and API state filled in"""
+        if not self.matches_listing(function):
+            return False
+
+        public = function.has_function_url or function.has_api_gateway
+        if (self.only_public or self.only_misconfigured) and not public:
+            return False
+
+        if self.only_misconfigured:
+            url_misconfigured = function.has_function_url and not function.function_url_cors_configured
+            api_misconfigured = any(not api.cors_configured for api in function.api_gateways)
+            if not (url_misconfigured or api_misconfigured):
+                return False
+
+        return True
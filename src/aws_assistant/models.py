@@ -0,0 +1,92 @@
+import sys
+
+
+def _intern(value):
+    return sys.intern(value) if value else value
+
+
+class ApiLink:
+    """One API Gateway API in front of a function.
+
+    A single instance is shared by every function the API integrates with,
+    and its type and name strings are interned.
+    """
+
+    __slots__ = ('type', 'api_id', 'api_name', 'cors_configured')
+
+    def __init__(self, type, api_id, api_name, cors_configured):
+        self.type = _intern(type)
+        self.api_id = api_id
+        self.api_name = _intern(api_name)
+        self.cors_configured = cors_configured
+
+    def __repr__(self):
+        return f'ApiLink({self.type!r}, {self.api_id!r}, {self.api_name!r}, {self.cors_configured!r})'
+
+    def to_dict(self):
+        return {
+            'type': self.type,
+            'api_id': self.api_id,
+            'api_name': self.api_name,
+            'cors_configured': self.cors_configured
+        }
+
+
+class FunctionRecord:
+    """The fields the tool uses from a Lambda function, and nothing else.
+
+    Built straight from a list_functions entry, so environment variables,
+    layers, VPC config and the rest of the listing are never kept.
+    """
+
+    __slots__ = (
+        'account',
+        'region',
+        'function_name',
+        'function_arn',
+        'runtime',
+        'last_modified',
+        'code_sha256',
+        'has_function_url',
+        'function_url_cors_configured',
+        'function_url',
+        'api_gateways',
+    )
+
+    def __init__(self, region, function_name, function_arn, runtime=None,
+                 last_modified=None, code_sha256=None, has_function_url=False,
+                 function_url_cors_configured=False, function_url=None, api_gateways=(),
+                 account=None):
+        self.account = _intern(account)
+        self.region = _intern(region)
+        self.function_name = function_name
+        self.function_arn = function_arn
+        self.runtime = _intern(runtime)
+        self.last_modified = last_modified
+        self.code_sha256 = code_sha256
+        self.has_function_url = has_function_url
+        self.function_url_cors_configured = function_url_cors_configured
+        self.function_url = function_url
+        self.api_gateways = api_gateways
+
+    @classmethod
+    def from_listing(cls, function, region):
+        return cls(
+            region,
+            function['FunctionName'],
+            function['FunctionArn'],
+            runtime=function.get('Runtime'),
+            last_modified=function.get('LastModified'),
+            code_sha256=function.get('CodeSha256')
+        )
+
+    def __repr__(self):
+        return f'FunctionRecord({self.region!r}, {self.function_name!r})'
+
+    @property
+    def has_api_gateway(self):
+        return len(self.api_gateways) > 0
+
+    def set_url_state(self, url_state):
+        """Apply a (has_url, cors_configured, url) tuple"""
+        self.has_function_url, self.function_url_cors_configured, self.function_url = url_state
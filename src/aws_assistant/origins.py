@@ -0,0 +1,387 @@
+import json
+import os
+import re
+from collections import deque
+from urllib.parse import urlsplit
+
+ORIGIN_ENV_VARS = (
+    'REACT_APP_URL',
+    'NEXT_PUBLIC_URL',
+    'NEXT_PUBLIC_SITE_URL',
+    'VITE_URL',
+    'VITE_APP_URL',
+    'VUE_APP_URL',
+    'PUBLIC_URL',
+    'APP_URL',
+    'FRONTEND_URL',
+)
+
+# Never walked into, whatever .gitignore says
+SKIP_DIRS = {'node_modules', '.git', '.hg', '.svn'}
+# Deep enough for apps/<name>/ and packages/<scope>/<name>/ layouts
+MAX_DEPTH = 6
+# Files and directories looked at before the walk gives up on the rest
+MAX_ENTRIES = 20000
+
+VITE_CONFIGS = {f'vite.config.{ext}' for ext in ('js', 'mjs', 'cjs', 'ts', 'mts', 'cts')}
+NEXT_CONFIGS = {f'next.config.{ext}' for ext in ('js', 'mjs', 'cjs', 'ts')}
+ENV_EXAMPLES = ('.example', '.sample', '.template', '.dist')
+# Bumped whenever what a file provides changes, so cached results are not reused
+CACHE_VERSION = 2
+
+_ENV_ASSIGNMENT = re.compile(
+    r'''\b(%s)\b["']?\s*[:=]\s*["'`]([^"'`\s]+)["'`]''' % '|'.join(ORIGIN_ENV_VARS)
+)
+_ORIGIN_OPTION = re.compile(r'''\b(origin)\s*:\s*["'`](https?://[^"'`\s]+)["'`]''')
+_PORT_OPTION = re.compile(r'\bport\s*:\s*(\d{2,5})\b')
+_DEV_SERVER_OPTIONS = re.compile(r'\b(server|preview)\s*:\s*\{')
+# Block comments, and line comments not part of a URL such as http://
+_JS_COMMENT = re.compile(r'/\*.*?\*/|(?<![:"\'`\w])//[^\n]*', re.S)
+_DEV_SCRIPT_PORT = re.compile(r'\b(?:next|vite)\b[^&|;]*?(?:-p|--port)[ =](\d{2,5})\b')
+
+
+def normalize_origin(value):
+    """scheme://host[:port] of an http(s) URL, or None for anything else"""
+    parts = urlsplit(value.strip().strip('"\''))
+    if parts.scheme not in ('http', 'https') or not parts.netloc:
+        return None
+    return f'{parts.scheme}://{parts.netloc.lower()}'
+
+
+def _gitignore_regex(pattern):
+    """A regex for one .gitignore pattern, matched against paths relative to its directory"""
+    regex = ''
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith('**/', i):
+            regex += '(?:.*/)?'
+            i += 3
+        elif pattern.startswith('**', i):
+            regex += '.*'
+            i += 2
+        elif pattern[i] == '*':
+            regex += '[^/]*'
+            i += 1
+        elif pattern[i] == '?':
+            regex += '[^/]'
+            i += 1
+        elif pattern[i] == '[' and ']' in pattern[i + 1:]:
+            end = pattern.index(']', i + 1)
+            regex += '[' + pattern[i + 1:end].replace('!', '^', 1) + ']'
+            i = end + 1
+        else:
+            regex += re.escape(pattern[i])
+            i += 1
+    return re.compile(regex + r'\Z')
+
+
+class GitIgnore:
+    """The .gitignore rules in force in one directory, including its parents'"""
+
+    def __init__(self, rules=()):
+        # (base, regex, negate, dir_only, anchored), base relative to the walk root
+        self.rules = list(rules)
+
+    def extended(self, base, path):
+        """These rules plus the ones in path, a .gitignore in directory base"""
+        rules = list(self.rules)
+        try:
+            with open(path, encoding='utf-8', errors='replace') as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return self
+
+        for line in lines:
+            line = line.rstrip()
+            if not line or line.startswith('#'):
+                continue
+            negate = line.startswith('!')
+            if negate:
+                line = line[1:]
+            dir_only = line.endswith('/')
+            if dir_only:
+                line = line[:-1]
+            # A slash anywhere but the end ties the pattern to this directory
+            anchored = '/' in line
+            rules.append((base, _gitignore_regex(line.lstrip('/')), negate, dir_only, anchored))
+        return GitIgnore(rules)
+
+    def ignores(self, rel_path, is_dir):
+        ignored = False
+        name = rel_path.rsplit('/', 1)[-1]
+        for base, regex, negate, dir_only, anchored in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if base:
+                if not rel_path.startswith(base + '/'):
+                    continue
+                relative = rel_path[len(base) + 1:]
+            else:
+                relative = rel_path
+            if regex.match(relative if anchored else name):
+                ignored = not negate
+        return ignored
+
+
+def _is_workspace_root(path):
+    """Whether path holds a pnpm workspace or a package.json declaring workspaces"""
+    if os.path.isfile(os.path.join(path, 'pnpm-workspace.yaml')):
+        return True
+    try:
+        with open(os.path.join(path, 'package.json'), encoding='utf-8') as f:
+            return bool(json.load(f).get('workspaces'))
+    except (OSError, ValueError, AttributeError):
+        return False
+
+
+def find_project_root(start):
+    """The project start is in: its git work tree, else its outermost workspace, else its nearest package.
+
+    Returns None when start is in none of them, e.g. a home directory.
+    """
+    nearest_package = None
+    workspace = None
+    path = os.path.abspath(start)
+    while True:
+        if os.path.exists(os.path.join(path, '.git')):
+            return path
+        if _is_workspace_root(path):
+            workspace = path
+        elif nearest_package is None and os.path.isfile(os.path.join(path, 'package.json')):
+            nearest_package = path
+        parent = os.path.dirname(path)
+        if parent == path:
+            return workspace or nearest_package
+        path = parent
+
+
+def iter_project_files(root, max_depth=MAX_DEPTH, max_entries=MAX_ENTRIES):
+    """(relative path, DirEntry) of every file under root, in one breadth-first scandir pass.
+
+    node_modules, VCS directories and whatever .gitignore files exclude
+    are never entered; ignored files are skipped too, except .env files.
+    Shallower files come first, and the walk stops after max_entries
+    files and directories.
+    """
+    queue = deque([('', GitIgnore(), 0)])
+    visited = 0
+    while queue:
+        rel_dir, ignore, depth = queue.popleft()
+        try:
+            with os.scandir(os.path.join(root, rel_dir) if rel_dir else root) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            continue
+
+        if any(entry.name == '.gitignore' for entry in entries):
+            ignore = ignore.extended(rel_dir, os.path.join(root, rel_dir, '.gitignore'))
+
+        for entry in entries:
+            visited += 1
+            if visited > max_entries:
+                return
+            rel_path = f'{rel_dir}/{entry.name}' if rel_dir else entry.name
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+            if is_dir:
+                if entry.name not in SKIP_DIRS and depth < max_depth and not ignore.ignores(rel_path, True):
+                    queue.append((rel_path, ignore, depth + 1))
+            elif _is_env_file(entry.name) or not ignore.ignores(rel_path, False):
+                # .env files are ignored so they stay out of git, not because they do not matter
+                yield rel_path, entry
+
+
+def _is_env_file(name):
+    return (name == '.env' or name.startswith('.env.')) and not name.endswith(ENV_EXAMPLES)
+
+
+def is_origin_source(name):
+    return (
+        name in ('package.json', 'vercel.json', 'netlify.toml')
+        or name in VITE_CONFIGS
+        or name in NEXT_CONFIGS
+        or _is_env_file(name)
+    )
+
+
+def _env_file_origins(text):
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith('export '):
+            line = line[len('export '):]
+        name, sep, value = line.partition('=')
+        if sep and name.strip() in ORIGIN_ENV_VARS:
+            yield value.split(' #', 1)[0], name.strip()
+
+
+def _package_origins(text):
+    data = json.loads(text)
+    if isinstance(data.get('homepage'), str):
+        yield data['homepage'], 'homepage'
+    scripts = data.get('scripts') or {}
+    for script in ('dev', 'start'):
+        match = _DEV_SCRIPT_PORT.search(scripts.get(script) or '')
+        if match:
+            yield f'http://localhost:{match.group(1)}', f'scripts.{script}'
+
+
+def _vercel_origins(text):
+    data = json.loads(text)
+    for env in (data.get('env') or {}, (data.get('build') or {}).get('env') or {}):
+        for var in ORIGIN_ENV_VARS:
+            if isinstance(env.get(var), str):
+                yield env[var], var
+
+
+def _own_options(text, start):
+    """The text of the object literal opening at text[start], without any objects nested in it"""
+    depth = 0
+    options = []
+    for char in text[start:]:
+        if char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if not depth:
+                break
+        elif depth == 1:
+            options.append(char)
+    return ''.join(options)
+
+
+def _config_origins(text):
+    """Origins a Vite or Next config sets: URL variables, server.origin and dev server ports.
+
+    Only server.port and preview.port count as ports; others, such as
+    server.hmr.port or a proxy's, are not where the app is served.
+    """
+    text = _JS_COMMENT.sub('', text)
+    for match in _ENV_ASSIGNMENT.finditer(text):
+        yield match.group(2), match.group(1)
+    for match in _ORIGIN_OPTION.finditer(text):
+        yield match.group(2), match.group(1)
+    for match in _DEV_SERVER_OPTIONS.finditer(text):
+        port = _PORT_OPTION.search(_own_options(text, match.end() - 1))
+        if port:
+            yield f'http://localhost:{port.group(1)}', f'{match.group(1)}.port'
+
+
+def read_origins(path, name):
+    """[(origin, detail)] one file provides, e.g. ('https://myapp.com', 'homepage')"""
+    try:
+        with open(path, encoding='utf-8', errors='replace') as f:
+            text = f.read()
+        if name == 'package.json':
+            found = list(_package_origins(text))
+        elif name == 'vercel.json':
+            found = list(_vercel_origins(text))
+        elif name in VITE_CONFIGS or name in NEXT_CONFIGS:
+            found = list(_config_origins(text))
+        elif name == 'netlify.toml':
+            found = [(m.group(2), m.group(1)) for m in _ENV_ASSIGNMENT.finditer(text)]
+        else:
+            found = list(_env_file_origins(text))
+    except (OSError, ValueError, AttributeError):
+        return []
+
+    origins = []
+    for value, detail in found:
+        origin = normalize_origin(value)
+        if origin and [origin, detail] not in origins:
+            origins.append([origin, detail])
+    return origins
+
+
+class OriginCache:
+    """What each project file provided, keyed by path and reused while its mtime and size are unchanged.
+
+    Entries written under another CACHE_VERSION are dropped, so files are
+    read again whenever the rules for what they provide change.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self.changed = False
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            if isinstance(data, dict) and data.get('version') == CACHE_VERSION:
+                self.entries = data['files']
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def origins(self, path, stat, name):
+        key = [stat.st_mtime_ns, stat.st_size]
+        entry = self.entries.get(path)
+        if entry is not None and entry[0] == key:
+            return entry[1]
+        origins = read_origins(path, name)
+        self.entries[path] = [key, origins]
+        self.changed = True
+        return origins
+
+    def forget_missing(self, root, seen):
+        """Drop entries for files under root the last walk no longer found"""
+        prefix = os.path.join(root, '')
+        for path in [p for p in self.entries if p.startswith(prefix) and p not in seen]:
+            del self.entries[path]
+            self.changed = True
+
+    def save(self):
+        if not self.changed:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            partial = self.path + '.partial'
+            with open(partial, 'w') as f:
+                json.dump({'version': CACHE_VERSION, 'files': self.entries}, f)
+            os.replace(partial, self.path)
+        except OSError:
+            pass
+
+
+def detect_origins(start='.', cache=None, environ=None):
+    """[(origin, [source, ...])] found in the project start is in and the environment.
+
+    The whole project from find_project_root is walked. Outside any
+    project only start itself is read, without entering subdirectories.
+    Every origin is listed once, in the order first found, with each place
+    it was found, e.g. ('https://myapp.com', ['apps/web/.env.production
+    (NEXT_PUBLIC_URL)', 'apps/web/package.json (homepage)']), relative to
+    the directory walked.
+    """
+    root = find_project_root(start)
+    max_depth = MAX_DEPTH
+    if root is None:
+        root = os.path.abspath(start)
+        max_depth = 0
+    found = {}
+    seen = set()
+
+    for rel_path, entry in iter_project_files(root, max_depth):
+        if not is_origin_source(entry.name):
+            continue
+        seen.add(entry.path)
+        if cache is not None:
+            try:
+                origins = cache.origins(entry.path, entry.stat(), entry.name)
+            except OSError:
+                continue
+        else:
+            origins = read_origins(entry.path, entry.name)
+        for origin, detail in origins:
+            found.setdefault(origin, []).append(f'{rel_path} ({detail})')
+
+    environ = os.environ if environ is None else environ
+    for var in ORIGIN_ENV_VARS:
+        origin = normalize_origin(environ.get(var) or '')
+        if origin:
+            found.setdefault(origin, []).append(f'environment variable ({var})')
+
+    if cache is not None:
+        cache.forget_missing(root, seen)
+        cache.save()
+    return list(found.items())
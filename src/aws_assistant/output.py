@@ -0,0 +1,142 @@
+import csv
+import json
+
+from .models import ApiLink, FunctionRecord
+
+OUTPUT_FORMATS = ['table', 'jsonl', 'json', 'csv']
+
+RECORD_FIELDS = [
+    'Account',
+    'Region',
+    'FunctionName',
+    'Runtime',
+    'HasFunctionUrl',
+    'FunctionUrlCorsConfigured',
+    'FunctionUrl',
+    'ApiGateways',
+]
+
+
+def function_record(function):
+    """The fields scan reports for a FunctionRecord, as a plain dict"""
+    return {
+        'Account': function.account,
+        'Region': function.region,
+        'FunctionName': function.function_name,
+        'Runtime': function.runtime,
+        'HasFunctionUrl': function.has_function_url,
+        'FunctionUrlCorsConfigured': function.function_url_cors_configured,
+        'FunctionUrl': function.function_url,
+        'ApiGateways': [api.to_dict() for api in function.api_gateways],
+    }
+
+
+def inventory_record(function):
+    """function_record plus the FunctionArn, for records the tool reads back itself"""
+    record = function_record(function)
+    record['FunctionArn'] = function.function_arn
+    return record
+
+
+def function_from_record(row):
+    """The FunctionRecord behind a dict from function_record.
+
+    FunctionArn is optional, since scan --output does not write it.
+    """
+    return FunctionRecord(
+        row['Region'],
+        row['FunctionName'],
+        row.get('FunctionArn'),
+        runtime=row.get('Runtime'),
+        has_function_url=bool(row.get('HasFunctionUrl')),
+        function_url_cors_configured=bool(row.get('FunctionUrlCorsConfigured')),
+        function_url=row.get('FunctionUrl') or None,
+        api_gateways=tuple(
+            ApiLink(api['type'], api['api_id'], api['api_name'], api['cors_configured'])
+            for api in row.get('ApiGateways', [])
+        ),
+        account=row.get('Account') or None
+    )
+
+
+class JsonLinesWriter:
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, record):
+        self.stream.write(json.dumps(record) + '\n')
+
+    def flush(self):
+        self.stream.flush()
+
+    def close(self):
+        self.flush()
+
+
+class JsonArrayWriter:
+    """Writes one JSON array incrementally, without holding the records"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.count = 0
+        self.stream.write('[')
+
+    def write(self, record):
+        self.stream.write(',\n' if self.count else '\n')
+        self.stream.write(json.dumps(record))
+        self.count += 1
+
+    def flush(self):
+        self.stream.flush()
+
+    def close(self):
+        self.stream.write('\n]\n' if self.count else ']\n')
+        self.flush()
+
+
+class CsvWriter:
+    """CSV with ApiGateways encoded as a JSON string in its column"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.writer = csv.DictWriter(stream, fieldnames=RECORD_FIELDS)
+        self.writer.writeheader()
+
+    def write(self, record):
+        row = dict(record)
+        row['ApiGateways'] = json.dumps(row['ApiGateways'])
+        self.writer.writerow(row)
+
+    def flush(self):
+        self.stream.flush()
+
+    def close(self):
+        self.flush()
+
+
+def open_record_writer(output_format, stream):
+    writers = {
+        'jsonl': JsonLinesWriter,
+        'json': JsonArrayWriter,
+        'csv': CsvWriter,
+    }
+    return writers[output_format](stream)
+
+
+def read_function_records(path):
+    """Load FunctionRecords back from a file written by scan --output"""
+    with open(path, 'r', newline='') as f:
+        if path.endswith('.csv'):
+            rows = list(csv.DictReader(f))
+            for row in rows:
+                row['HasFunctionUrl'] = row['HasFunctionUrl'] == 'True'
+                row['FunctionUrlCorsConfigured'] = row['FunctionUrlCorsConfigured'] == 'True'
+                row['ApiGateways'] = json.loads(row['ApiGateways'] or '[]')
+        else:
+            content = f.read()
+            if content.lstrip().startswith('['):
+                rows = json.loads(content)
+            else:
+                rows = [json.loads(line) for line in content.splitlines() if line.strip()]
+
+    return [function_from_record(row) for row in rows]
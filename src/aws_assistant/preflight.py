@@ -0,0 +1,277 @@
+import asyncio
+import re
+import ssl
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from .clients import get_client
+from .cors import get_current_cors
+from .defaults import DEFAULT_PREFLIGHT_ATTEMPTS, DEFAULT_PREFLIGHT_CONCURRENCY, DEFAULT_PREFLIGHT_TIMEOUT
+
+# Waits between attempts double from the first to the cap
+RETRY_DELAY = 1.0
+MAX_RETRY_DELAY = 8.0
+# Sent as the Origin when the allowed origin is *
+PROBE_ORIGIN = 'https://example.com'
+REQUEST_HEADERS = 'content-type'
+
+
+class PreflightCheck:
+    """One endpoint to send preflights to, once per origin"""
+
+    __slots__ = ('kind', 'region', 'name', 'url', 'origins', 'method')
+
+    def __init__(self, kind, region, name, url, origins, method='POST'):
+        self.kind = kind
+        self.region = region
+        self.name = name
+        self.url = url
+        self.origins = list(origins)
+        self.method = method
+
+
+class PreflightResult:
+    """How one endpoint answered a preflight from one origin, on the last attempt"""
+
+    __slots__ = ('check', 'origin', 'status', 'problem', 'latency_ms', 'attempts')
+
+    def __init__(self, check, origin, status=None, problem=None, latency_ms=None, attempts=0):
+        self.check = check
+        self.origin = origin
+        self.status = status
+        self.problem = problem
+        self.latency_ms = latency_ms
+        self.attempts = attempts
+
+    @property
+    def passed(self):
+        return self.problem is None
+
+    def to_dict(self):
+        return {
+            'kind': self.check.kind,
+            'region': self.check.region,
+            'name': self.check.name,
+            'url': self.check.url,
+            'origin': self.origin,
+            'passed': self.passed,
+            'status': self.status,
+            'problem': self.problem,
+            'latency_ms': None if self.latency_ms is None else round(self.latency_ms, 1),
+            'attempts': self.attempts,
+        }
+
+
+def http_api_check(region, api_id, name, origins):
+    """A check on the API's $default stage, or else its first stage.
+
+    Returns None when the API has no stage to call.
+    """
+    apigw2_client = get_client('apigatewayv2', region)
+    paginator = apigw2_client.get_paginator('get_stages')
+    stages = [stage['StageName'] for page in paginator.paginate(ApiId=api_id) for stage in page.get('Items', [])]
+    if not stages:
+        return None
+    # The $default stage is served from the root; any other stage under its name
+    path = '/' if '$default' in stages else f'/{min(stages)}/'
+    return PreflightCheck('HTTP API', region, name, f'https://{api_id}.execute-api.{region}.amazonaws.com{path}', origins)
+
+
+def rest_api_check(region, api_id, name, origins):
+    """A check on the first resource with a method, under the API's first stage.
+
+    Returns None when the API has no deployed stage to call.
+    """
+    apigw_client = get_client('apigateway', region)
+    stages = apigw_client.get_stages(restApiId=api_id).get('item', [])
+    if not stages:
+        return None
+    stage = min(stage['stageName'] for stage in stages)
+
+    path, method = '/', 'GET'
+    paginator = apigw_client.get_paginator('get_resources')
+    resources = [
+        resource
+        for page in paginator.paginate(restApiId=api_id)
+        for resource in page.get('items', [])
+    ]
+    for resource in sorted(resources, key=lambda r: r['path']):
+        methods = sorted(m for m in resource.get('resourceMethods', {}) if m != 'OPTIONS')
+        if methods:
+            # Path parameters such as {id} or {proxy+} get a placeholder value
+            path = re.sub(r'\{[^}]+\}', 'x', resource['path'])
+            method = 'POST' if 'ANY' in methods else methods[0]
+            break
+
+    return PreflightCheck('REST API', region, name, f'https://{api_id}.execute-api.{region}.amazonaws.com/{stage}{path}',
+                          origins, method)
+
+
+def preflight_checks(plan, function_urls, origins=None, concurrency=DEFAULT_PREFLIGHT_CONCURRENCY):
+    """(checks, skipped) for the targets of a CORS plan.
+
+    function_urls maps (region, function_name) to its Function URL. Without
+    origins, each Function URL and HTTP API is checked with the origins it
+    is configured with; REST APIs then need origins to be given. skipped is
+    a list of (target, reason).
+    """
+
+    def build(cors_target):
+        target_origins = origins
+        if target_origins is None:
+            current = get_current_cors(cors_target)
+            if current is None:
+                return None, 'give --origin to check REST APIs'
+            target_origins = current.get('AllowOrigins') or []
+            if not target_origins:
+                return None, 'no CORS configured'
+
+        if cors_target.kind == 'Function URL':
+            url = function_urls.get((cors_target.region, cors_target.resource_id))
+            if not url:
+                return None, 'Function URL unknown'
+            return PreflightCheck(cors_target.kind, cors_target.region, cors_target.name, url, target_origins), None
+        if cors_target.kind == 'HTTP API':
+            check = http_api_check(cors_target.region, cors_target.resource_id, cors_target.name, target_origins)
+        else:
+            check = rest_api_check(cors_target.region, cors_target.resource_id, cors_target.name, target_origins)
+        if check is None:
+            return None, 'no deployed stage'
+        return check, None
+
+    checks = []
+    skipped = []
+    if not plan:
+        return checks, skipped
+
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(plan))) as pool:
+        futures = [(cors_target, pool.submit(build, cors_target)) for cors_target in plan]
+        for cors_target, future in futures:
+            try:
+                check, reason = future.result()
+            except Exception as e:
+                check, reason = None, f'could not read its settings: {e}'
+            if check is None:
+                skipped.append((cors_target, reason))
+            else:
+                checks.append(check)
+    return checks, skipped
+
+
+async def send_preflight(url, origin, method='POST', timeout=DEFAULT_PREFLIGHT_TIMEOUT, ssl_context=None):
+    """OPTIONS url as a browser would before a cross-origin request; returns (status, headers)"""
+    parts = urlsplit(url)
+    secure = parts.scheme == 'https'
+    path = parts.path or '/'
+    if parts.query:
+        path += '?' + parts.query
+
+    reader, writer = await asyncio.wait_for(
+        asyncio.open_connection(
+            parts.hostname,
+            parts.port or (443 if secure else 80),
+            ssl=(ssl_context or ssl.create_default_context()) if secure else None
+        ),
+        timeout
+    )
+    try:
+        writer.write((
+            f'OPTIONS {path} HTTP/1.1\r\n'
+            f'Host: {parts.netloc}\r\n'
+            f'Origin: {origin}\r\n'
+            f'Access-Control-Request-Method: {method}\r\n'
+            f'Access-Control-Request-Headers: {REQUEST_HEADERS}\r\n'
+            'User-Agent: aws-assistant\r\n'
+            'Connection: close\r\n'
+            '\r\n'
+        ).encode('latin-1'))
+        await writer.drain()
+        # Only the status line and headers matter to a preflight
+        head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), timeout)
+    finally:
+        writer.close()
+        try:
+            await asyncio.wait_for(writer.wait_closed(), timeout)
+        except (OSError, asyncio.TimeoutError):
+            pass
+
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split()[1])
+    headers = {}
+    for line in lines[1:]:
+        name, sep, value = line.partition(':')
+        if sep:
+            headers[name.strip().lower()] = value.strip()
+    return status, headers
+
+
+def preflight_problem(status, headers, origin, method):
+    """Why a browser would reject this preflight response, or None if it would pass"""
+    if not 200 <= status < 300:
+        return f'HTTP {status}'
+
+    allowed = headers.get('access-control-allow-origin')
+    if allowed is None:
+        return 'no Access-Control-Allow-Origin'
+    if allowed != '*' and allowed.rstrip('/').lower() != origin.rstrip('/').lower():
+        return f'Access-Control-Allow-Origin is {allowed}'
+
+    methods = headers.get('access-control-allow-methods')
+    if methods is not None:
+        allowed_methods = {m.strip().upper() for m in methods.split(',')}
+        if '*' not in allowed_methods and method not in allowed_methods:
+            return f'{method} not in Access-Control-Allow-Methods'
+
+    allowed_headers = headers.get('access-control-allow-headers')
+    if allowed_headers is not None:
+        allowed_headers = {h.strip().lower() for h in allowed_headers.split(',')}
+        if '*' not in allowed_headers and REQUEST_HEADERS not in allowed_headers:
+            return f'{REQUEST_HEADERS} not in Access-Control-Allow-Headers'
+    return None
+
+
+async def _check_origin(check, origin, semaphore, attempts, timeout, ssl_context):
+    sent_origin = PROBE_ORIGIN if origin == '*' else origin
+    result = PreflightResult(check, origin)
+    delay = RETRY_DELAY
+
+    for attempt in range(1, attempts + 1):
+        result.attempts = attempt
+        # Only the request holds a slot; waiting to retry does not
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                result.status, headers = await send_preflight(check.url, sent_origin, check.method, timeout, ssl_context)
+                result.problem = preflight_problem(result.status, headers, sent_origin, check.method)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                    ValueError, IndexError) as e:
+                result.status = None
+                result.problem = f'no response: {e or type(e).__name__}'
+            result.latency_ms = (time.perf_counter() - started) * 1000
+
+        if result.passed or attempt == attempts:
+            break
+        # A change can take a few seconds to reach every edge
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, MAX_RETRY_DELAY)
+
+    return result
+
+
+async def _verify(checks, concurrency, attempts, timeout):
+    semaphore = asyncio.Semaphore(concurrency)
+    ssl_context = ssl.create_default_context()
+    return await asyncio.gather(*(
+        _check_origin(check, origin, semaphore, attempts, timeout, ssl_context)
+        for check in checks
+        for origin in check.origins
+    ))
+
+
+def verify_preflights(checks, concurrency=DEFAULT_PREFLIGHT_CONCURRENCY, attempts=DEFAULT_PREFLIGHT_ATTEMPTS,
+                      timeout=DEFAULT_PREFLIGHT_TIMEOUT):
+    """Send every check's preflights concurrently, retrying failures; PreflightResults in check order"""
+    if not checks:
+        return []
+    return asyncio.run(_verify(checks, concurrency, attempts, timeout))
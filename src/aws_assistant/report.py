@@ -0,0 +1,228 @@
+from rich.table import Table
+
+
+def new_functions_table(title, show_account=False):
+    table = Table(title=title)
+    if show_account:
+        table.add_column("Account", style="green", no_wrap=True)
+    table.add_column("Function Name", style="cyan", no_wrap=True)
+    table.add_column("Region", style="blue")
+    table.add_column("Runtime", style="magenta")
+    table.add_column("Access Type", style="yellow")
+    table.add_column("CORS Status", style="white")
+    return table
+
+
+def function_row(function, show_account=False):
+    """Cells of one function's row in the scan table"""
+    access_types = []
+    cors_statuses = []
+
+    if function.has_function_url:
+        access_types.append("Function URL")
+        if function.function_url_cors_configured:
+            cors_statuses.append("[green]CONFIGURED[/green]")
+        else:
+            cors_statuses.append("[red]NOT CONFIGURED[/red]")
+
+    if function.has_api_gateway:
+        for api in function.api_gateways:
+            access_types.append(f"{api.type}")
+            if api.cors_configured:
+                cors_statuses.append(f"[green]{api.api_name[:15]}[/green]")
+            else:
+                cors_statuses.append(f"[red]{api.api_name[:15]}[/red]")
+
+    if not access_types:
+        access_type = "[yellow]Private[/yellow]"
+        cors_status = "[dim]N/A[/dim]"
+    else:
+        access_type = ", ".join(access_types)
+        cors_status = " | ".join(cors_statuses)
+
+    row = (function.function_name, function.region, function.runtime, access_type, cors_status)
+    if show_account:
+        row = (function.account,) + row
+    return row
+
+
+class ScanSummary:
+    """Running totals for the scan summary, updated as functions arrive"""
+
+    def __init__(self):
+        self.regions = set()
+        self.total = 0
+        self.with_function_url = 0
+        self.with_function_url_cors = 0
+        self.with_api_gateway = 0
+        self.with_api_gateway_cors = 0
+
+    def add(self, function):
+        self.regions.add(function.region)
+        self.total += 1
+
+        if function.has_function_url:
+            self.with_function_url += 1
+            if function.function_url_cors_configured:
+                self.with_function_url_cors += 1
+
+        if function.has_api_gateway:
+            self.with_api_gateway += 1
+            if any(api.cors_configured for api in function.api_gateways):
+                self.with_api_gateway_cors += 1
+
+    def progress(self, scanned, region_count):
+        return (
+            f"[dim]Scanned {scanned}/{region_count} regions: "
+            f"{self.total} functions, "
+            f"{self.with_function_url} with Function URLs ({self.with_function_url_cors} with CORS), "
+            f"{self.with_api_gateway} behind API Gateway ({self.with_api_gateway_cors} with CORS)[/dim]"
+        )
+
+    def print(self, console):
+        console.print(f"\n[bold]Summary:[/bold]")
+        console.print(f"   Total functions: {self.total}")
+        console.print(f"   With Function URLs: {self.with_function_url} ({self.with_function_url_cors} with CORS)")
+        console.print(f"   Behind API Gateway: {self.with_api_gateway} ({self.with_api_gateway_cors} with CORS)")
+
+
+def print_account_summaries(console, accounts):
+    """Per-account totals; accounts maps a profile or role ARN to (account, ScanSummary, error)"""
+    table = Table(title="Accounts")
+    table.add_column("Account", style="green", no_wrap=True)
+    table.add_column("Source", style="cyan")
+    table.add_column("Regions", justify="right")
+    table.add_column("Functions", justify="right")
+    table.add_column("URLs (CORS)", justify="right")
+    table.add_column("APIs (CORS)", justify="right")
+    table.add_column("Status", style="white")
+
+    for source in sorted(accounts, key=str):
+        account, summary, error = accounts[source]
+        table.add_row(
+            account or "-",
+            source or "default",
+            str(len(summary.regions)),
+            str(summary.total),
+            f"{summary.with_function_url} ({summary.with_function_url_cors})",
+            f"{summary.with_api_gateway} ({summary.with_api_gateway_cors})",
+            "[red]FAILED[/red]" if error else "[green]OK[/green]"
+        )
+
+    console.print()
+    console.print(table)
+
+
+def print_call_trace(console, tracer):
+    """AWS calls by total time spent, then the errors that were ignored along the way"""
+    table = Table(title="AWS calls")
+    table.add_column("Service", style="magenta")
+    table.add_column("Operation", style="cyan")
+    table.add_column("Region", style="blue")
+    table.add_column("Calls", justify="right")
+    table.add_column("Errors", justify="right")
+    table.add_column("Retries", justify="right")
+    table.add_column("Total (s)", justify="right")
+    table.add_column("Avg (ms)", justify="right")
+    table.add_column("p95 (ms)", justify="right")
+    table.add_column("Max (ms)", justify="right")
+
+    ranked = sorted(tracer.stats.items(), key=lambda item: item[1].total_ms, reverse=True)
+    for (service, operation, region), stats in ranked:
+        errors = sum(stats.errors.values())
+        table.add_row(
+            service,
+            operation,
+            region,
+            str(stats.calls),
+            f"[red]{errors}[/red]" if errors else "0",
+            str(stats.retries),
+            f"{stats.total_ms / 1000:.2f}",
+            f"{stats.total_ms / stats.calls:.0f}",
+            f"<={stats.percentile(0.95):.0f}",
+            f"{stats.max_ms:.0f}"
+        )
+
+    console.print()
+    console.print(table)
+
+    if tracer.ignored:
+        ignored = Table(title="Ignored errors")
+        ignored.add_column("Where", style="cyan")
+        ignored.add_column("Error", style="red")
+        ignored.add_column("Count", justify="right")
+        for (where, code), count in sorted(tracer.ignored.items()):
+            ignored.add_row(where, code, str(count))
+        console.print(ignored)
+
+
+def print_snapshot_diff(console, changes, show_account=False):
+    """Functions added, removed or changed between two snapshots, new public access first"""
+    styles = {'added': 'green', 'removed': 'red', 'changed': 'yellow'}
+
+    table = Table(title=f"Changes ({len(changes)})")
+    table.add_column("Change", no_wrap=True)
+    if show_account:
+        table.add_column("Account", style="green", no_wrap=True)
+    table.add_column("Function Name", style="cyan", no_wrap=True)
+    table.add_column("Region", style="blue")
+    table.add_column("Details", style="white")
+
+    for change in sorted(changes, key=lambda c: not c['exposure']):
+        style = styles[change['change']]
+        details = list(change['details'])
+        if change['exposure']:
+            details.insert(0, "[bold red]new public access[/bold red]")
+        row = (change['function'], change['region'], ", ".join(details) or "-")
+        if show_account:
+            row = (change['account'] or "-",) + row
+        table.add_row(f"[{style}]{change['change'].upper()}[/{style}]", *row)
+
+    console.print()
+    console.print(table)
+
+    counts = {kind: sum(1 for c in changes if c['change'] == kind) for kind in styles}
+    exposed = sum(1 for c in changes if c['exposure'])
+    console.print(f"\n[bold]Summary:[/bold]")
+    console.print(f"   Added: {counts['added']}, removed: {counts['removed']}, changed: {counts['changed']}")
+    console.print(f"   New public access: {exposed}")
+
+
+def print_preflight_results(console, results, skipped=()):
+    """Pass or fail and latency for each endpoint and origin, then targets that could not be checked"""
+    table = Table(title="CORS preflight checks")
+    table.add_column("Target", style="yellow")
+    table.add_column("Name", style="cyan")
+    table.add_column("Region", style="blue")
+    table.add_column("Origin", style="white")
+    table.add_column("Result", style="white")
+    table.add_column("Latency (ms)", justify="right")
+    table.add_column("Attempts", justify="right")
+
+    for result in results:
+        check = result.check
+        if result.passed:
+            outcome = f"[green]PASS[/green] ({result.status})"
+        else:
+            outcome = f"[red]FAIL: {result.problem}[/red]"
+        table.add_row(
+            check.kind,
+            check.name,
+            check.region or "-",
+            result.origin,
+            outcome,
+            f"{result.latency_ms:.0f}" if result.latency_ms is not None else "-",
+            str(result.attempts)
+        )
+
+    for cors_target, reason in skipped:
+        table.add_row(cors_target.kind, cors_target.name, cors_target.region, "-", f"[yellow]NOT CHECKED: {reason}[/yellow]", "-", "-")
+
+    console.print()
+    console.print(table)
+
+    failed = sum(1 for result in results if not result.passed)
+    if failed:
+        console.print(f"\n[yellow]{failed} of {len(results)} preflight checks failed[/yellow]\n")
+    elif results:
+        console.print(f"\n[bold green]Every preflight check passed ({len(results)})[/bold green]\n")
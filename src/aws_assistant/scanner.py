@@ -0,0 +1,608 @@
+import hashlib
+import json
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from botocore.exceptions import BotoCoreError, ClientError
+
+from .clients import get_client
+from .defaults import DEFAULT_ACCOUNT_CONCURRENCY, DEFAULT_CONCURRENCY
+from .models import ApiLink, FunctionRecord
+from .throttling import is_throttling_error
+from .tracing import tracer
+
+# Up to this many functions left by a name/runtime filter, API links come
+# from each function's resource policy instead of mapping every API
+POLICY_LOOKUP_LIMIT = 20
+
+
+def get_account_id(profile=None):
+    return get_client('sts', 'us-east-1', profile).get_caller_identity()['Account']
+
+
+def _probe_function(function_name, region):
+    lambda_client = get_client('lambda', region)
+    try:
+        return lambda_client.get_function(FunctionName=function_name)
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ResourceNotFoundException':
+            return None
+        raise
+
+
+def locate_function(function_name, regions, concurrency=DEFAULT_CONCURRENCY, find_all=False):
+    """Probe regions concurrently for a function.
+
+    Returns {region: get_function response}. Probing stops at the first hit
+    unless find_all is set. Errors other than ResourceNotFoundException are
+    raised only when no region has the function.
+    """
+    found = {}
+    futures = {}
+    first_error = None
+
+    pool = ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(regions))))
+    try:
+        futures = {pool.submit(_probe_function, function_name, region): region for region in regions}
+
+        for future in as_completed(futures):
+            try:
+                response = future.result()
+            except ClientError as e:
+                first_error = first_error or e
+                continue
+
+            if response is not None:
+                found[futures[future]] = response
+                if not find_all:
+                    break
+    finally:
+        # Python 3.8 has no shutdown(cancel_futures=True)
+        for future in futures:
+            future.cancel()
+        pool.shutdown(wait=False)
+
+    if not found and first_error is not None:
+        raise first_error
+
+    return found
+
+
+def check_function_url_and_cors(lambda_client, function_name, region):
+    try:
+        response = lambda_client.get_function_url_config(FunctionName=function_name)
+        function_url = response.get('FunctionUrl', '')
+        cors_config = response.get('Cors', {})
+        allow_origins = cors_config.get('AllowOrigins', [])
+
+        if allow_origins:
+            return (True, True, function_url)
+        else:
+            return (True, False, function_url)
+
+    except ClientError as e:
+        if is_throttling_error(e):
+            raise
+        error_code = e.response['Error']['Code']
+        if error_code != 'ResourceNotFoundException':
+            tracer.record_ignored('check_function_url_and_cors', e)
+        return (False, False, None)
+
+
+def list_function_records(lambda_client, region):
+    """Every function in the region, projected page by page to FunctionRecord"""
+    functions = []
+    paginator = lambda_client.get_paginator('list_functions')
+    for page in paginator.paginate():
+        functions.extend(
+            FunctionRecord.from_listing(function, region)
+            for function in page.get('Functions', [])
+        )
+    return functions
+
+
+def list_function_url_configs(lambda_client, function_name):
+    """All URL configs of a function, including those on its aliases"""
+    url_configs = []
+    try:
+        paginator = lambda_client.get_paginator('list_function_url_configs')
+        for page in paginator.paginate(FunctionName=function_name):
+            url_configs.extend(page.get('FunctionUrlConfigs', []))
+    except ClientError as e:
+        if is_throttling_error(e):
+            raise
+        # Same outcome as check_function_url_and_cors: unreadable means no URL
+        if e.response['Error']['Code'] != 'ResourceNotFoundException':
+            tracer.record_ignored('list_function_url_configs', e)
+        return []
+    return url_configs
+
+
+def url_state_from_configs(function_arn, url_configs):
+    """Reduce URL configs to the (has_url, cors_configured, url) tuple.
+
+    The unqualified function's URL wins; otherwise the first alias URL is
+    reported.
+    """
+    if not url_configs:
+        return (False, False, None)
+
+    url_config = next(
+        (c for c in url_configs if c.get('FunctionArn') == function_arn),
+        url_configs[0]
+    )
+    cors_config = url_config.get('Cors', {})
+    return (True, bool(cors_config.get('AllowOrigins')), url_config.get('FunctionUrl', ''))
+
+
+def submit_function_url_lookups(lambda_client, functions, pool):
+    """Start URL config lookups for many functions, keyed by FunctionArn"""
+    return {
+        function.function_arn: pool.submit(
+            list_function_url_configs,
+            lambda_client,
+            function.function_name
+        )
+        for function in functions
+    }
+
+
+def join_function_url_states(url_futures):
+    return {
+        function_arn: url_state_from_configs(function_arn, future.result())
+        for function_arn, future in url_futures.items()
+    }
+
+
+def lambda_arn_from_uri(integration_uri):
+    """Unqualified Lambda ARN targeted by an integration URI, if any"""
+    if not integration_uri or 'arn:aws:lambda' not in integration_uri:
+        return None
+
+    for part in integration_uri.split('/'):
+        if part.startswith('arn:aws:lambda'):
+            base_arn = part.split(':invocations')[0]
+            base_arn = base_arn.split(':$')[0]
+            base_arn = base_arn.split(':alias')[0]
+            return base_arn
+
+    return None
+
+
+def map_http_api(apigw2_client, api):
+    """(lambda_arn, link) pairs for every Lambda integration of an HTTP API"""
+    cors_config = api.get('CorsConfiguration', {})
+    link = ApiLink('HTTP API', api['ApiId'], api['Name'], bool(cors_config.get('AllowOrigins')))
+
+    links = []
+    paginator = apigw2_client.get_paginator('get_integrations')
+    for page in paginator.paginate(ApiId=api['ApiId']):
+        for integration in page.get('Items', []):
+            lambda_arn = lambda_arn_from_uri(integration.get('IntegrationUri', ''))
+            if lambda_arn:
+                links.append((lambda_arn, link))
+
+    return links
+
+
+def map_rest_api(apigw_client, api):
+    """(lambda_arn, link) pairs for a REST API, one per distinct Lambda.
+
+    Resources are listed with their methods embedded, which carries each
+    method's integration, so get_integration is only needed for methods
+    that come back without one.
+    """
+    api_id = api['id']
+    has_cors = False
+    lambda_arns = []
+
+    paginator = apigw_client.get_paginator('get_resources')
+    for page in paginator.paginate(restApiId=api_id, embed=['methods']):
+        for resource in page.get('items', []):
+            methods = resource.get('resourceMethods', {})
+
+            if 'OPTIONS' in methods:
+                has_cors = True
+
+            for method, method_data in methods.items():
+                if method == 'OPTIONS':
+                    continue
+
+                integration = method_data.get('methodIntegration')
+                if integration is None:
+                    try:
+                        integration = apigw_client.get_integration(
+                            restApiId=api_id,
+                            resourceId=resource['id'],
+                            httpMethod=method
+                        )
+                    except Exception as e:
+                        if is_throttling_error(e):
+                            raise
+                        tracer.record_ignored('map_rest_api', e)
+                        continue
+
+                lambda_arn = lambda_arn_from_uri(integration.get('uri', ''))
+                if lambda_arn and lambda_arn not in lambda_arns:
+                    lambda_arns.append(lambda_arn)
+
+    link = ApiLink('REST API', api_id, api['name'], has_cors)
+    return [(lambda_arn, link) for lambda_arn in lambda_arns]
+
+
+def api_fingerprint(api):
+    """Digest of an API's listing entry, used to spot APIs that changed"""
+    payload = json.dumps(api, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def _map_api(mapper, client, api, name, cached):
+    fingerprint = api_fingerprint(api)
+    if cached is not None and cached['fingerprint'] == fingerprint:
+        links = cached['links']
+    else:
+        links = mapper(client, api)
+    return {'name': name, 'fingerprint': fingerprint, 'links': links}
+
+
+def iter_apis(region, cached_apis=None, profile=None):
+    """Yield ((api_type, api_id), api) for every HTTP and REST API in a region.
+
+    api is {'name', 'fingerprint', 'links'}. When cached_apis holds an entry
+    with the same fingerprint, its links are reused instead of mapping the
+    API again.
+    """
+    cached_apis = cached_apis or {}
+
+    try:
+        apigw2_client = get_client('apigatewayv2', region, profile)
+
+        paginator = apigw2_client.get_paginator('get_apis')
+        for page in paginator.paginate():
+            for api in page.get('Items', []):
+                key = ('HTTP API', api['ApiId'])
+                try:
+                    mapped = _map_api(map_http_api, apigw2_client, api, api['Name'], cached_apis.get(key))
+                except Exception as e:
+                    # A throttled API must fail the region, not vanish from it
+                    if is_throttling_error(e):
+                        raise
+                    tracer.record_ignored('map_http_api', e)
+                    continue
+                yield key, mapped
+
+    except Exception as e:
+        if is_throttling_error(e):
+            raise
+        tracer.record_ignored('get_apis', e)
+
+    try:
+        apigw_client = get_client('apigateway', region, profile)
+
+        paginator = apigw_client.get_paginator('get_rest_apis')
+        for page in paginator.paginate():
+            for api in page.get('items', []):
+                key = ('REST API', api['id'])
+                try:
+                    mapped = _map_api(map_rest_api, apigw_client, api, api['name'], cached_apis.get(key))
+                except Exception as e:
+                    # A throttled API must fail the region, not vanish from it
+                    if is_throttling_error(e):
+                        raise
+                    tracer.record_ignored('map_rest_api', e)
+                    continue
+                yield key, mapped
+
+    except Exception as e:
+        if is_throttling_error(e):
+            raise
+        tracer.record_ignored('get_rest_apis', e)
+
+
+def mappings_from_apis(apis):
+    mappings = {}
+    for api in apis.values():
+        for lambda_arn, link in api['links']:
+            mappings.setdefault(lambda_arn, []).append(link)
+    return mappings
+
+
+def get_api_gateway_lambda_mappings(region):
+    return mappings_from_apis(dict(iter_apis(region)))
+
+
+def api_ids_from_policy(policy, region):
+    """IDs of the APIs in region that a function's resource policy lets invoke it.
+
+    Returns None when a statement lets API Gateway invoke the function
+    without pinning the source to a specific API, or when no statement
+    names an execute-api source at all: API Gateway may then invoke it
+    through an integration's credentials role, which the policy does not
+    show, so it cannot narrow the search.
+    """
+    api_ids = []
+    names_source = False
+    statements = policy.get('Statement', [])
+    if isinstance(statements, dict):
+        statements = [statements]
+
+    for statement in statements:
+        principal = statement.get('Principal', {})
+        services = principal.get('Service', []) if isinstance(principal, dict) else []
+        if isinstance(services, str):
+            services = [services]
+        if 'apigateway.amazonaws.com' not in services:
+            continue
+
+        source_arns = []
+        for condition in statement.get('Condition', {}).values():
+            value = condition.get('AWS:SourceArn') or condition.get('aws:SourceArn')
+            if value:
+                source_arns.extend([value] if isinstance(value, str) else value)
+
+        if not source_arns:
+            return None
+
+        for source_arn in source_arns:
+            # arn:aws:execute-api:<region>:<account>:<api-id>/<stage>/<method>/<path>
+            parts = source_arn.split(':', 5)
+            if len(parts) < 6 or parts[2] != 'execute-api':
+                continue
+            names_source = True
+            if parts[3] != region:
+                continue
+            api_id = parts[5].split('/')[0]
+            if not api_id or '*' in api_id or '?' in api_id:
+                return None
+            if api_id not in api_ids:
+                api_ids.append(api_id)
+
+    return api_ids if names_source else None
+
+
+def find_function_api_links(lambda_client, function_name, function_arn, region, profile=None):
+    """API Gateway links for one function, found through its resource policy.
+
+    Only the APIs named in the policy's execute-api source ARNs are
+    inspected. Returns None when the policy is missing or too broad to
+    narrow the search; callers fall back to get_api_gateway_lambda_mappings.
+    """
+    try:
+        response = lambda_client.get_policy(FunctionName=function_name)
+        policy = json.loads(response['Policy'])
+    except (ClientError, ValueError, KeyError) as e:
+        if is_throttling_error(e):
+            raise
+        if not isinstance(e, ClientError) or e.response['Error']['Code'] != 'ResourceNotFoundException':
+            tracer.record_ignored('get_policy', e)
+        return None
+
+    api_ids = api_ids_from_policy(policy, region)
+    if api_ids is None:
+        return None
+
+    apigw2_client = get_client('apigatewayv2', region, profile)
+    apigw_client = get_client('apigateway', region, profile)
+
+    links = []
+    for api_id in api_ids:
+        try:
+            api = apigw2_client.get_api(ApiId=api_id)
+            api_links = map_http_api(apigw2_client, api)
+        except ClientError as e:
+            if is_throttling_error(e):
+                raise
+            if e.response['Error']['Code'] != 'NotFoundException':
+                return None
+            try:
+                api = apigw_client.get_rest_api(restApiId=api_id)
+                api_links = map_rest_api(apigw_client, api)
+            except ClientError as e:
+                if is_throttling_error(e):
+                    raise
+                if e.response['Error']['Code'] != 'NotFoundException':
+                    return None
+                # Permission left behind by a deleted API
+                continue
+
+        links.extend(link for lambda_arn, link in api_links if lambda_arn == function_arn)
+
+    return links
+
+
+def _is_unchanged(function, cached):
+    return (
+        cached is not None
+        and cached.last_modified == function.last_modified
+        and cached.code_sha256 == function.code_sha256
+    )
+
+
+def lookup_api_links(lambda_client, functions, region, function_pool, profile=None):
+    """{function_arn: links} from each function's resource policy, or None to map every API"""
+    futures = {
+        function.function_arn: function_pool.submit(
+            find_function_api_links, lambda_client, function.function_name,
+            function.function_arn, region, profile
+        )
+        for function in functions
+    }
+    api_links = {arn: future.result() for arn, future in futures.items()}
+    if any(links is None for links in api_links.values()):
+        return None
+    return api_links
+
+
+def scan_region(region, function_pool, cache=None, refresh=False, profile=None, function_filter=None):
+    """Scan one region, fanning Function URL lookups out to function_pool.
+
+    With a cache, a region scanned within the TTL is returned from disk.
+    Otherwise only functions whose LastModified/CodeSha256 changed and APIs
+    whose listing changed are looked up again, unless refresh is set or
+    the cache's remap age has passed since the region was last looked up
+    in full: integrations and URL CORS settings change neither.
+    A region with no functions stops after the listing: its APIs cannot
+    front any of them, so API Gateway is never enumerated there.
+
+    function_filter's name and runtime tests run on the listing, so
+    filtered-out functions cost no further calls. When a few functions are
+    left, their APIs are found through their resource policies. A region
+    narrowed this way is not written to the cache, which holds whole regions.
+    """
+    if cache is not None and not refresh and cache.region_is_fresh(region):
+        functions = cache.load_region(region)
+        if function_filter is not None:
+            functions = [f for f in functions if function_filter.matches(f)]
+        return functions
+
+    lambda_client = get_client('lambda', region, profile)
+
+    use_cached = cache is not None and not refresh and not cache.region_needs_remap(region)
+    started = time.time()
+    cached_functions = cache.get_functions(region) if use_cached else {}
+    cached_apis = cache.get_apis(region) if use_cached else {}
+
+    listed = list_function_records(lambda_client, region)
+    functions = listed
+    if function_filter is not None:
+        functions = [f for f in listed if function_filter.matches_listing(f)]
+    narrowed = len(functions) < len(listed)
+
+    if not functions:
+        if cache is not None and not narrowed:
+            cache.store_region(region, [], {}, started)
+        return functions
+
+    changed = [
+        f for f in functions
+        if not _is_unchanged(f, cached_functions.get(f.function_arn))
+    ]
+    url_futures = submit_function_url_lookups(lambda_client, changed, function_pool)
+
+    # API Gateway mapping runs on this thread while the URL lookups proceed
+    api_mappings = None
+    if narrowed and len(functions) <= POLICY_LOOKUP_LIMIT:
+        api_mappings = lookup_api_links(lambda_client, functions, region, function_pool, profile)
+    if api_mappings is None:
+        apis = dict(iter_apis(region, cached_apis, profile))
+        api_mappings = mappings_from_apis(apis)
+    url_states = join_function_url_states(url_futures)
+
+    for function in functions:
+        if function.function_arn in url_states:
+            function.set_url_state(url_states[function.function_arn])
+        else:
+            cached = cached_functions[function.function_arn]
+            function.set_url_state((cached.has_function_url, cached.function_url_cors_configured, cached.function_url))
+
+        function.api_gateways = tuple(api_mappings.get(function.function_arn, ()))
+
+    if cache is not None and not narrowed:
+        cache.store_region(region, functions, apis, None if use_cached else started)
+
+    if function_filter is not None:
+        functions = [f for f in functions if function_filter.matches(f)]
+
+    return functions
+
+
+def scan_regions(regions, concurrency=DEFAULT_CONCURRENCY, cache=None, refresh=False, profile=None,
+                 function_filter=None):
+    """Scan regions concurrently, yielding (region, functions, error) as each completes.
+
+    A ClientError or BotoCoreError (e.g. a connection failure) in one region
+    is reported as that region's error and does not affect the others. Closing the generator early cancels the regions
+    that have not started.
+    """
+    if not regions:
+        return
+
+    with ThreadPoolExecutor(max_workers=concurrency) as function_pool, \
+            ThreadPoolExecutor(max_workers=min(concurrency, len(regions))) as region_pool:
+        futures = {
+            region_pool.submit(scan_region, region, function_pool, cache, refresh, profile, function_filter): region
+            for region in regions
+        }
+
+        try:
+            for future in as_completed(futures):
+                region = futures[future]
+                try:
+                    yield region, future.result(), None
+                except (ClientError, BotoCoreError) as e:
+                    yield region, [], e
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def is_opt_in_error(error):
+    return 'OptInRequired' in str(error)
+
+
+def scan_accounts(sources, prepare, concurrency=DEFAULT_CONCURRENCY,
+                  account_concurrency=DEFAULT_ACCOUNT_CONCURRENCY, refresh=False, function_filter=None,
+                  checkpoint=None):
+    """Scan several accounts at once, yielding (source, account, region, functions, error).
+
+    prepare(source) runs on the account's worker and returns
+    (profile, account, regions, cache). Each account scans its regions with
+    its own pools of `concurrency` workers, and at most account_concurrency
+    accounts run at a time. Functions are tagged with their account ID.
+    When preparing or scanning an account fails, it yields one
+    (source, account, None, [], error) and the other accounts carry on.
+
+    With a checkpoint, regions it already holds are yielded from it without
+    being scanned, and every region scanned without error is saved to it.
+    Closing the generator early stops the accounts after the regions in
+    flight.
+    """
+    if not sources:
+        return
+
+    results = queue.Queue()
+    done = object()
+    stopped = threading.Event()
+
+    def scan_account(source):
+        account = None
+        try:
+            profile, account, regions, cache = prepare(source)
+
+            if checkpoint is not None:
+                completed = checkpoint.completed_regions(account)
+                for region in regions:
+                    if region in completed:
+                        results.put((source, account, region, checkpoint.load_region(account, region), None))
+                regions = [region for region in regions if region not in completed]
+
+            for region, functions, error in scan_regions(regions, concurrency, cache, refresh, profile, function_filter):
+                for function in functions:
+                    function.account = account
+                if checkpoint is not None and (error is None or is_opt_in_error(error)):
+                    checkpoint.save_region(account, region, functions)
+                results.put((source, account, region, functions, error))
+                if stopped.is_set():
+                    break
+        except Exception as e:
+            results.put((source, account, None, [], e))
+        finally:
+            results.put(done)
+
+    with ThreadPoolExecutor(max_workers=min(account_concurrency, len(sources))) as account_pool:
+        futures = [account_pool.submit(scan_account, source) for source in sources]
+
+        try:
+            remaining = len(sources)
+            while remaining:
+                result = results.get()
+                if result is done:
+                    remaining -= 1
+                else:
+                    yield result
+        finally:
+            stopped.set()
+            for future in futures:
+                future.cancel()
@@ -0,0 +1,250 @@
+import gzip
+import hashlib
+import json
+import time
+
+from .models import ApiLink
+from .output import function_from_record, inventory_record
+
+SNAPSHOT_VERSION = 1
+
+
+def record_hash(record):
+    """Digest of everything a snapshot compares about one function"""
+    payload = json.dumps(record, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def _open(path, mode):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+class Snapshot:
+    """A scanned inventory with one content hash per function.
+
+    functions maps "account/region/name" to {'hash', 'record', 'listing'},
+    where listing is the LastModified/CodeSha256 pair used to tell which
+    functions a live diff has to look up again. regions lists the regions
+    scanned per account, so a region with no functions is still known to
+    be empty. apis holds the API fingerprints from the inventory cache,
+    when it had them.
+    """
+
+    def __init__(self, functions, regions, apis=(), created_at=None):
+        self.functions = functions
+        self.regions = regions
+        self.apis = list(apis)
+        self.created_at = created_at or time.time()
+
+    @staticmethod
+    def key(account, region, function_name):
+        return f'{account}/{region}/{function_name}'
+
+    @classmethod
+    def from_functions(cls, functions, regions, apis=()):
+        entries = {}
+        for function in functions:
+            record = inventory_record(function)
+            record['ApiGateways'].sort(key=lambda api: (api['type'], api['api_id']))
+            entries[cls.key(function.account, function.region, function.function_name)] = {
+                'hash': record_hash(record),
+                'record': record,
+                'listing': [function.last_modified, function.code_sha256],
+            }
+        return cls(entries, {account: sorted(names) for account, names in regions.items()}, apis)
+
+    @classmethod
+    def load(cls, path):
+        with _open(path, 'r') as f:
+            data = json.load(f)
+        if data.get('version') != SNAPSHOT_VERSION:
+            raise ValueError(f'{path} is not a snapshot this version can read')
+        return cls(data['functions'], data['regions'], data.get('apis', ()), data['created_at'])
+
+    def save(self, path):
+        """Write the snapshot as compact JSON, gzipped when path ends in .gz"""
+        with _open(path, 'w') as f:
+            json.dump({
+                'version': SNAPSHOT_VERSION,
+                'created_at': self.created_at,
+                'regions': self.regions,
+                'functions': self.functions,
+                'apis': self.apis,
+            }, f, separators=(',', ':'))
+
+    def region_functions(self, account, region):
+        """FunctionRecords of one scanned region, with their listing metadata"""
+        prefix = f'{account}/{region}/'
+        functions = []
+        for key, entry in self.functions.items():
+            if key.startswith(prefix):
+                function = function_from_record(entry['record'])
+                function.last_modified, function.code_sha256 = entry['listing']
+                functions.append(function)
+        return functions
+
+    def region_apis(self, account, region):
+        """The region's APIs in the shape scanner.iter_apis yields, for InventoryCache.store_region"""
+        apis = {}
+        for api in self.apis:
+            if api['account'] == account and api['region'] == region:
+                link = ApiLink(api['type'], api['api_id'], api['name'], api['cors_configured'])
+                apis[(api['type'], api['api_id'])] = {
+                    'name': api['name'],
+                    'fingerprint': api['fingerprint'],
+                    'links': [(arn, link) for arn in api['lambda_arns']],
+                }
+        return apis
+
+    def seed_cache(self, cache):
+        """Store every region of cache.account, so a scan through cache only re-reads what changed.
+
+        The regions count as looked up in full when the snapshot was taken,
+        so the cache's remap age applies from then.
+        """
+        for region in self.regions.get(cache.account, ()):
+            cache.store_region(region, self.region_functions(cache.account, region), self.region_apis(cache.account, region),
+                               self.created_at)
+
+
+def cached_api_entries(cache, region):
+    """Snapshot API entries for a region from the inventory cache"""
+    return [
+        {
+            'account': cache.account,
+            'region': region,
+            'type': api_type,
+            'api_id': api_id,
+            'name': api['name'],
+            'fingerprint': api['fingerprint'],
+            'cors_configured': api['links'][0][1].cors_configured if api['links'] else False,
+            'lambda_arns': [arn for arn, link in api['links']],
+        }
+        for (api_type, api_id), api in cache.get_apis(region).items()
+    ]
+
+
+def _is_public(record):
+    return bool(record['HasFunctionUrl'] or record['ApiGateways'])
+
+
+def _cors_label(configured):
+    return 'configured' if configured else 'not configured'
+
+
+def _describe_access(record):
+    """How a function is reachable, for added and removed functions"""
+    details = []
+    if record['HasFunctionUrl']:
+        details.append(f"Function URL (CORS {_cors_label(record['FunctionUrlCorsConfigured'])})")
+    for api in record['ApiGateways']:
+        details.append(f"{api['type']} {api['api_name']} (CORS {_cors_label(api['cors_configured'])})")
+    return details
+
+
+def _describe_change(old, new):
+    """What differs between two records of the same function, most important first"""
+    details = []
+    exposure = False
+
+    if not _is_public(old) and _is_public(new):
+        details.append('now public')
+        exposure = True
+    elif _is_public(old) and not _is_public(new):
+        details.append('no longer public')
+
+    if new['HasFunctionUrl'] and not old['HasFunctionUrl']:
+        details.append('Function URL added')
+        exposure = True
+    elif old['HasFunctionUrl'] and not new['HasFunctionUrl']:
+        details.append('Function URL removed')
+    elif old['HasFunctionUrl']:
+        if old['FunctionUrlCorsConfigured'] != new['FunctionUrlCorsConfigured']:
+            details.append(
+                f"Function URL CORS: {_cors_label(old['FunctionUrlCorsConfigured'])} -> "
+                f"{_cors_label(new['FunctionUrlCorsConfigured'])}"
+            )
+        if old['FunctionUrl'] != new['FunctionUrl']:
+            details.append('Function URL changed')
+
+    old_apis = {(api['type'], api['api_id']): api for api in old['ApiGateways']}
+    new_apis = {(api['type'], api['api_id']): api for api in new['ApiGateways']}
+    for key, api in new_apis.items():
+        if key not in old_apis:
+            details.append(f"{api['type']} {api['api_name']} added")
+            exposure = True
+        elif old_apis[key]['cors_configured'] != api['cors_configured']:
+            details.append(
+                f"{api['type']} {api['api_name']} CORS: {_cors_label(old_apis[key]['cors_configured'])} -> "
+                f"{_cors_label(api['cors_configured'])}"
+            )
+    for key, api in old_apis.items():
+        if key not in new_apis:
+            details.append(f"{api['type']} {api['api_name']} removed")
+
+    if old['Runtime'] != new['Runtime']:
+        details.append(f"runtime: {old['Runtime']} -> {new['Runtime']}")
+
+    return details, exposure
+
+
+def diff_snapshots(old, new):
+    """Changes from old to new, as dicts with change, account, region, function, details and exposure.
+
+    Only regions scanned in both snapshots are compared. Unchanged
+    functions are recognised by their hash alone, so the cost is linear in
+    the number of functions.
+    """
+    common = {
+        f'{account}/{region}/'
+        for account, regions in new.regions.items()
+        for region in regions
+        if region in old.regions.get(account, ())
+    }
+
+    def compared(key):
+        return key[:key.rindex('/') + 1] in common
+
+    changes = []
+    for key, entry in new.functions.items():
+        if not compared(key):
+            continue
+        record = entry['record']
+        previous = old.functions.get(key)
+        if previous is None:
+            changes.append({'change': 'added', 'record': record, 'details': _describe_access(record),
+                            'exposure': _is_public(record)})
+        elif previous['hash'] != entry['hash']:
+            details, exposure = _describe_change(previous['record'], record)
+            if details:
+                changes.append({'change': 'changed', 'record': record, 'details': details, 'exposure': exposure})
+
+    for key, entry in old.functions.items():
+        if compared(key) and key not in new.functions:
+            changes.append({'change': 'removed', 'record': entry['record'],
+                            'details': _describe_access(entry['record']), 'exposure': False})
+
+    return [
+        {
+            'change': change['change'],
+            'account': change['record'].get('Account'),
+            'region': change['record']['Region'],
+            'function': change['record']['FunctionName'],
+            'details': change['details'],
+            'exposure': change['exposure'],
+        }
+        for change in sorted(changes, key=lambda c: (
+            c['record'].get('Account') or '', c['record']['Region'], c['record']['FunctionName']
+        ))
+    ]
+
+
+def uncompared_regions(old, new):
+    """(account, region) pairs scanned in only one of the snapshots"""
+    pairs = set()
+    for first, second in ((old, new), (new, old)):
+        for account, regions in first.regions.items():
+            pairs.update((account, region) for region in regions if region not in second.regions.get(account, ()))
+    return sorted(pairs)
@@ -0,0 +1,153 @@
+import threading
+import time
+
+from botocore.exceptions import ClientError
+
+THROTTLING_CODES = {
+    'Throttling',
+    'ThrottlingException',
+    'ThrottledException',
+    'TooManyRequestsException',
+    'RequestLimitExceeded',
+    'RequestThrottled',
+    'RequestThrottledException',
+}
+
+# Requests per second for each (service, region, operation) bucket. Keys are
+# a service name or "service.Operation"; the more specific key wins. API
+# Gateway's control plane allows far less than Lambda's.
+DEFAULT_RATES = {
+    'apigateway': 5.0,
+    'apigatewayv2': 5.0,
+    'lambda': 15.0,
+}
+
+
+def is_throttling_error(error):
+    return (
+        isinstance(error, ClientError)
+        and error.response.get('Error', {}).get('Code') in THROTTLING_CODES
+    )
+
+
+class TokenBucket:
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                wait = (1 - self._tokens) / self.rate
+
+            time.sleep(wait)
+
+
+class RateLimiter:
+    """Token buckets per (profile, service, region, operation).
+
+    AWS limits are per account and region, so each credential source gets
+    its own buckets. Installed on a client's before-send event, so every HTTP attempt,
+    including botocore's own jittered retries, takes a token first.
+    """
+
+    def __init__(self, rates=None):
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self.rates = dict(DEFAULT_RATES if rates is None else rates)
+
+    def configure(self, rates):
+        """Override default rates with a {"service[.Operation]": rps} mapping"""
+        with self._lock:
+            self.rates = dict(DEFAULT_RATES)
+            self.rates.update(rates)
+            self._buckets.clear()
+
+    def rate_for(self, service, operation):
+        rate = self.rates.get(f'{service}.{operation}')
+        if rate is None:
+            rate = self.rates.get(service)
+        return rate
+
+    def acquire(self, service, region, operation, profile=None):
+        key = (profile, service, region, operation)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                rate = self.rate_for(service, operation)
+                if not rate or rate <= 0:
+                    return
+                bucket = TokenBucket(rate)
+                self._buckets[key] = bucket
+        bucket.acquire()
+
+    def install(self, client, profile=None):
+        service = client.meta.service_model.service_name
+        region = client.meta.region_name
+
+        def before_send(event_name, **kwargs):
+            self.acquire(service, region, event_name.rsplit('.', 1)[-1], profile)
+
+        client.meta.events.register('before-send', before_send)
+
+
+class RetryStats:
+    """Retry counts per (service, operation, region), read from after-call"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.retries = {}
+        self.throttled_failures = {}
+
+    def reset(self):
+        with self._lock:
+            self.retries.clear()
+            self.throttled_failures.clear()
+
+    def record(self, key, retries, throttled):
+        with self._lock:
+            if retries:
+                self.retries[key] = self.retries.get(key, 0) + retries
+            if throttled:
+                self.throttled_failures[key] = self.throttled_failures.get(key, 0) + 1
+
+    def total_retries(self):
+        return sum(self.retries.values())
+
+    def total_throttled_failures(self):
+        return sum(self.throttled_failures.values())
+
+    def install(self, client):
+        service = client.meta.service_model.service_name
+        region = client.meta.region_name
+
+        def after_call(parsed, model, **kwargs):
+            metadata = parsed.get('ResponseMetadata', {})
+            error_code = parsed.get('Error', {}).get('Code')
+            self.record(
+                (service, model.name, region),
+                metadata.get('RetryAttempts', 0),
+                error_code in THROTTLING_CODES
+            )
+
+        client.meta.events.register('after-call', after_call)
+
+
+limiter = RateLimiter()
+retry_stats = RetryStats()
+
+
+def install_client_hooks(client, profile=None):
+    limiter.install(client, profile)
+    retry_stats.install(client)
@@ -0,0 +1,151 @@
+import threading
+import time
+
+from botocore.exceptions import ClientError
+
+# Upper bounds in milliseconds; the last bucket catches everything slower
+LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+def error_code(error):
+    if isinstance(error, ClientError):
+        return error.response.get('Error', {}).get('Code') or 'ClientError'
+    return type(error).__name__
+
+
+class CallStats:
+    """Counts and a latency histogram for one (service, operation, region)"""
+
+    __slots__ = ('calls', 'errors', 'retries', 'total_ms', 'max_ms', 'histogram')
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = {}
+        self.retries = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.histogram = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def record(self, elapsed_ms, retries, code):
+        self.calls += 1
+        self.retries += retries
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        if code:
+            self.errors[code] = self.errors.get(code, 0) + 1
+
+        bucket = len(LATENCY_BUCKETS_MS)
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if elapsed_ms <= bound:
+                bucket = i
+                break
+        self.histogram[bucket] += 1
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of calls (max for the last one)"""
+        target = fraction * self.calls
+        seen = 0
+        for i, count in enumerate(self.histogram):
+            seen += count
+            if seen >= target and count:
+                return LATENCY_BUCKETS_MS[i] if i < len(LATENCY_BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def to_dict(self):
+        labels = [f'<={bound}ms' for bound in LATENCY_BUCKETS_MS] + [f'>{LATENCY_BUCKETS_MS[-1]}ms']
+        return {
+            'calls': self.calls,
+            'errors': dict(self.errors),
+            'retries': self.retries,
+            'total_ms': round(self.total_ms, 1),
+            'max_ms': round(self.max_ms, 1),
+            'histogram': dict(zip(labels, self.histogram)),
+        }
+
+
+class CallTracer:
+    """Per-(service, operation, region) call counts, latency, retries and errors.
+
+    Installed on every client through before-call/after-call hooks, so the
+    time covers the whole operation including botocore's retries. Timing is
+    only recorded while enabled. Errors the scanner deliberately ignores are
+    counted through record_ignored whether tracing is on or not.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.enabled = False
+        self.stats = {}
+        self.ignored = {}
+
+    def reset(self, enabled=False):
+        with self._lock:
+            self.enabled = enabled
+            self.stats.clear()
+            self.ignored.clear()
+
+    def record(self, key, elapsed_ms, retries, code):
+        with self._lock:
+            stats = self.stats.get(key)
+            if stats is None:
+                stats = self.stats[key] = CallStats()
+            stats.record(elapsed_ms, retries, code)
+
+    def record_ignored(self, where, error):
+        """Count an error that was handled by carrying on without the data"""
+        key = (where, error_code(error))
+        with self._lock:
+            self.ignored[key] = self.ignored.get(key, 0) + 1
+
+    def total_ignored(self):
+        return sum(self.ignored.values())
+
+    def install(self, client, profile=None):
+        service = client.meta.service_model.service_name
+        region = client.meta.region_name
+
+        def before_call(context, **kwargs):
+            if self.enabled:
+                context['trace_started'] = time.perf_counter()
+
+        def after_call(model, parsed, context, **kwargs):
+            started = context.pop('trace_started', None)
+            if started is None:
+                return
+            self.record(
+                (service, model.name, region),
+                (time.perf_counter() - started) * 1000,
+                parsed.get('ResponseMetadata', {}).get('RetryAttempts', 0),
+                parsed.get('Error', {}).get('Code')
+            )
+
+        def after_call_error(event_name, exception, context, **kwargs):
+            started = context.pop('trace_started', None)
+            if started is None:
+                return
+            self.record(
+                (service, event_name.rsplit('.', 1)[-1], region),
+                (time.perf_counter() - started) * 1000,
+                0,
+                error_code(exception)
+            )
+
+        client.meta.events.register('before-call', before_call)
+        client.meta.events.register('after-call', after_call)
+        client.meta.events.register('after-call-error', after_call_error)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'calls': [
+                    dict(service=service, operation=operation, region=region, **stats.to_dict())
+                    for (service, operation, region), stats in sorted(self.stats.items())
+                ],
+                'ignored_errors': [
+                    {'where': where, 'error': code, 'count': count}
+                    for (where, code), count in sorted(self.ignored.items())
+                ],
+            }
+
+
+tracer = CallTracer()
@@ -0,0 +1,57 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+# Never touch real credentials, config or the user's inventory cache
+os.environ.update({
+    'AWS_ACCESS_KEY_ID': 'AKIATESTING',
+    'AWS_SECRET_ACCESS_KEY': 'testing',
+    'AWS_DEFAULT_REGION': 'us-east-1',
+    'AWS_CONFIG_FILE': os.devnull,
+    'AWS_SHARED_CREDENTIALS_FILE': os.devnull,
+})
+os.environ.pop('AWS_PROFILE', None)
+
+from aws_assistant.clients import registry  # noqa: E402
+from simulated_aws import Fixture, SimulatedAws  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    path = tmp_path / 'cache'
+    monkeypatch.setenv('AWS_ASSISTANT_CACHE_DIR', str(path))
+    return path
+
+
+@pytest.fixture
+def aws(monkeypatch):
+    """A small simulated account: two populated regions and one empty one"""
+    backend = SimulatedAws(Fixture(regions=2, functions=12, http_apis=2, rest_apis=2, resources=3, empty_regions=1))
+    monkeypatch.setattr(registry, '_hooks', registry._hooks + [backend.install])
+    registry.configure()
+    yield backend
+    registry.configure()
+
+
+@pytest.fixture
+def failures(aws, monkeypatch):
+    """{region: exception} that every call to a region in it raises instead of reaching the backend"""
+    failures = {}
+
+    def install(client, profile=None):
+        region = client.meta.region_name
+
+        def before_send(**kwargs):
+            if region in failures:
+                raise failures[region]
+
+        client.meta.events.register('before-send', before_send)
+
+    monkeypatch.setattr(registry, '_hooks', registry._hooks + [install])
+    registry.configure()
+    return failures
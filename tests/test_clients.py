@@ -0,0 +1,28 @@
+import datetime
+
+import pytest
+from botocore.exceptions import ClientError
+
+from aws_assistant.clients import get_client, registry
+
+
+def test_max_attempts_counts_the_first_call(aws):
+    registry.configure(max_attempts=2)
+    aws.throttle_rate = 1.0
+
+    with pytest.raises(ClientError):
+        get_client('lambda', 'us-east-1').list_functions()
+
+    assert aws.calls[('lambda', 'ListFunctions')] == 2
+
+
+def test_assumed_role_is_assumed_again_before_it_expires(aws):
+    aws.role_expiration = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(minutes=5)
+    profile = registry.assume_role('arn:aws:iam::210987654321:role/long-scan')
+    client = get_client('lambda', 'us-east-1', profile)
+
+    client.list_functions()
+    client.list_functions()
+
+    # Credentials this close to expiry are refreshed before every call
+    assert aws.calls[('sts', 'AssumeRole')] == 3
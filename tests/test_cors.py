@@ -0,0 +1,122 @@
+import copy
+
+import pytest
+
+from aws_assistant.cors import (
+    CorsError, CorsTarget, apply_cors_plan, apply_rest_api_cors, cors_settings, diff_cors, diff_cors_plan, inject_rest_cors,
+    normalize_cors, rest_merge_body
+)
+
+
+def test_origin_order_case_and_trailing_slashes_are_not_changes():
+    current = cors_settings(['https://B.example.com/', 'https://a.example.com'])
+    desired = cors_settings(['https://a.example.com', 'https://b.example.com'])
+
+    assert diff_cors(current, desired) == []
+
+
+def test_missing_and_empty_fields_match_the_defaults():
+    current = {'AllowOrigins': ['https://a.example.com'], 'AllowMethods': ['get', 'POST']}
+    desired = {'AllowOrigins': ['https://a.example.com'], 'AllowMethods': ['POST', 'GET'], 'AllowHeaders': [],
+               'MaxAge': None, 'AllowCredentials': False}
+
+    assert normalize_cors(current) == normalize_cors(desired)
+    assert normalize_cors({'MaxAge': 0})['MaxAge'] is None
+
+
+def test_real_differences_are_listed():
+    current = cors_settings(['https://a.example.com'])
+    desired = dict(cors_settings(['https://a.example.com', 'https://b.example.com']), MaxAge=600)
+
+    assert diff_cors(current, desired) == [
+        ('AllowOrigins', ('https://a.example.com',), ('https://a.example.com', 'https://b.example.com')),
+        ('MaxAge', 86400, 600),
+    ]
+
+
+def test_plan_only_writes_targets_that_differ(aws):
+    aws.url_cors[('us-east-1', 0)] = cors_settings(['HTTPS://App.example.com/'])
+    aws.api_cors[('us-east-1', 'h0000')] = cors_settings(['https://other.example.com'])
+    desired = cors_settings(['https://app.example.com'])
+    plan = [
+        CorsTarget('Function URL', 'us-east-1', 'fn-00000', 'fn-00000'),
+        CorsTarget('HTTP API', 'us-east-1', 'h0000', 'http-api-0'),
+    ]
+
+    assert [error for _, error in diff_cors_plan(plan, desired, 2)] == [None, None]
+    written = [(cors_target.kind, applied, error) for cors_target, applied, error in apply_cors_plan(plan, desired, 2)]
+
+    assert plan[0].changes == []
+    assert written == [('HTTP API', True, None)]
+    assert aws.calls[('lambda', 'UpdateFunctionUrlConfig')] == 0
+    assert aws.api_cors[('us-east-1', 'h0000')]['AllowOrigins'] == ['https://app.example.com']
+
+
+def definition(integration_type):
+    return {'paths': {'/items': {'get': {
+        'responses': {'200': {'description': '200 response'}},
+        'x-amazon-apigateway-integration': {
+            'type': integration_type, 'httpMethod': 'POST', 'uri': 'arn:aws:apigateway:us-east-1:lambda:path/fn',
+            'responses': {'default': {'statusCode': '200'}},
+        },
+    }}}}
+
+
+def test_proxy_methods_echo_each_allowed_origin_from_the_preflight():
+    rest_definition = definition('aws_proxy')
+
+    inject_rest_cors(rest_definition, cors_settings(['https://a.example.com', 'https://b.example.com']))
+
+    preflight = rest_definition['paths']['/items']['options']['x-amazon-apigateway-integration']
+    template = preflight['responses']['default']['responseTemplates']['application/json']
+    assert '"https://b.example.com"' in template
+
+
+def test_non_proxy_method_allows_the_one_origin():
+    rest_definition = definition('aws')
+
+    inject_rest_cors(rest_definition, cors_settings(['https://a.example.com']))
+
+    response = rest_definition['paths']['/items']['get']['x-amazon-apigateway-integration']['responses']['default']
+    assert response['responseParameters']['method.response.header.Access-Control-Allow-Origin'] == "'https://a.example.com'"
+
+
+def test_non_proxy_method_refuses_several_origins():
+    rest_definition = definition('aws')
+
+    with pytest.raises(CorsError):
+        inject_rest_cors(rest_definition, cors_settings(['https://a.example.com', 'https://b.example.com']))
+
+    assert 'options' not in rest_definition['paths']['/items']
+
+
+def test_merge_body_only_carries_what_cors_changed():
+    original = definition('aws')
+    original['paths']['/items']['get']['responses']['200']['schema'] = {'$ref': '#/definitions/Item'}
+    original['paths']['/health'] = {'get': {'x-amazon-apigateway-integration': {'type': 'aws_proxy'}}}
+    original['definitions'] = {'Item': {'type': 'object'}, 'Unused': {'type': 'object'}}
+    original['swagger'] = '2.0'
+    updated = copy.deepcopy(original)
+    updated['paths']['/health']['options'] = {'x-amazon-apigateway-integration': {'type': 'mock'}}
+    updated['paths']['/items']['get']['x-amazon-apigateway-integration']['responses']['default']['statusCode'] = '201'
+
+    body = rest_merge_body(original, updated)
+
+    assert body['swagger'] == '2.0'
+    assert body['paths'] == {
+        '/health': {'options': updated['paths']['/health']['options']},
+        '/items': {'get': updated['paths']['/items']['get']},
+    }
+    assert body['definitions'] == {'Item': {'type': 'object'}}
+    assert 'x-amazon-apigateway-gateway-responses' not in body
+
+
+def test_rest_api_cors_writes_back_only_its_changes(aws):
+    apply_rest_api_cors('us-east-1', 'r0000', cors_settings(['https://app.example.com']))
+
+    body = aws.rest_put_bodies[('us-east-1', 0)]
+    assert {method for item in body['paths'].values() for method in item} == {'options'}
+    assert set(body['x-amazon-apigateway-gateway-responses']) == {'DEFAULT_4XX', 'DEFAULT_5XX'}
+    # The GET methods left out of the merge are still in the API
+    merged = aws.rest_definitions[('us-east-1', 0)]
+    assert all('get' in item and 'options' in item for path, item in merged['paths'].items() if path != '/')
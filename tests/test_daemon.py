@@ -0,0 +1,90 @@
+import threading
+import time
+
+import pytest
+from click.testing import CliRunner
+
+from aws_assistant.cli import main
+from aws_assistant.daemon import WarmInventory, create_server, remove_state, write_state
+
+
+@pytest.fixture
+def daemon(aws):
+    """A serve of the default credentials, answering on localhost"""
+    inventory = WarmInventory('123456789012', ['us-east-1', 'us-east-2', 'us-west-1'], True)
+    inventory.refresh()
+    server = create_server(inventory)
+    write_state(server, inventory)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    aws.reset_counts()
+    yield inventory
+    server.shutdown()
+    server.server_close()
+    remove_state()
+
+
+def scan(*args):
+    return CliRunner().invoke(main, ['scan', '--output', 'jsonl', *args], catch_exceptions=False).output
+
+
+def test_scan_uses_the_daemon_of_its_profile(daemon, aws):
+    output = scan()
+
+    assert 'Using the inventory kept by aws-assistant serve' in output
+    assert aws.calls[('lambda', 'ListFunctions')] == 0
+
+
+def test_scan_of_another_profile_skips_the_daemon(daemon):
+    output = scan('--profiles', 'prod')
+
+    assert 'Using the inventory kept by' not in output
+    # The scan went to AWS with the named profile, which does not exist here
+    assert 'prod' in output
+
+
+def test_scan_of_an_assumed_role_skips_the_daemon(daemon, tmp_path):
+    roles = tmp_path / 'roles.txt'
+    roles.write_text('arn:aws:iam::210987654321:role/audit\n')
+
+    output = scan('--assume-role-arns', str(roles))
+
+    assert 'Using the inventory kept by' not in output
+
+
+def test_fix_cors_reads_links_again_instead_of_trusting_the_daemon(daemon, aws):
+    # An integration added since the daemon's last refresh
+    aws.fixture.http_targets[1].append(11)
+    aws.fixture.policies[11] = ['h0001']
+
+    output = CliRunner().invoke(
+        main, ['fix-cors', 'fn-00011', '--region', 'us-east-1', '--origin', 'https://app.example.com'],
+        catch_exceptions=False
+    ).output
+
+    assert 'Using the inventory kept by' in output
+    assert aws.api_cors[('us-east-1', 'h0001')]['AllowOrigins'] == ['https://app.example.com']
+
+
+def test_failed_refresh_is_reported_and_the_loop_goes_on(aws, failures):
+    inventory = WarmInventory('123456789012', ['us-east-1', 'us-east-2'], True)
+    inventory.refresh()
+    failures['us-east-2'] = RuntimeError('connection reset')
+
+    refresher = threading.Thread(target=inventory.run, args=(0.05,), daemon=True)
+    refresher.start()
+    deadline = time.monotonic() + 5
+    while 'us-east-2' not in inventory.status()['errors'] and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert inventory.status()['errors']['us-east-2'] == 'connection reset'
+    # The previous functions are still served
+    assert len(inventory.query(['us-east-2'])['regions']['us-east-2']) == 12
+
+    del failures['us-east-2']
+    while inventory.status()['errors'] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    inventory.stop()
+    refresher.join(5)
+
+    assert inventory.status()['errors'] == {}
@@ -0,0 +1,38 @@
+import json
+
+from click.testing import CliRunner
+
+from aws_assistant.cli import main
+
+
+def run(*args):
+    result = CliRunner().invoke(main, list(args), catch_exceptions=False)
+    assert 'Error' not in result.output, result.output
+    return result.output
+
+
+def changes(output):
+    return json.loads(output[output.index('{'):])['changes']
+
+
+def test_live_diff_sees_function_url_cors_changes(aws, tmp_path):
+    snapshot = str(tmp_path / 'before.json.gz')
+    run('scan', '--refresh', '--regions', 'us-east-1', '--snapshot', snapshot)
+    aws.url_cors[('us-east-1', 3)] = {'AllowOrigins': ['https://app.example.com']}
+    aws.fixture.http_targets[1].append(11)
+
+    found = {change['function']: change['details'] for change in changes(run('diff', snapshot, '--output', 'json'))}
+
+    assert found == {
+        'fn-00003': ['Function URL CORS: not configured -> configured'],
+        'fn-00011': ['now public', 'HTTP API http-api-1 added'],
+    }
+
+
+def test_incremental_diff_only_reads_changed_listings(aws, tmp_path):
+    snapshot = str(tmp_path / 'before.json.gz')
+    run('scan', '--refresh', '--regions', 'us-east-1', '--snapshot', snapshot)
+    aws.reset_counts()
+
+    assert changes(run('diff', snapshot, '--incremental', '--output', 'json')) == []
+    assert aws.calls[('lambda', 'ListFunctionUrlConfigs')] == 0
@@ -0,0 +1,17 @@
+from click.testing import CliRunner
+
+from aws_assistant.cli import main
+
+
+def fix_cors(*args):
+    result = CliRunner().invoke(main, ['fix-cors', *args], catch_exceptions=False)
+    assert 'Error' not in result.output, result.output
+    return result.output
+
+
+def test_batch_only_looks_up_matching_functions(aws):
+    fix_cors('--refresh', '--match', 'fn-0000[0-3]', '--origin', 'https://app.example.com')
+
+    assert aws.calls[('lambda', 'ListFunctionUrlConfigs')] == 8
+    assert aws.url_cors[('us-east-1', 3)]['AllowOrigins'] == ['https://app.example.com']
+    assert aws.url_cors[('us-east-2', 0)]['AllowOrigins'] == ['https://app.example.com']
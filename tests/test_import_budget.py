@@ -0,0 +1,21 @@
+import pytest
+
+from import_budget import BUDGET_MS, FORBIDDEN, import_times
+
+
+@pytest.fixture(scope='module')
+def baseline():
+    return import_times('pass')[0]
+
+
+@pytest.mark.parametrize('args', [['--help'], ['scan', '--help']])
+def test_help_skips_heavy_imports_and_stays_in_budget(args, baseline):
+    runs = []
+    for _ in range(3):
+        times, modules, returncode = import_times(argv=['-m', 'aws_assistant.cli'] + args)
+        assert returncode == 0
+        runs.append((sum(us for name, us in times.items() if name not in baseline) / 1000, modules))
+
+    heavy = sorted({name.split('.')[0] for name in runs[0][1]} & set(FORBIDDEN))
+    assert heavy == []
+    assert min(elapsed for elapsed, _ in runs) <= BUDGET_MS
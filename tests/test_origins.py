@@ -0,0 +1,81 @@
+from aws_assistant.origins import OriginCache, detect_origins, iter_project_files
+
+VITE_CONFIG = """import { defineConfig } from 'vite'
+// database: { port: 5432 }
+/* server: { port: 9999 } */
+export default defineConfig({
+  base: 'https://cdn.example.com/', // served from a CDN
+  server: {
+    port: 5174,
+    hmr: { port: 24678 },
+    proxy: { '/api': { target: 'http://localhost:8080', port: 8080 } },
+  },
+  preview: { port: 4173 },
+})
+"""
+
+
+def test_vite_config_only_serves_on_server_and_preview_ports(tmp_path):
+    (tmp_path / 'vite.config.ts').write_text(VITE_CONFIG)
+
+    assert detect_origins(str(tmp_path), environ={}) == [
+        ('http://localhost:5174', ['vite.config.ts (server.port)']),
+        ('http://localhost:4173', ['vite.config.ts (preview.port)']),
+    ]
+
+
+def test_cache_reuses_unchanged_files(tmp_path):
+    project = tmp_path / 'app'
+    project.mkdir()
+    (project / '.env.production').write_text('VITE_URL=https://myapp.com\n')
+    cache_path = str(tmp_path / 'origins.json')
+    detect_origins(str(project), OriginCache(cache_path), environ={})
+
+    cache = OriginCache(cache_path)
+    origins = detect_origins(str(project), cache, environ={})
+
+    assert origins == [('https://myapp.com', ['.env.production (VITE_URL)'])]
+    assert not cache.changed
+
+
+def test_walks_the_whole_repository_from_a_subdirectory(tmp_path):
+    (tmp_path / '.git').mkdir()
+    web = tmp_path / 'apps' / 'web'
+    (web / 'src').mkdir(parents=True)
+    (web / '.env.production').write_text('NEXT_PUBLIC_URL=https://myapp.com\n')
+    (tmp_path / 'apps' / 'admin').mkdir()
+    (tmp_path / 'apps' / 'admin' / '.env').write_text('VITE_URL=https://admin.myapp.com\n')
+
+    origins = detect_origins(str(web / 'src'), environ={})
+
+    assert origins == [
+        ('https://admin.myapp.com', ['apps/admin/.env (VITE_URL)']),
+        ('https://myapp.com', ['apps/web/.env.production (NEXT_PUBLIC_URL)']),
+    ]
+
+
+def test_workspace_root_bounds_the_walk_without_git(tmp_path):
+    (tmp_path / '.env').write_text('APP_URL=https://unrelated.example.com\n')
+    repo = tmp_path / 'repo'
+    (repo / 'packages' / 'site').mkdir(parents=True)
+    (repo / 'package.json').write_text('{"workspaces": ["packages/*"]}')
+    (repo / 'packages' / 'site' / 'package.json').write_text('{"homepage": "https://site.example.com"}')
+
+    origins = detect_origins(str(repo / 'packages' / 'site'), environ={})
+
+    assert origins == [('https://site.example.com', ['packages/site/package.json (homepage)'])]
+
+
+def test_outside_a_project_only_reads_the_directory_itself(tmp_path):
+    (tmp_path / '.env').write_text('APP_URL=https://home.example.com\n')
+    (tmp_path / 'old-project').mkdir()
+    (tmp_path / 'old-project' / '.env').write_text('APP_URL=https://old.example.com\n')
+
+    assert detect_origins(str(tmp_path), environ={}) == [('https://home.example.com', ['.env (APP_URL)'])]
+
+
+def test_walk_stops_after_max_entries(tmp_path):
+    for i in range(10):
+        (tmp_path / f'file{i}.txt').write_text('')
+
+    assert len(list(iter_project_files(str(tmp_path), max_entries=4))) == 4
@@ -0,0 +1,124 @@
+import asyncio
+import threading
+
+import pytest
+
+from aws_assistant import preflight
+from aws_assistant.cors import CorsTarget
+from aws_assistant.preflight import PreflightCheck, preflight_checks, preflight_problem, send_preflight, verify_preflights
+
+ALLOWED = {
+    'Access-Control-Allow-Origin': 'https://app.example.com',
+    'Access-Control-Allow-Methods': 'GET,POST,OPTIONS',
+    'Access-Control-Allow-Headers': 'content-type',
+}
+
+
+class PreflightServer:
+    """Answers each request with the next of responses, repeating the last"""
+
+    def __init__(self):
+        self.responses = [(200, ALLOWED)]
+        self.requests = []
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.server = asyncio.run_coroutine_threadsafe(
+            asyncio.start_server(self.handle, '127.0.0.1', 0), self.loop
+        ).result()
+        self.url = f'http://127.0.0.1:{self.server.sockets[0].getsockname()[1]}/items'
+
+    async def handle(self, reader, writer):
+        self.requests.append((await reader.readuntil(b'\r\n\r\n')).decode('latin-1'))
+        status, headers = self.responses.pop(0) if len(self.responses) > 1 else self.responses[0]
+        lines = [f'HTTP/1.1 {status} Status'] + [f'{name}: {value}' for name, value in headers.items()]
+        writer.write(('\r\n'.join(lines) + '\r\nContent-Length: 0\r\n\r\n').encode('latin-1'))
+        await writer.drain()
+        writer.close()
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.server.close)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+
+@pytest.fixture
+def server():
+    server = PreflightServer()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(preflight, 'RETRY_DELAY', 0.01)
+    monkeypatch.setattr(preflight, 'MAX_RETRY_DELAY', 0.01)
+
+
+def test_send_preflight_asks_as_a_browser_would(server):
+    status, headers = asyncio.run(send_preflight(server.url, 'https://app.example.com', 'PUT', timeout=5))
+
+    assert status == 200
+    assert headers['access-control-allow-origin'] == 'https://app.example.com'
+    request = server.requests[0]
+    assert request.startswith('OPTIONS /items HTTP/1.1\r\n')
+    assert 'Origin: https://app.example.com\r\n' in request
+    assert 'Access-Control-Request-Method: PUT\r\n' in request
+
+
+@pytest.mark.parametrize('status, headers, problem', [
+    (200, {'access-control-allow-origin': 'https://app.example.com/'}, None),
+    (204, {'access-control-allow-origin': '*', 'access-control-allow-methods': '*'}, None),
+    (403, {}, 'HTTP 403'),
+    (200, {}, 'no Access-Control-Allow-Origin'),
+    (200, {'access-control-allow-origin': 'https://other.example.com'}, 'Access-Control-Allow-Origin is https://other.example.com'),
+    (200, {'access-control-allow-origin': '*', 'access-control-allow-methods': 'GET'}, 'POST not in Access-Control-Allow-Methods'),
+    (200, {'access-control-allow-origin': '*', 'access-control-allow-headers': 'x-api-key'}, 'content-type not in Access-Control-Allow-Headers'),
+])
+def test_preflight_problem(status, headers, problem):
+    assert preflight_problem(status, headers, 'https://app.example.com', 'POST') == problem
+
+
+def test_verify_retries_until_the_change_propagates(server, fast_retries):
+    server.responses = [(403, {}), (200, {}), (200, ALLOWED)]
+    check = PreflightCheck('URL', None, 'items', server.url, ['https://app.example.com'])
+
+    result, = verify_preflights([check], attempts=5, timeout=5)
+
+    assert result.passed
+    assert result.attempts == 3
+
+
+def test_verify_reports_the_last_failure(server, fast_retries):
+    server.responses = [(200, {'Access-Control-Allow-Origin': 'https://other.example.com'})]
+    check = PreflightCheck('URL', None, 'items', server.url, ['https://app.example.com', '*'])
+
+    failed, wildcard = verify_preflights([check], attempts=2, timeout=5)
+
+    assert failed.problem == 'Access-Control-Allow-Origin is https://other.example.com'
+    assert failed.attempts == 2
+    # * is checked from a stand-in origin, which a fixed origin does not allow either
+    assert not wildcard.passed
+    assert len(server.requests) == 4
+
+
+def test_oversized_response_fails_only_its_check(server, fast_retries):
+    server.responses = [(200, dict(ALLOWED, **{'X-Padding': 'x' * 100000}))]
+    check = PreflightCheck('URL', None, 'items', server.url, ['https://app.example.com'])
+
+    result, = verify_preflights([check], attempts=1, timeout=5)
+
+    assert result.problem.startswith('no response')
+
+
+def test_http_api_is_checked_under_its_stage(aws):
+    plan = [CorsTarget('HTTP API', 'us-east-1', 'h0000', 'http-api-0'), CorsTarget('HTTP API', 'us-east-1', 'h0001', 'http-api-1')]
+
+    checks, skipped = preflight_checks(plan, {}, ['https://app.example.com'])
+
+    assert skipped == []
+    assert sorted(check.url for check in checks) == [
+        'https://h0000.execute-api.us-east-1.amazonaws.com/',
+        'https://h0001.execute-api.us-east-1.amazonaws.com/prod/',
+    ]
@@ -0,0 +1,161 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import json
+
+from botocore.exceptions import EndpointConnectionError
+from click.testing import CliRunner
+
+from aws_assistant.cache import InventoryCache
+from aws_assistant.cli import main
+from aws_assistant.clients import registry
+from aws_assistant.filters import FunctionFilter
+from aws_assistant.scanner import api_ids_from_policy, scan_region, scan_regions
+
+
+def scan(regions, **kwargs):
+    functions = {}
+    for region, region_functions, error in scan_regions(regions, **kwargs):
+        assert error is None
+        functions.update((f'{region}/{f.function_name}', f) for f in region_functions)
+    return functions
+
+
+def api_ids(function):
+    return sorted(link.api_id for link in function.api_gateways)
+
+
+def test_scan_maps_urls_and_apis(aws):
+    functions = scan(['us-east-1', 'us-east-2', 'us-west-1'])
+
+    assert len(functions) == 24
+    first = functions['us-east-1/fn-00000']
+    assert first.has_function_url and first.function_url_cors_configured
+    assert first.function_url == 'https://fn-00000.lambda-url.us-east-1.on.aws/'
+    assert api_ids(first) == ['h0000', 'r0000']
+    assert not functions['us-east-1/fn-00001'].has_function_url
+    assert functions['us-east-1/fn-00011'].api_gateways == ()
+    # An empty region stops after the function listing
+    assert aws.calls[('apigatewayv2', 'GetApis')] == 2
+
+
+def test_scan_reuses_cached_region(aws):
+    cache = InventoryCache('123456789012', path=':memory:')
+    first = scan(['us-east-1'], cache=cache)
+    aws.reset_counts()
+
+    second = scan(['us-east-1'], cache=cache)
+
+    assert sum(aws.calls.values()) == 0
+    assert {key: api_ids(f) for key, f in second.items()} == {key: api_ids(f) for key, f in first.items()}
+
+
+def test_filtered_scan_uses_resource_policies(aws):
+    function_filter = FunctionFilter(names=('fn-00004',))
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        functions = scan_region('us-east-1', pool, function_filter=function_filter)
+
+    assert [f.function_name for f in functions] == ['fn-00004']
+    assert api_ids(functions[0]) == ['r0001']
+    assert aws.calls[('lambda', 'ListFunctionUrlConfigs')] == 1
+    assert aws.calls[('apigatewayv2', 'GetApis')] == 0
+
+
+def test_incremental_scan_remaps_after_remap_age(aws):
+    cache = InventoryCache('123456789012', ttl=0, path=':memory:')
+    scan(['us-east-1'], cache=cache)
+    # Neither changes the function listing or the API listing
+    aws.fixture.http_targets[0].append(11)
+    aws.url_cors[('us-east-1', 0)] = {}
+    aws.reset_counts()
+
+    scan(['us-east-1'], cache=cache)
+
+    assert aws.calls[('lambda', 'ListFunctionUrlConfigs')] == 0
+
+    cache.remap_age = 0
+    functions = scan(['us-east-1'], cache=cache)
+
+    assert aws.calls[('lambda', 'ListFunctionUrlConfigs')] == 12
+    assert api_ids(functions['us-east-1/fn-00011']) == ['h0000']
+    assert not functions['us-east-1/fn-00000'].function_url_cors_configured
+
+
+def statement(service, source_arn=None):
+    entry = {'Effect': 'Allow', 'Principal': {'Service': service}, 'Action': 'lambda:InvokeFunction'}
+    if source_arn:
+        entry['Condition'] = {'ArnLike': {'AWS:SourceArn': source_arn}}
+    return entry
+
+
+def test_api_ids_from_policy():
+    named = statement('apigateway.amazonaws.com', 'arn:aws:execute-api:us-east-1:123456789012:abc123/*/GET/items')
+    elsewhere = statement('apigateway.amazonaws.com', 'arn:aws:execute-api:eu-west-1:123456789012:def456/*')
+    s3 = statement('s3.amazonaws.com', 'arn:aws:s3:::uploads')
+
+    assert api_ids_from_policy({'Statement': [named, s3]}, 'us-east-1') == ['abc123']
+    assert api_ids_from_policy({'Statement': [elsewhere]}, 'us-east-1') == []
+    assert api_ids_from_policy({'Statement': named}, 'us-east-1') == ['abc123']
+    # API Gateway may invoke through an integration credentials role the policy does not show
+    assert api_ids_from_policy({'Statement': [s3]}, 'us-east-1') is None
+    assert api_ids_from_policy({'Statement': []}, 'us-east-1') is None
+    assert api_ids_from_policy({'Statement': [statement('apigateway.amazonaws.com')]}, 'us-east-1') is None
+
+
+def test_filtered_scan_maps_apis_when_the_policy_names_none(aws):
+    aws.fixture.policies[4] = []
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        functions = scan_region('us-east-1', pool, function_filter=FunctionFilter(names=('fn-00004',)))
+
+    assert api_ids(functions[0]) == ['r0001']
+
+
+def test_connection_failure_only_fails_its_region(aws, failures):
+    registry.configure(max_attempts=1)
+    failures['us-east-2'] = EndpointConnectionError(endpoint_url='https://lambda.us-east-2.amazonaws.com')
+
+    results = {region: (functions, error) for region, functions, error in scan_regions(['us-east-1', 'us-east-2'])}
+
+    assert len(results['us-east-1'][0]) == 12 and results['us-east-1'][1] is None
+    assert results['us-east-2'][0] == []
+    assert isinstance(results['us-east-2'][1], EndpointConnectionError)
+
+
+def scan_cli(*args):
+    """Regions and function names in a jsonl scan of both populated regions, and its full output"""
+    output = CliRunner().invoke(
+        main, ['scan', '--output', 'jsonl', '--refresh', '--max-attempts', '1', '--regions', 'us-east-1,us-east-2', *args],
+        catch_exceptions=False
+    ).output
+    records = [json.loads(line) for line in output.splitlines() if line.startswith('{')]
+    return {(record['Region'], record['FunctionName']) for record in records}, output
+
+
+def test_resume_only_rescans_unfinished_regions(aws, failures):
+    failures['us-east-2'] = EndpointConnectionError(endpoint_url='https://lambda.us-east-2.amazonaws.com')
+    functions, output = scan_cli()
+    assert {region for region, _ in functions} == {'us-east-1'}
+    assert '--resume' in output
+
+    # us-east-1 comes from the checkpoint, so its failure now never shows
+    failures.clear()
+    failures['us-east-1'] = EndpointConnectionError(endpoint_url='https://lambda.us-east-1.amazonaws.com')
+    functions, output = scan_cli('--resume')
+
+    assert 'Resuming the interrupted scan' in output
+    assert 'Could not scan' not in output
+    assert len(functions) == 24
+
+
+def test_resume_ignores_a_checkpoint_of_other_options(aws, failures):
+    failures['us-east-2'] = EndpointConnectionError(endpoint_url='https://lambda.us-east-2.amazonaws.com')
+    scan_cli()
+
+    failures.clear()
+    failures['us-east-1'] = EndpointConnectionError(endpoint_url='https://lambda.us-east-1.amazonaws.com')
+    functions, output = scan_cli('--resume', '--name', 'fn-*')
+
+    assert 'No interrupted scan with these options to resume' in output
+    assert 'Could not scan us-east-1' in output
+    assert {region for region, _ in functions} == {'us-east-2'}